@@ -1,2 +1,22 @@
 SHOW_TEN = 10
 SYMBOLS_LIMIT = 15
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL = 200
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+CARD_STATS_FLUSH_INTERVAL = 10
+FEED_CACHE_TIMEOUT = 60 * 5
+FEED_LOCK_TIMEOUT = 10
+SEARCH_MAX_RESULTS = 1000
+SEARCH_CACHE_TIMEOUT = 60 * 5
+COMMENTS_PER_PAGE = 20
+SUBMIT_DEDUP_TIMEOUT = 60 * 60
+NEW_POSTS_HEAD_SIZE = 100
+NEW_POSTS_RETRY = 15
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_MAX_BACKOFF = 60 * 60
+JOB_LOCK_TIMEOUT = 60 * 15
+JOB_POLL_INTERVAL = 1.0
+SHED_WINDOW = 200
+SHED_HOLD = 10
+SHED_RETRY_AFTER = 5
@@ -0,0 +1,20 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "pk",
+        "task",
+        "status",
+        "priority",
+        "attempts",
+        "run_at",
+        "locked_by",
+    )
+    list_filter = ("status", "task")
+    search_fields = ("task", "key")
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,42 @@
+"""Проверка живости постоянного соединения.
+
+С CONN_MAX_AGE соединение переживает запрос, и сервер или пулер
+могли за это время его закрыть. Если в OPTIONS включён
+health_checks, перед первым запросом к базе в каждом HTTP-запросе
+соединение проверяется через is_usable() и при неудаче открывается
+заново — до того, как вид получит ошибку. Свежее соединение
+не проверяется.
+"""
+
+
+class HealthCheckMixin:
+    health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return bool(self.settings_dict["OPTIONS"].get("health_checks"))
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        # Вызывается в начале и в конце каждого HTTP-запроса.
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+            or self.in_atomic_block
+        ):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
@@ -0,0 +1,126 @@
+"""PostgreSQL с пулом соединений и проверкой их живости.
+
+Нужен psycopg2 (requirements-postgres.txt); без него модуль
+не импортируется, и это сообщает сам Django. Берёт из OPTIONS,
+кроме обычных параметров psycopg2.connect:
+
+- pool — {"max_size": ..., "timeout": ...}: соединения процесса
+  держатся в общем пуле, а Django «закрывает» соединение в конце
+  запроса, возвращая его в пул. Сервер видит не больше max_size
+  соединений от процесса; запрос, которому не хватило соединения
+  за timeout секунд, получает OperationalError. С пулом CONN_MAX_AGE
+  должен быть 0: переиспользованием занимается пул;
+- health_checks — проверять соединение в начале каждого HTTP-запроса
+  (core.backends.health).
+
+За PgBouncer в режиме transaction пул не нужен, зато нужен
+DISABLE_SERVER_SIDE_CURSORS (core.db_config ставит его по pgbouncer=1).
+"""
+
+import queue
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from core.backends.health import HealthCheckMixin
+
+Database = base.Database
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_POOL_TIMEOUT = 5.0
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Пул соединений psycopg2, общий для потоков одного процесса."""
+
+    def __init__(self, conn_params, max_size, timeout):
+        self.conn_params = conn_params
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(max_size)
+        self.slots = threading.BoundedSemaphore(max_size)
+
+    def get(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise Database.OperationalError("Нет свободных соединений в пуле")
+        try:
+            try:
+                return self.idle.get_nowait()
+            except queue.Empty:
+                return Database.connect(**self.conn_params)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def put(self, connection):
+        """Возвращает соединение в пул; незавершённую транзакцию
+        откатывает, сломанное соединение закрывает."""
+        try:
+            if connection.closed:
+                return
+            status = connection.get_transaction_status()
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                connection.close()
+                return
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            self.idle.put_nowait(connection)
+        except Database.Error:
+            connection.close()
+        finally:
+            self.slots.release()
+
+    def disconnect(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def get_pool(conn_params, options):
+    """Пул для параметров соединения; создаётся при первом обращении."""
+    key = repr(sorted(conn_params.items()))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                conn_params,
+                int(options.get("max_size", DEFAULT_POOL_SIZE)),
+                float(options.get("timeout", DEFAULT_POOL_TIMEOUT)),
+            )
+        return _pools[key]
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    PROFILE_OPTIONS = ("pool", "health_checks")
+
+    pool = None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for name in self.PROFILE_OPTIONS:
+            params.pop(name, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict["OPTIONS"]
+        if not options.get("pool"):
+            return super().get_new_connection(conn_params)
+        self.pool = get_pool(conn_params, options["pool"])
+        connection = self.pool.get()
+        # Как в base.DatabaseWrapper: уровень изоляции до autocommit.
+        self.isolation_level = options.get(
+            "isolation_level", connection.isolation_level
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            self.pool.put(self.connection)
@@ -0,0 +1,90 @@
+"""SQLite с профилем для продакшена.
+
+Берёт из OPTIONS, кроме обычных параметров sqlite3.connect:
+
+- pragmas — PRAGMA, выполняемые при открытии соединения (WAL, mmap,
+  размер кеша, synchronous, busy_timeout);
+- transaction_mode — режим BEGIN для transaction.atomic. IMMEDIATE
+  берёт блокировку записи сразу: иначе две транзакции, начавшие
+  с чтения, при записи упираются друг в друга, и busy_timeout
+  не помогает;
+- busy_retries — сколько раз повторить запрос вне транзакции,
+  если база так и не освободилась за busy_timeout;
+- health_checks — проверять соединение в начале каждого HTTP-запроса
+  (core.backends.health).
+
+Внутри транзакции запрос не повторяется: её целиком повторяет
+тот, кто её начал.
+"""
+
+import sqlite3
+import time
+
+from django.db.backends.sqlite3 import base
+
+from core.backends.health import HealthCheckMixin
+
+RETRY_DELAY = 0.05
+
+
+def is_locked(error):
+    return "is locked" in str(error)
+
+
+class RetryingCursorWrapper(base.SQLiteCursorWrapper):
+    retries = 0
+
+    def execute(self, query, params=None):
+        return self.retrying(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self.retrying(super().executemany, query, param_list)
+
+    def retrying(self, method, *args):
+        for attempt in range(self.retries + 1):
+            try:
+                return method(*args)
+            except sqlite3.OperationalError as error:
+                if (
+                    attempt == self.retries
+                    or not is_locked(error)
+                    or self.connection.in_transaction
+                ):
+                    raise
+            time.sleep(RETRY_DELAY * 2**attempt)
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    PROFILE_OPTIONS = (
+        "pragmas",
+        "transaction_mode",
+        "busy_retries",
+        "health_checks",
+    )
+
+    def profile_option(self, name, default=None):
+        return self.settings_dict["OPTIONS"].get(name, default)
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for name in self.PROFILE_OPTIONS:
+            params.pop(name, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.profile_option("pragmas", {}).items():
+            connection.execute(f"PRAGMA {name} = {value}")
+        return connection
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=RetryingCursorWrapper)
+        cursor.retries = self.profile_option("busy_retries", 0)
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.profile_option("transaction_mode")
+        if mode:
+            self.cursor().execute(f"BEGIN {mode}")
+        else:
+            super()._start_transaction_under_autocommit()
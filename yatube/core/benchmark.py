@@ -0,0 +1,14 @@
+def percentile(values, share):
+    """Значение, ниже которого лежит доля share выборки."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def latency_summary(timings):
+    """p50/p95/p99 выборки времени в секундах, в миллисекундах."""
+    return {
+        f"p{round(share * 100)}_ms": round(
+            percentile(timings, share) * 1000, 3
+        )
+        for share in (0.5, 0.95, 0.99)
+    }
@@ -0,0 +1,47 @@
+"""Проверки настроек (manage.py check, runserver, migrate, run_jobs).
+
+Воркер run_jobs сбрасывает версии карточек, лент и страниц
+(posts.cards, posts.feeds, posts.conditional) в кеше. Если кеш
+живёт в процессе, веб-процессы этих сбросов не видят и отдают
+устаревшие карточки и 304 на устаревшие ETag. WSGI-сервер системные
+проверки не запускает, поэтому wsgi.py вызывает require_shared_cache().
+"""
+
+from django.conf import settings
+from django.core.checks import Error, register
+from django.core.exceptions import ImproperlyConfigured
+
+# Бэкенды, которые хранят данные в памяти одного процесса.
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def cache_is_shared(alias="default"):
+    config = settings.CACHES[alias]
+    if config["BACKEND"] in PROCESS_LOCAL_CACHES:
+        return False
+    return not str(config.get("LOCATION", "")).startswith("fake://")
+
+
+@register()
+def jobs_cache_check(app_configs, **kwargs):
+    if settings.JOBS_SYNC or cache_is_shared():
+        return []
+    return [
+        Error(
+            "Фоновые задачи выполняет отдельный воркер, а кеш не общий "
+            "для процессов.",
+            hint="Задайте CACHE_URL=redis://... или JOBS_SYNC=1.",
+            id="core.E001",
+        )
+    ]
+
+
+def require_shared_cache():
+    """Не даёт запустить веб-процесс, который не увидит сбросов
+    кеша из воркера."""
+    errors = jobs_cache_check(None)
+    if errors:
+        raise ImproperlyConfigured(f"{errors[0].msg} {errors[0].hint}")
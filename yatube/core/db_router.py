@@ -0,0 +1,112 @@
+"""Чтение с реплик для видов только для чтения.
+
+Виды, помеченные read_from_replica, читают с одной из реплик
+settings.DATABASE_REPLICAS, всё остальное идёт в основную базу.
+Кто только что писал, следующие REPLICA_PIN_SECONDS секунд читает
+из основной базы (cookie PIN_COOKIE), чтобы после post_create
+в профиле был виден новый пост, даже если реплика отстаёт.
+
+Общий кеш лент и валидаторы страниц версионируются изменениями
+в основной базе. Прочитанное с реплики в первые REPLICA_PIN_SECONDS
+после изменения может его не содержать, поэтому такие ответы
+не кешируются (replica_may_lag).
+"""
+
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PIN_COOKIE = "pin_primary"
+# Сессии всегда читаются из основной базы: только что созданной
+# при входе сессии на реплике может ещё не быть.
+PRIMARY_ONLY_APPS = {"sessions"}
+
+_state = ContextVar("replica_state", default=None)
+
+
+class RequestState:
+    __slots__ = ("replicas", "wrote")
+
+    def __init__(self):
+        self.replicas = False
+        self.wrote = False
+
+
+def read_from_replica(view):
+    """Помечает вид, которому можно читать с реплики."""
+    view.read_from_replica = True
+    return view
+
+
+def replica_may_lag(changed_ns):
+    """True, если запрос читает с реплики, а изменение в момент
+    changed_ns (time.time_ns()) могло до неё ещё не дойти."""
+    state = _state.get()
+    if (
+        state is None
+        or not state.replicas
+        or state.wrote
+        or not settings.DATABASE_REPLICAS
+    ):
+        return False
+    return time.time_ns() - changed_ns < settings.REPLICA_PIN_SECONDS * 1e9
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is None
+            or not state.replicas
+            or state.wrote
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+            or not settings.DATABASE_REPLICAS
+        ):
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaMiddleware:
+    """Решает, можно ли запросу читать с реплики, и закрепляет
+    за основной базой того, кто в запросе писал."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RequestState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.get().replicas = (
+            getattr(view_func, "read_from_replica", False)
+            and request.method in ("GET", "HEAD")
+            and PIN_COOKIE not in request.COOKIES
+        )
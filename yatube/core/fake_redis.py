@@ -0,0 +1,202 @@
+"""Встроенный в процесс Redis-совместимый сервер для тестов.
+
+Понимает только команды, которые использует core.redis_cache.RedisCache,
+а из скриптов EVAL — только INCR_SCRIPT.
+"""
+
+import re
+import socketserver
+import threading
+import time
+
+from core.redis_cache import INCR_SCRIPT
+
+
+def glob_to_regex(pattern):
+    """Шаблон MATCH Redis: *, ? и экранирование обратной косой."""
+    parts = []
+    escaped = False
+    for char in pattern.decode("latin-1"):
+        if escaped or char not in "\\*?":
+            parts.append(re.escape(char))
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        else:
+            parts.append(".*" if char == "*" else ".")
+    return re.compile("".join(parts).encode("latin-1"), re.DOTALL)
+
+
+class Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.databases = {}
+
+    def db(self, index):
+        return self.databases.setdefault(index, {})
+
+    @staticmethod
+    def alive(data, key):
+        value = data.get(key)
+        if value is None:
+            return None
+        payload, expires = value
+        if expires is not None and expires <= time.monotonic():
+            del data[key]
+            return None
+        return value
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.db_index = 0
+        self.authenticated = self.server.password is None
+        while True:
+            try:
+                command = self.read_command()
+            except (ConnectionError, ValueError):
+                return
+            if command is None:
+                return
+            name, args = command[0].upper(), command[1:]
+            method = getattr(self, "cmd_" + name.decode().lower(), None)
+            if method is None:
+                self.wfile.write(b"-ERR unknown command\r\n")
+                continue
+            if not self.authenticated and name != b"AUTH":
+                self.wfile.write(b"-NOAUTH Authentication required.\r\n")
+                continue
+            with self.server.store.lock:
+                data = self.server.store.db(self.db_index)
+                try:
+                    reply = method(data, *args)
+                except (TypeError, ValueError):
+                    reply = ValueError("ERR wrong arguments")
+            self.wfile.write(self.encode(reply))
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            raise ValueError(line)
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def encode(self, reply):
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, ValueError):
+            return b"-%s\r\n" % str(reply).encode()
+        if isinstance(reply, str):
+            return b"+%s\r\n" % reply.encode()
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, bytes):
+            return b"$%d\r\n%s\r\n" % (len(reply), reply)
+        return b"*%d\r\n" % len(reply) + b"".join(map(self.encode, reply))
+
+    def cmd_ping(self, data):
+        return "PONG"
+
+    def cmd_auth(self, data, *credentials):
+        if credentials[-1].decode() != self.server.password:
+            return ValueError("WRONGPASS invalid password")
+        self.authenticated = True
+        return "OK"
+
+    def cmd_select(self, data, index):
+        self.db_index = int(index)
+        return "OK"
+
+    def cmd_get(self, data, key):
+        value = Store.alive(data, key)
+        return value and value[0]
+
+    def cmd_mget(self, data, *keys):
+        return [self.cmd_get(data, key) for key in keys]
+
+    def cmd_set(self, data, key, value, *options):
+        options = [option.upper() for option in options]
+        expires = None
+        if b"PX" in options:
+            ttl = int(options[options.index(b"PX") + 1])
+            expires = time.monotonic() + ttl / 1000
+        if b"NX" in options and Store.alive(data, key):
+            return None
+        data[key] = (value, expires)
+        return "OK"
+
+    def cmd_del(self, data, *keys):
+        return sum(data.pop(key, None) is not None for key in keys)
+
+    def cmd_exists(self, data, *keys):
+        return sum(Store.alive(data, key) is not None for key in keys)
+
+    def cmd_incrby(self, data, key, delta):
+        value = Store.alive(data, key)
+        payload, expires = value or (b"0", None)
+        if not payload.lstrip(b"-").isdigit():
+            return ValueError("ERR value is not an integer")
+        result = int(payload) + int(delta)
+        data[key] = (str(result).encode(), expires)
+        return result
+
+    def cmd_eval(self, data, script, numkeys, key, delta):
+        if script != INCR_SCRIPT:
+            return ValueError("ERR unknown script")
+        if Store.alive(data, key) is None:
+            return None
+        return self.cmd_incrby(data, key, delta)
+
+    def cmd_pexpire(self, data, key, ttl):
+        value = Store.alive(data, key)
+        if value is None:
+            return 0
+        data[key] = (value[0], time.monotonic() + int(ttl) / 1000)
+        return 1
+
+    def cmd_persist(self, data, key):
+        value = Store.alive(data, key)
+        if value is None or value[1] is None:
+            return 0
+        data[key] = (value[0], None)
+        return 1
+
+    def cmd_scan(self, data, cursor, *options):
+        # Все ключи за один вызов: курсор в ответе сразу "0".
+        options = dict(zip(options[::2], options[1::2]))
+        regex = glob_to_regex(options.get(b"MATCH", b"*"))
+        keys = [
+            key
+            for key in list(data)
+            if regex.fullmatch(key) and Store.alive(data, key)
+        ]
+        return [b"0", keys]
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, password=None):
+        super().__init__((host, port), Handler)
+        self.store = Store()
+        self.password = password
+        self.thread = None
+
+    @property
+    def address(self):
+        return self.server_address[:2]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
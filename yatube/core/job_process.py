@@ -0,0 +1,18 @@
+"""Точка входа процессов пула run_jobs --processes.
+
+Процессы запускаются через spawn и получают функции по имени модуля,
+поэтому модуль не импортирует моделей: он загружается в дочернем
+процессе раньше, чем django.setup().
+"""
+
+import django
+
+
+def setup():
+    django.setup()
+
+
+def execute(job_id):
+    from core.jobs import execute_in_pool
+
+    execute_in_pool(job_id)
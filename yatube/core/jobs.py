@@ -0,0 +1,287 @@
+"""Очередь фоновых задач в основной базе.
+
+Задача — функция с декоратором task и аргументами, которые
+сериализуются в JSON:
+
+    @jobs.task(priority=jobs.HIGH)
+    def backfill(user_id, author_id):
+        ...
+
+    jobs.enqueue(backfill, user.pk, author.pk, key=f"backfill:{...}")
+
+Строка Job пишется в текущей транзакции: внутри atomic откат
+убирает и задачу, а воркер не увидит её раньше коммита. Виды
+и сигналы работают без atomic, и там задача пишется отдельным
+запросом сразу после изменения. Воркер (manage.py run_jobs) берёт
+задачи по убыванию приоритета, а упавшую повторяет с растущей
+паузой, пока не кончатся попытки; после этого задача остаётся
+в таблице со статусом failed и текстом ошибки.
+
+key защищает от дублей: пока задача с ключом ждёт в очереди
+(в том числе повтора), вторая с тем же ключом не ставится,
+enqueue возвращает ждущую. Выполняющаяся задача ключ не держит:
+она могла прочитать данные до нового изменения, поэтому такая же
+задача ставится заново и выполнится после неё. Если к повтору
+упавшей задачи в очереди уже ждёт новая с тем же ключом, повтор
+не нужен и удаляется.
+
+При settings.JOBS_SYNC задача выполняется сразу при постановке,
+без базы и воркера: так идут тесты.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import traceback
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from constants import (
+    JOB_LOCK_TIMEOUT,
+    JOB_MAX_ATTEMPTS,
+    JOB_MAX_BACKOFF,
+    JOB_POLL_INTERVAL,
+    JOB_RETRY_DELAY,
+)
+
+from . import job_process
+from .models import Job
+
+HIGH = 10
+NORMAL = 0
+LOW = -10
+
+logger = logging.getLogger(__name__)
+
+
+class JobError(Exception):
+    pass
+
+
+def task(priority=NORMAL, max_attempts=JOB_MAX_ATTEMPTS):
+    """Декоратор: разрешает ставить функцию в очередь."""
+
+    def decorator(func):
+        func.job_name = f"{func.__module__}.{func.__qualname__}"
+        func.job_priority = priority
+        func.job_max_attempts = max_attempts
+        return func
+
+    return decorator
+
+
+def resolve(name):
+    """Функция задачи по имени; только помеченные task."""
+    func = import_string(name)
+    if getattr(func, "job_name", None) != name:
+        raise JobError(f"{name} не объявлена задачей")
+    return func
+
+
+def enqueue(func, *args, key=None, priority=None, delay=0):
+    """Ставит задачу в очередь; при дубле по key возвращает
+    уже ждущую задачу, в синхронном режиме — None."""
+    if not hasattr(func, "job_name"):
+        raise JobError(f"{func!r} не объявлена задачей")
+    if settings.JOBS_SYNC:
+        func(*args)
+        return None
+    fields = {
+        "task": func.job_name,
+        "args": json.dumps(args),
+        "priority": func.job_priority if priority is None else priority,
+        "max_attempts": func.job_max_attempts,
+        "run_at": timezone.now() + timedelta(seconds=delay),
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(key=key, **fields)
+    except IntegrityError:
+        return Job.objects.filter(key=key, status=Job.QUEUED).first()
+
+
+def backoff(attempts):
+    """Пауза перед повтором: удваивается с каждой попыткой
+    и получает до 10% случайной добавки, чтобы упавшие вместе
+    задачи не повторялись вместе."""
+    delay = min(JOB_RETRY_DELAY * 2 ** (attempts - 1), JOB_MAX_BACKOFF)
+    return delay * random.uniform(1, 1.1)
+
+
+def requeue(job_id, **fields):
+    """Возвращает задачу в очередь; если там уже ждёт задача
+    с тем же ключом, эта удаляется. True, если задача вернулась."""
+    try:
+        with transaction.atomic():
+            return bool(
+                Job.objects.filter(pk=job_id).update(
+                    status=Job.QUEUED, locked_at=None, locked_by="", **fields
+                )
+            )
+    except IntegrityError:
+        Job.objects.filter(pk=job_id).delete()
+        return False
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи воркеров, которые умерли,
+    не успев их закончить."""
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - timedelta(seconds=JOB_LOCK_TIMEOUT),
+    ).values_list("id", flat=True)
+    return sum(requeue(job_id) for job_id in list(stale))
+
+
+def claim(limit, worker):
+    """Забирает до limit готовых задач и возвращает их id.
+
+    Условный UPDATE по каждой задаче: из двух воркеров, выбравших
+    одну задачу, её получит только один. Так работает и на SQLite,
+    где нет SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    candidates = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=timezone.now()
+    ).order_by("-priority", "run_at", "id")
+    claimed = []
+    for job_id in candidates.values_list("id", flat=True)[:limit]:
+        if Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_at=timezone.now(),
+            locked_by=worker,
+        ):
+            claimed.append(job_id)
+    return claimed
+
+
+def execute(job_id):
+    """Выполняет взятую задачу: успешную удаляет, упавшую
+    откладывает на повтор или помечает проваленной."""
+    job = Job.objects.filter(pk=job_id, status=Job.RUNNING).first()
+    if job is None:
+        return
+    job.attempts += 1
+    try:
+        resolve(job.task)(*json.loads(job.args))
+    except Exception:
+        fail(job, traceback.format_exc())
+    else:
+        job.delete()
+
+
+def execute_in_pool(job_id):
+    """execute() в потоке или процессе пула, которые живут долго:
+    соединение закрывается по CONN_MAX_AGE, как после запроса."""
+    close_old_connections()
+    try:
+        execute(job_id)
+    finally:
+        close_old_connections()
+
+
+def fail(job, error):
+    if job.attempts >= job.max_attempts:
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED,
+            attempts=job.attempts,
+            last_error=error,
+            locked_at=None,
+            locked_by="",
+        )
+        logger.error("Задача %s провалена: %s", job, error)
+        return
+    run_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+    if requeue(job.pk, attempts=job.attempts, last_error=error, run_at=run_at):
+        logger.warning("Задача %s упала, повтор в %s", job, run_at)
+    else:
+        logger.warning("Задача %s упала, повтор не нужен: ждёт такая же", job)
+
+
+class Worker:
+    """Берёт задачи из очереди и выполняет их в пуле потоков
+    или процессов. concurrency=0 — по одной в текущем потоке."""
+
+    def __init__(
+        self,
+        concurrency=1,
+        processes=False,
+        poll_interval=JOB_POLL_INTERVAL,
+        name=None,
+    ):
+        self.concurrency = concurrency
+        self.processes = processes
+        self.poll_interval = poll_interval
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.stop = threading.Event()
+        self.processed = 0
+
+    def executor(self):
+        if self.processes:
+            # spawn, а не fork: дочерним процессам не достаются
+            # открытые соединения с базой родителя.
+            return ProcessPoolExecutor(
+                self.concurrency,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=job_process.setup,
+            )
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix="jobs")
+
+    def target(self):
+        return job_process.execute if self.processes else execute_in_pool
+
+    def run(self, burst=False):
+        """Работает до stop; с burst — пока в очереди есть готовые."""
+        requeue_stale()
+        if not self.concurrency:
+            self.run_inline(burst)
+            return
+        with self.executor() as executor:
+            running = set()
+            while not self.stop.is_set():
+                job_ids = claim(self.concurrency - len(running), self.name)
+                running.update(
+                    executor.submit(self.target(), job_id)
+                    for job_id in job_ids
+                )
+                if not running:
+                    if burst:
+                        break
+                    requeue_stale()
+                    self.stop.wait(self.poll_interval)
+                    continue
+                done, running = wait(
+                    running,
+                    timeout=self.poll_interval,
+                    return_when=FIRST_COMPLETED,
+                )
+                self.processed += len(done)
+            wait(running)
+            self.processed += len(running)
+
+    def run_inline(self, burst):
+        while not self.stop.is_set():
+            job_ids = claim(1, self.name)
+            if not job_ids:
+                if burst:
+                    break
+                requeue_stale()
+                self.stop.wait(self.poll_interval)
+                continue
+            execute(job_ids[0])
+            self.processed += 1
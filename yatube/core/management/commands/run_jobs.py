@@ -0,0 +1,53 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from constants import JOB_POLL_INTERVAL
+from core.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет фоновые задачи из очереди core.jobs. SIGTERM и Ctrl+C "
+        "останавливают воркер после того, как закончатся начатые задачи."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Размер пула; 0 — задачи по одной в главном потоке",
+        )
+        parser.add_argument(
+            "--processes",
+            action="store_true",
+            help="Пул процессов вместо пула потоков",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=JOB_POLL_INTERVAL
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Выйти, когда в очереди не останется готовых задач",
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options["concurrency"],
+            processes=options["processes"],
+            poll_interval=options["poll_interval"],
+        )
+        previous = {
+            signum: signal.signal(signum, lambda *_: worker.stop.set())
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        try:
+            worker.run(burst=options["burst"])
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(
+            self.style.SUCCESS(f"Выполнено задач: {worker.processed}")
+        )
@@ -0,0 +1,240 @@
+"""Метрики производительности запросов.
+
+MetricsMiddleware считает для каждого запроса число и время SQL,
+время рендеринга шаблонов, попадания и промахи кешей и общее время,
+отдаёт их в заголовке Server-Timing и копит гистограммы по имени
+URL. Гистограммы живут в памяти процесса: при нескольких воркерах
+Prometheus опрашивает каждый из них.
+"""
+
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.db import connections
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+UNRESOLVED = "unresolved"
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    __slots__ = (
+        "sql_count",
+        "sql_time",
+        "template_time",
+        "template_depth",
+        "cache_hits",
+        "cache_misses",
+    )
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper: считает запросы и их время."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.sql_count += 1
+
+
+def count_cache(hits=0, misses=0):
+    """Учитывает попадания и промахи кеша в текущем запросе."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+class timed_template:
+    """Засекает рендеринг шаблона; вложенные шаблоны не считаются
+    повторно, их время уже входит во время внешнего."""
+
+    def __enter__(self):
+        self.metrics = _current.get()
+        if self.metrics is not None:
+            self.metrics.template_depth += 1
+            self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.metrics is None:
+            return
+        self.metrics.template_depth -= 1
+        if not self.metrics.template_depth:
+            self.metrics.template_time += time.perf_counter() - self.started
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        """Накопленные значения по границам, как их ждёт Prometheus."""
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield format_value(bound), total
+        yield "+Inf", self.count
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(labels):
+    return ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for name, value in labels
+    )
+
+
+class Registry:
+    """Гистограммы и счётчики с метками, общие для потоков процесса."""
+
+    HISTOGRAMS = {
+        "yatube_request_duration_seconds": (
+            "Время обработки запроса",
+            LATENCY_BUCKETS,
+        ),
+        "yatube_db_duration_seconds": (
+            "Суммарное время SQL-запросов за запрос",
+            LATENCY_BUCKETS,
+        ),
+        "yatube_db_queries": ("Число SQL-запросов за запрос", QUERY_BUCKETS),
+        "yatube_template_duration_seconds": (
+            "Время рендеринга шаблонов за запрос",
+            LATENCY_BUCKETS,
+        ),
+    }
+    COUNTERS = {
+        "yatube_requests_total": "Число запросов",
+        "yatube_cache_hits_total": "Попадания в кеш",
+        "yatube_cache_misses_total": "Промахи кеша",
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {name: {} for name in self.HISTOGRAMS}
+            self.counters = {name: {} for name in self.COUNTERS}
+
+    def record(self, view, status, duration, metrics):
+        labels = (("view", view),)
+        observed = {
+            "yatube_request_duration_seconds": duration,
+            "yatube_db_duration_seconds": metrics.sql_time,
+            "yatube_db_queries": metrics.sql_count,
+            "yatube_template_duration_seconds": metrics.template_time,
+        }
+        counted = {
+            "yatube_requests_total": (labels + (("status", status),), 1),
+            "yatube_cache_hits_total": (labels, metrics.cache_hits),
+            "yatube_cache_misses_total": (labels, metrics.cache_misses),
+        }
+        with self.lock:
+            for name, value in observed.items():
+                series = self.histograms[name]
+                if labels not in series:
+                    series[labels] = Histogram(self.HISTOGRAMS[name][1])
+                series[labels].observe(value)
+            for name, (series_labels, value) in counted.items():
+                series = self.counters[name]
+                series[series_labels] = series.get(series_labels, 0) + value
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus 0.0.4."""
+        lines = []
+        with self.lock:
+            for name, (help_text, _) in self.HISTOGRAMS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(self.histograms[name].items()):
+                    text = format_labels(labels)
+                    for bound, total in histogram.samples():
+                        bucket = format_labels(labels + (("le", bound),))
+                        lines.append(f"{name}_bucket{{{bucket}}} {total}")
+                    lines.append(f"{name}_sum{{{text}}} {histogram.sum!r}")
+                    lines.append(f"{name}_count{{{text}}} {histogram.count}")
+            for name, help_text in self.COUNTERS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self.counters[name].items()):
+                    lines.append(f"{name}{{{format_labels(labels)}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def server_timing(metrics, duration):
+    return ", ".join(
+        [
+            f"db;dur={metrics.sql_time * 1000:.2f};"
+            f'desc="{metrics.sql_count} queries"',
+            f"tpl;dur={metrics.template_time * 1000:.2f}",
+            f'cache;desc="{metrics.cache_hits} hits / '
+            f'{metrics.cache_misses} misses"',
+            f"total;dur={duration * 1000:.2f}",
+        ]
+    )
+
+
+class MetricsMiddleware:
+    """Собирает метрики запроса и добавляет заголовок Server-Timing.
+
+    Ставится первым в MIDDLEWARE, чтобы учитывать работу остальных.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(metrics)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        registry.record(view, response.status_code, duration, metrics)
+        response["Server-Timing"] = server_timing(metrics, duration)
+        return response
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-17 08:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="job",
+            name="key",
+            field=models.CharField(
+                blank=True,
+                help_text="Пока задача ждёт в очереди, вторая с тем же ключом не ставится",
+                max_length=200,
+                null=True,
+                verbose_name="Ключ дедупликации",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="job",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(status="queued"),
+                fields=("key",),
+                name="job_queued_key_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,76 @@
+from django.db import models
+from django.utils import timezone
+
+from constants import JOB_MAX_ATTEMPTS
+
+
+class Job(models.Model):
+    """Фоновая задача из очереди core.jobs."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (FAILED, "Провалена"),
+    )
+
+    task = models.CharField(verbose_name="Задача", max_length=200)
+    args = models.TextField(verbose_name="Аргументы (JSON)", default="[]")
+    key = models.CharField(
+        verbose_name="Ключ дедупликации",
+        max_length=200,
+        null=True,
+        blank=True,
+        help_text="Пока задача ждёт в очереди, вторая с тем же ключом "
+        "не ставится",
+    )
+    priority = models.SmallIntegerField(verbose_name="Приоритет", default=0)
+    status = models.CharField(
+        verbose_name="Состояние",
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name="Попыток", default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name="Попыток не больше", default=JOB_MAX_ATTEMPTS
+    )
+    run_at = models.DateTimeField(
+        verbose_name="Выполнить не раньше", default=timezone.now
+    )
+    locked_at = models.DateTimeField(
+        verbose_name="Взята воркером", null=True, blank=True
+    )
+    locked_by = models.CharField(
+        verbose_name="Воркер", max_length=100, blank=True
+    )
+    last_error = models.TextField(verbose_name="Последняя ошибка", blank=True)
+    created = models.DateTimeField(
+        verbose_name="Поставлена", auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            models.Index(
+                fields=["status", "-priority", "run_at"], name="job_claim_idx"
+            ),
+        ]
+        # Ключ уникален только среди ждущих задач: пока задача
+        # выполняется, такая же ставится заново и увидит изменения,
+        # сделанные после её старта.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"],
+                condition=models.Q(status="queued"),
+                name="job_queued_key_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk}"
@@ -0,0 +1,127 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по курсору (keyset): без COUNT(*) и без OFFSET.
+
+    Страница выбирается условием по полям сортировки, поэтому
+    глубокая страница стоит столько же, сколько первая. Курсоры
+    соседних страниц хранятся в next_cursor и previous_cursor.
+    """
+
+    def __init__(self, object_list, per_page, ordering=("-pub_date", "-id")):
+        self.ordering = tuple(ordering)
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._seen = 0
+
+    @property
+    def count(self):
+        """Нижняя оценка числа объектов: всё, что уже видно с этой страницы.
+
+        Полный COUNT(*) намеренно не выполняется.
+        """
+        return self._seen
+
+    def encode_cursor(self, obj, number, backwards=False):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip("-"))
+            values.append(
+                value.isoformat() if hasattr(value, "isoformat") else value
+            )
+        raw = json.dumps([number, backwards, values]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            number, backwards, values = json.loads(
+                base64.urlsafe_b64decode(padded.encode())
+            )
+            if not isinstance(number, int) or number < 1:
+                raise ValueError
+            if len(values) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, binascii.Error):
+            raise InvalidPage("Некорректный курсор")
+        return number, bool(backwards), values
+
+    def _after(self, values, backwards):
+        """Условие «строго после курсора» в порядке сортировки."""
+        condition = Q()
+        for position, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            descending = field.startswith("-") != backwards
+            lookup = "lt" if descending else "gt"
+            step = Q(**{f"{name}__{lookup}": values[position]})
+            for prev_field, prev_value in zip(
+                self.ordering[:position], values[:position]
+            ):
+                step &= Q(**{prev_field.lstrip("-"): prev_value})
+            condition |= step
+        return condition
+
+    def page(self, cursor=None):
+        """Возвращает страницу, следующую за курсором (или первую)."""
+        number, backwards, values = 1, False, None
+        if cursor:
+            number, backwards, values = self.decode_cursor(cursor)
+        queryset = self.object_list
+        try:
+            if values is not None:
+                if backwards:
+                    queryset = queryset.reverse()
+                queryset = queryset.filter(self._after(values, backwards))
+            rows = list(queryset[: self.per_page + 1])
+        except (TypeError, ValueError, ValidationError):
+            raise InvalidPage("Некорректный курсор")
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+            number = max(number, 2) if has_more else 1
+            has_next = True
+        else:
+            has_next = has_more
+        self.num_pages = number + 1 if has_next else number
+        self._seen = (number - 1) * self.per_page + len(rows) + has_next
+        if rows and has_next:
+            self.next_cursor = self.encode_cursor(rows[-1], number + 1)
+        if rows and number > 1:
+            self.previous_cursor = self.encode_cursor(
+                rows[0], number - 1, backwards=True
+            )
+        return Page(rows, number, self)
+
+    def state(self, page):
+        """Данные страницы без самих объектов, пригодные для кеширования."""
+        return {
+            "number": page.number,
+            "num_pages": self.num_pages,
+            "seen": self._seen,
+            "next_cursor": self.next_cursor,
+            "previous_cursor": self.previous_cursor,
+        }
+
+    def restore(self, object_list, state):
+        """Собирает страницу из сохранённого state() без запроса к базе."""
+        self.num_pages = state["num_pages"]
+        self._seen = state["seen"]
+        self.next_cursor = state["next_cursor"]
+        self.previous_cursor = state["previous_cursor"]
+        return Page(object_list, state["number"], self)
+
+    def get_page(self, cursor=None):
+        """Как page(), но некорректный курсор ведёт на первую страницу."""
+        try:
+            return self.page(cursor)
+        except InvalidPage:
+            return self.page()
@@ -0,0 +1,88 @@
+"""Ограничение частоты запросов записи по алгоритму token bucket.
+
+У каждого пользователя (анонима — у IP-адреса) на каждое действие
+своё ведро из N жетонов, которое пополняется со скоростью N за
+период. Запрос берёт жетон; если жетонов нет, он получает 429
+с Retry-After — через сколько секунд появится следующий. Так можно
+сделать N запросов подряд, но не больше N за период в среднем.
+
+Вёдра лежат в кеше, общем для воркеров (CACHE_URL). Чтение и запись
+ведра не атомарны: одновременные запросы иногда проходят лишний раз,
+но защитить единственного писателя SQLite от скрипта это не мешает.
+"""
+
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import render
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """«10/m» → (ёмкость 10, пополнение в секунду 10 / 60)."""
+    count, _, period = rate.partition("/")
+    count = int(count)
+    return count, count / PERIODS[period]
+
+
+def client_id(request):
+    """Пользователь, а для анонимов — IP; за прокси IP берётся
+    из заголовка settings.REAL_IP_HEADER."""
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    header = settings.REAL_IP_HEADER
+    address = request.META.get(header) if header else None
+    if address:
+        address = address.split(",")[0].strip()
+    return f"ip:{address or request.META.get('REMOTE_ADDR', '')}"
+
+
+def take(key, capacity, refill, now=None):
+    """Берёт жетон из ведра key. 0, если взят, иначе через сколько
+    секунд появится следующий."""
+    now = time.time() if now is None else now
+    tokens, updated = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) * refill)
+    # Полное ведро можно не хранить: его вернёт значение по умолчанию.
+    timeout = math.ceil(capacity / refill)
+    if tokens < 1:
+        cache.set(key, (tokens, now), timeout)
+        return (1 - tokens) / refill
+    cache.set(key, (tokens - 1, now), timeout)
+    return 0
+
+
+def ratelimit(scope, methods=("POST",)):
+    """Декоратор вида: не больше settings.RATELIMITS[scope] запросов
+    с методами methods от одного пользователя или IP."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            rate = settings.RATELIMITS.get(scope)
+            if rate and request.method in methods:
+                wait = take(
+                    f"ratelimit:{scope}:{client_id(request)}",
+                    *parse_rate(rate),
+                )
+                if wait:
+                    return too_many_requests(request, wait)
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def too_many_requests(request, wait):
+    if request.is_ajax():
+        response = HttpResponse(status=429)
+    else:
+        response = render(request, "core/429.html", status=429)
+    response["Retry-After"] = str(math.ceil(wait))
+    return response
@@ -0,0 +1,367 @@
+"""Кеш-бэкенд для Redis-совместимого сервера без сторонних зависимостей.
+
+Подключение в settings.CACHES:
+
+    "BACKEND": "core.redis_cache.RedisCache",
+    "LOCATION": "redis://:password@localhost:6379/0",
+
+Пароль (и имя пользователя ACL Redis 6) из LOCATION отправляется
+командой AUTH при открытии каждого соединения, номер базы — SELECT.
+
+Чтение при недоступном сервере не роняет запрос: ошибка соединения
+пишется в лог, а get/get_many/has_key отвечают как при промахе.
+Запись и удаление падают: иначе молча остались бы устаревшие данные.
+clear() удаляет только ключи с KEY_PREFIX этого кеша, а не всю базу.
+
+LOCATION "fake://" поднимает в процессе core.fake_redis.FakeRedisServer,
+чтобы весь кеш можно было прогнать в тестах без настоящего Redis.
+"""
+
+import logging
+import pickle
+import queue
+import socket
+import threading
+import zlib
+from contextlib import contextmanager
+from urllib.parse import unquote, urlparse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+PICKLED = b"p"
+COMPRESSED = b"z"
+
+# INCRBY сам создаёт пустой ключ, а incr по контракту Django должен
+# падать на нём. Проверка и увеличение в одном скрипте атомарны:
+# ключ не истечёт и не удалится между ними.
+INCR_SCRIPT = b"""
+if redis.call('EXISTS', KEYS[1]) == 0 then return false end
+return redis.call('INCRBY', KEYS[1], ARGV[1])
+"""
+
+logger = logging.getLogger(__name__)
+
+_fake_server = None
+_fake_server_lock = threading.Lock()
+
+
+class RedisError(Exception):
+    pass
+
+
+class Connection:
+    """Одно соединение, говорящее на протоколе RESP."""
+
+    def __init__(self, host, port, db, timeout, username=None, password=None):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        # Соединение из пула: сервер мог закрыть его, пока оно лежало.
+        self.reused = False
+        try:
+            if password:
+                self.execute(b"AUTH", *filter(None, [username, password]))
+            if db:
+                self.execute(b"SELECT", db)
+        except Exception:
+            self.close()
+            raise
+
+    @staticmethod
+    def encode(args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            elif isinstance(arg, int):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    def read_reply(self):
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Соединение закрыто сервером")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            if length < 0:
+                return None
+            return [self.read_reply() for _ in range(length)]
+        raise RedisError(f"Неизвестный ответ: {line!r}")
+
+    def pipeline(self, commands):
+        """Отправляет все команды одним пакетом и читает ответы."""
+        self.sock.sendall(b"".join(self.encode(args) for args in commands))
+        return [self.read_reply() for _ in commands]
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class ConnectionPool:
+    """Пул соединений, общий для потоков одного процесса."""
+
+    def __init__(
+        self,
+        host,
+        port,
+        db=0,
+        max_connections=50,
+        timeout=1.0,
+        username=None,
+        password=None,
+    ):
+        self.host, self.port, self.db = host, port, db
+        self.username, self.password = username, password
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(max_connections)
+        self.slots = threading.BoundedSemaphore(max_connections)
+
+    def connect(self):
+        return Connection(
+            self.host,
+            self.port,
+            self.db,
+            self.timeout,
+            username=self.username,
+            password=self.password,
+        )
+
+    @contextmanager
+    def connection(self, fresh=False):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise ConnectionError("Нет свободных соединений в пуле")
+        try:
+            try:
+                if fresh:
+                    raise queue.Empty
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                conn = self.connect()
+            try:
+                yield conn
+            except (OSError, RedisError, ValueError):
+                conn.close()
+                raise
+            conn.reused = True
+            self.idle.put_nowait(conn)
+        finally:
+            self.slots.release()
+
+    def pipeline(self, commands):
+        """Выполняет команды на соединении из пула.
+
+        Соединение, пролежавшее в пуле, сервер мог закрыть (timeout,
+        перезапуск): тогда команды повторяются один раз на новом.
+        Ошибка нового соединения уходит вызывающему.
+        """
+        conn = None
+        try:
+            with self.connection() as conn:
+                return conn.pipeline(commands)
+        except ConnectionError:
+            if conn is None or not conn.reused:
+                raise
+        with self.connection(fresh=True) as conn:
+            return conn.pipeline(commands)
+
+    def disconnect(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def escape_glob(text):
+    """Экранирует спецсимволы шаблона MATCH/KEYS Redis."""
+    return "".join("\\" + char if char in "*?[]\\" else char for char in text)
+
+
+def fake_server_address():
+    global _fake_server
+    with _fake_server_lock:
+        if _fake_server is None:
+            from core.fake_redis import FakeRedisServer
+
+            _fake_server = FakeRedisServer().start()
+        return _fake_server.address
+
+
+class RedisCache(BaseCache):
+    """Django-кеш поверх Redis: пул соединений, конвейерные
+    get_many/set_many и сжатие больших значений zlib."""
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        url = urlparse(server)
+        if url.scheme == "fake":
+            host, port = fake_server_address()
+        else:
+            host, port = url.hostname or "localhost", url.port or 6379
+        db = int(url.path.strip("/") or 0)
+        password = url.password and unquote(url.password)
+        self.compress_min_length = options.get("COMPRESS_MIN_LENGTH", 1024)
+        self.pool = ConnectionPool(
+            host,
+            port,
+            db,
+            max_connections=options.get("MAX_CONNECTIONS", 50),
+            timeout=options.get("SOCKET_TIMEOUT", 1.0),
+            username=url.username and unquote(url.username),
+            password=password,
+        )
+
+    def serialize(self, value):
+        if type(value) is int:
+            return str(value).encode()
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) >= self.compress_min_length:
+            return COMPRESSED + zlib.compress(data)
+        return PICKLED + data
+
+    def deserialize(self, data):
+        if data[:1] == COMPRESSED:
+            return pickle.loads(zlib.decompress(data[1:]))
+        if data[:1] == PICKLED:
+            return pickle.loads(data[1:])
+        return int(data)
+
+    def ttl_ms(self, timeout):
+        """Время жизни в миллисекундах; None — без срока."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return int(timeout * 1000)
+
+    def full_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def set_command(self, key, value, timeout, only_new=False):
+        command = [b"SET", key, self.serialize(value)]
+        ttl = self.ttl_ms(timeout)
+        if ttl is not None:
+            command += [b"PX", max(ttl, 1)]
+        if only_new:
+            command.append(b"NX")
+        return command
+
+    def pipeline(self, commands):
+        return self.pool.pipeline(commands)
+
+    def read(self, commands, default):
+        """Команды чтения: при недоступном сервере — default и лог."""
+        try:
+            return self.pipeline(commands)
+        except OSError as error:
+            logger.warning("Redis недоступен, чтение из кеша: %s", error)
+            return default
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self.ttl_ms(timeout) == 0:
+            return False
+        key = self.full_key(key, version)
+        command = self.set_command(key, value, timeout, only_new=True)
+        return self.pipeline([command])[0] is not None
+
+    def get(self, key, default=None, version=None):
+        key = self.full_key(key, version)
+        data = self.read([[b"GET", key]], [None])[0]
+        return default if data is None else self.deserialize(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.full_key(key, version)
+        ttl = self.ttl_ms(timeout)
+        if ttl is None:
+            command = [b"PERSIST", key]
+            return bool(self.pipeline([[b"EXISTS", key], command])[0])
+        return bool(self.pipeline([[b"PEXPIRE", key, max(ttl, 1)]])[0])
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        full_keys = [self.full_key(key, version) for key in keys]
+        values = self.read([[b"MGET", *full_keys]], [[None] * len(keys)])[0]
+        return {
+            key: self.deserialize(data)
+            for key, data in zip(keys, values)
+            if data is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if not data:
+            return []
+        if self.ttl_ms(timeout) == 0:
+            self.delete_many(data.keys(), version)
+            return []
+        self.pipeline(
+            [
+                self.set_command(self.full_key(key, version), value, timeout)
+                for key, value in data.items()
+            ]
+        )
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self.full_key(key, version) for key in keys]
+        if keys:
+            self.pipeline([[b"DEL", *keys]])
+
+    def has_key(self, key, version=None):
+        key = self.full_key(key, version)
+        return bool(self.read([[b"EXISTS", key]], [0])[0])
+
+    def incr(self, key, delta=1, version=None):
+        key = self.full_key(key, version)
+        try:
+            value = self.pipeline([[b"EVAL", INCR_SCRIPT, 1, key, delta]])[0]
+        except RedisError as error:
+            raise ValueError(str(error))
+        if value is None:
+            raise ValueError(f"Key '{key}' not found")
+        return value
+
+    def clear(self):
+        """Удаляет ключи этого кеша; чужие ключи в базе остаются."""
+        # make_key даёт "префикс:версия:ключ".
+        pattern = escape_glob(self.key_prefix) + ":*"
+        cursor = b"0"
+        while True:
+            cursor, keys = self.pipeline(
+                [[b"SCAN", cursor, b"MATCH", pattern, b"COUNT", 1000]]
+            )[0]
+            if keys:
+                self.pipeline([[b"DEL", *keys]])
+            if cursor == b"0":
+                return
+
+    def close(self, **kwargs):
+        """Соединения остаются в пуле между запросами."""
@@ -0,0 +1,84 @@
+"""Сброс второстепенных запросов под нагрузкой.
+
+LoadSheddingMiddleware помнит время последних SHED_WINDOW запросов
+процесса на чтение: запись и загрузка картинок медленны сами по себе
+и о перегрузке не говорят. Если p99 окна выше
+settings.SHED_P99_THRESHOLD, то есть медленнее порога больше 1%
+запросов, а не один случайный, процесс ставит в кеше отметку
+перегрузки на SHED_HOLD секунд. Пока отметка есть, виды с пометкой
+low_priority (подгрузка ленты, опрос новых постов, поиск) сразу
+получают 503 с Retry-After, а страницы и запись обслуживаются
+как обычно.
+
+Ограничения числа одновременных запросов здесь нет: сброс решается
+только по задержке.
+
+Отметка лежит в общем кеше (CACHE_URL), поэтому медленный p99
+одного воркера разгружает все: при синхронных воркерах gunicorn
+каждый из них видит только свои запросы по одному. Пока p99
+остаётся высоким, воркер продлевает отметку; когда задержки
+приходят в норму, она истекает сама.
+"""
+
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from constants import SHED_HOLD, SHED_RETRY_AFTER, SHED_WINDOW
+
+OVERLOADED_KEY = "shedding:overloaded"
+
+
+def low_priority(view):
+    """Помечает вид, запросы к которому сбрасываются первыми."""
+    view.low_priority = True
+    return view
+
+
+class LoadSheddingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = settings.SHED_P99_THRESHOLD
+        self.durations = deque(maxlen=SHED_WINDOW)
+        # До какого времени отметка в кеше точно стоит: продлевать
+        # её на каждом запросе незачем.
+        self.marked_until = 0
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        request.shed = False
+        try:
+            return self.get_response(request)
+        finally:
+            if not request.shed and request.method in ("GET", "HEAD"):
+                self.record(time.perf_counter() - started)
+
+    def record(self, duration):
+        """Учитывает время обслуженного запроса. deque с maxlen
+        потокобезопасен для append, а снимок для p99 берёт list()."""
+        self.durations.append(duration)
+        if len(self.durations) < SHED_WINDOW:
+            return
+        now = time.monotonic()
+        if now < self.marked_until - SHED_HOLD / 2:
+            return
+        durations = list(self.durations)
+        slow = sum(duration > self.threshold for duration in durations)
+        if slow * 100 > len(durations):
+            cache.set(OVERLOADED_KEY, True, SHED_HOLD)
+            self.marked_until = now + SHED_HOLD
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(view_func, "low_priority", False):
+            return None
+        if not cache.get(OVERLOADED_KEY):
+            return None
+        request.shed = True
+        response = HttpResponse(
+            "Сервер перегружен, повторите позже", status=503
+        )
+        response["Retry-After"] = str(SHED_RETRY_AFTER)
+        return response
@@ -0,0 +1,80 @@
+"""Общие для всех посетителей страницы-«оболочки».
+
+shared_page рендерит страницу так, будто пользователь не вошёл:
+вид и шаблоны не трогают сессию и CSRF-cookie, поэтому ответ
+не получает Vary: Cookie и одинаков для всех — его можно хранить
+в кеше браузера, прокси или CDN. Персональные части страницы
+(меню пользователя, кнопка подписки, форма комментария) помечены
+атрибутом data-personal; вошедшим их подменяет скрипт из base.html,
+запрашивая фрагменты у posts:fragments.
+
+Ответ помечен no-cache: кеш хранит копию, но перед выдачей сверяет
+её с сервером (ETag и Last-Modified из posts.conditional). Со сроком
+годности автор после публикации видел бы страницу без своего поста.
+Пока у посетителя есть cookie PIN_COOKIE (недавно писал), ответ
+ещё и private: страницу из основной базы не раздают другим.
+
+Скрипт узнаёт, что пользователь вошёл, по cookie SIGNED_IN_COOKIE:
+её ставит и снимает SignedInCookieMiddleware. Cookie сессии
+недоступна скриптам, а читать её на сервере значит снова сделать
+страницу персональной.
+"""
+
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.models import AnonymousUser
+from django.utils.cache import patch_cache_control
+
+from .db_router import PIN_COOKIE
+
+SIGNED_IN_COOKIE = "signed_in"
+
+
+def shared_page(view):
+    """Декоратор вида: GET и HEAD отдают общую для всех оболочку."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view(request, *args, **kwargs)
+        request.shell = True
+        request.user = AnonymousUser()
+        response = view(request, *args, **kwargs)
+        if PIN_COOKIE in request.COOKIES:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    return wrapper
+
+
+class SignedInCookieMiddleware:
+    """Держит cookie SIGNED_IN_COOKIE в согласии с сессией.
+
+    Смотрит только на уже прочитанную сессию: вход и выход её читают,
+    а оболочки — нет и остаются без Set-Cookie.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, "session", None)
+        if session is None or not session.accessed:
+            return response
+        signed_in = SESSION_KEY in session
+        marked = SIGNED_IN_COOKIE in request.COOKIES
+        if signed_in and not marked:
+            response.set_cookie(
+                SIGNED_IN_COOKIE,
+                "1",
+                max_age=settings.SESSION_COOKIE_AGE,
+                samesite="Lax",
+            )
+        elif marked and not signed_in:
+            response.delete_cookie(SIGNED_IN_COOKIE)
+        return response
@@ -0,0 +1,122 @@
+"""Бюджеты запросов к базе и времени для страниц.
+
+QueryBudgetMixin.assertWithinBudget выполняет запрос и, если он
+превысил бюджет, падает со списком SQL и местом в коде (и шаблоне),
+откуда каждый запрос был выполнен.
+"""
+
+import sys
+import time
+import traceback
+from collections import namedtuple
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.template.base import Node
+
+Budget = namedtuple("Budget", ["queries", "seconds"], defaults=[1.0])
+Query = namedtuple("Query", ["sql", "seconds", "template", "stack"])
+
+STACK_DEPTH = 6
+
+
+def template_position(frame):
+    """Ближайший к запросу узел шаблона: «имя шаблона, строка»."""
+    while frame is not None:
+        # type(), а не isinstance: isinstance вычислил бы ленивые
+        # объекты вроде request.user прямо посреди запроса к базе.
+        node = frame.f_locals.get("self")
+        if issubclass(type(node), Node) and getattr(node, "origin", None):
+            return f"{node.origin.template_name}, строка {node.token.lineno}"
+        frame = frame.f_back
+    return None
+
+
+def project_stack(frame):
+    """Кадры стека из кода проекта, без Django и библиотек."""
+    return [
+        entry
+        for entry in traceback.extract_stack(frame)
+        if entry.filename.startswith(settings.BASE_DIR)
+        and "site-packages" not in entry.filename
+        and not entry.filename.endswith("query_budget.py")
+    ][-STACK_DEPTH:]
+
+
+class QueryRecorder:
+    """Обёртка execute_wrapper: запоминает SQL, время и стек вызова."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        frame = sys._getframe(1)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                Query(
+                    sql,
+                    time.perf_counter() - started,
+                    template_position(frame),
+                    project_stack(frame),
+                )
+            )
+
+    def report(self):
+        lines = []
+        for number, query in enumerate(self.queries, 1):
+            lines.append(
+                f"{number}. {query.sql} ({query.seconds * 1000:.2f} мс)"
+            )
+            if query.template:
+                lines.append(f"   шаблон {query.template}")
+            for entry in query.stack:
+                lines.append(
+                    f"   {entry.filename}:{entry.lineno} в {entry.name}"
+                )
+        return "\n".join(lines)
+
+
+class QueryBudgetMixin:
+    """Проверки бюджетов для TestCase.
+
+    Кеш очищается перед запросом: бюджет считается для холодного кеша,
+    то есть для худшего случая.
+    """
+
+    def measure(self, client, method, url, data=None):
+        recorder = QueryRecorder()
+        cache.clear()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(recorder)
+                )
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data or {})
+            elapsed = time.perf_counter() - started
+        return response, recorder, elapsed
+
+    def assertWithinBudget(self, name, budget, client, method, url, data=None):
+        response, recorder, elapsed = self.measure(client, method, url, data)
+        self.assertLess(
+            response.status_code,
+            400,
+            f"{name}: ответ {response.status_code}",
+        )
+        queries = len(recorder.queries)
+        if queries > budget.queries:
+            self.fail(
+                f"{name}: {queries} запросов при бюджете {budget.queries}\n"
+                + recorder.report()
+            )
+        if elapsed > budget.seconds:
+            self.fail(
+                f"{name}: {elapsed:.3f} с при бюджете {budget.seconds} с\n"
+                + recorder.report()
+            )
+        return recorder
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.db_router import PIN_COOKIE, ReplicaRouter
+from posts import conditional, feeds
+from posts.models import Post
+
+User = get_user_model()
+
+REPLICA = "replica"
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], REPLICA_PIN_SECONDS=10)
+class ReplicaRouterTest(TestCase):
+    """Чтение с реплики; реплику изображает отдельный файл SQLite,
+    в который данные из default не попадают."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[REPLICA] = {
+            **connections.databases["default"],
+            "NAME": os.path.join(cls.directory, "replica.sqlite3"),
+        }
+        with override_settings(DATABASE_REPLICAS=[]):
+            call_command("migrate", database=REPLICA, verbosity=0)
+        cls.author = User.objects.create_user(username="author")
+        cls.post = Post.objects.create(text="Тестовый пост", author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.client.cookies.pop(PIN_COOKIE, None)
+
+    def test_reads_go_to_replica(self):
+        """Страницы для чтения читают с реплики: поста там нет."""
+        response = self.client.get(reverse("posts:index"))
+        self.assertEqual(len(response.context["page_obj"]), 0)
+        response = self.client.get(
+            reverse("posts:post_detail", args=[self.post.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_writer_is_pinned_to_primary(self):
+        """После записи пользователь читает из основной базы:
+        новый пост сразу виден в профиле."""
+        response = self.client.post(
+            reverse("posts:post_create"), {"text": "Новый пост"}
+        )
+        self.assertEqual(response.cookies[PIN_COOKIE]["max-age"], 10)
+        response = self.client.get(
+            reverse("posts:profile", args=[self.author.username])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Новый пост")
+        self.client.cookies.pop(PIN_COOKIE)
+        response = self.client.get(
+            reverse("posts:profile", args=[self.author.username])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_lagging_replica_is_not_cached(self):
+        """Сразу после изменения прочитанное с реплики не попадает
+        в кеш лент и не получает валидаторов; позже — получает."""
+        replica_author = User.objects.using(REPLICA).create(
+            pk=self.author.pk, username=self.author.username
+        )
+        self.addCleanup(replica_author.delete)
+        feeds.bump_generation()
+        conditional.touch(f"profile:{self.author.pk}")
+        key = feeds.page_key("index", None)
+        profile = reverse("posts:profile", args=[self.author.username])
+        self.client.get(reverse("posts:index"))
+        self.assertIsNone(cache.get(key))
+        self.assertFalse(self.client.get(profile).has_header("ETag"))
+        with self.settings(REPLICA_PIN_SECONDS=0):
+            self.client.get(reverse("posts:index"))
+            self.assertIsNotNone(cache.get(key))
+            self.assertTrue(self.client.get(profile).has_header("ETag"))
+
+    def test_router(self):
+        """Запись и сессии — в основную базу, без пометки вида —
+        тоже; миграции на реплику не идут."""
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_write(Post))
+        self.assertIsNone(router.db_for_read(Post))
+        self.assertIsNone(router.db_for_read(Session))
+        self.assertFalse(router.allow_migrate(REPLICA, "posts"))
+        self.assertTrue(router.allow_migrate("default", "posts"))
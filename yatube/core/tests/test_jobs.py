@@ -0,0 +1,200 @@
+import json
+import re
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from constants import JOB_RETRY_DELAY
+from core import jobs
+from core.checks import jobs_cache_check, require_shared_cache
+from core.models import Job
+
+User = get_user_model()
+
+CALLS = []
+
+
+@jobs.task()
+def record(value):
+    CALLS.append(value)
+
+
+@jobs.task(max_attempts=2)
+def explode():
+    raise ValueError("сломалось")
+
+
+def plain():
+    pass
+
+
+@override_settings(JOBS_SYNC=False)
+class JobQueueTest(TestCase):
+    """Очередь фоновых задач в базе."""
+
+    def setUp(self):
+        CALLS.clear()
+
+    def run_worker(self):
+        worker = jobs.Worker(concurrency=0)
+        worker.run(burst=True)
+        return worker.processed
+
+    def test_sync_mode(self):
+        """В синхронном режиме задача выполняется сразу, без базы."""
+        with self.settings(JOBS_SYNC=True):
+            self.assertIsNone(jobs.enqueue(record, 1))
+        self.assertEqual(CALLS, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_only_tasks_are_queued(self):
+        """Поставить и выполнить можно только функции с task."""
+        with self.assertRaises(jobs.JobError):
+            jobs.enqueue(plain)
+        with self.assertRaises(jobs.JobError):
+            jobs.resolve(f"{__name__}.plain")
+
+    def test_priority_and_dedup(self):
+        """Задачи берутся по приоритету; дубль по ключу не ставится,
+        пока первая задача ждёт в очереди."""
+        low = jobs.enqueue(record, "low", priority=jobs.LOW)
+        first = jobs.enqueue(record, "high", key="same")
+        self.assertEqual(jobs.enqueue(record, "dup", key="same"), first)
+        urgent = jobs.enqueue(record, "urgent", priority=jobs.HIGH)
+        jobs.enqueue(record, "later", delay=60)
+        self.assertEqual(jobs.claim(10, "test"), [urgent.pk, first.pk, low.pk])
+
+    def test_enqueue_during_run(self):
+        """Пока задача выполняется, такая же ставится заново: первая
+        могла прочитать данные до нового изменения."""
+        first = jobs.enqueue(record, "first", key="same")
+        self.assertEqual(jobs.claim(1, "test"), [first.pk])
+        second = jobs.enqueue(record, "second", key="same")
+        self.assertNotEqual(second.pk, first.pk)
+        self.assertEqual(jobs.enqueue(record, "third", key="same"), second)
+        jobs.execute(first.pk)
+        self.assertEqual(self.run_worker(), 1)
+        self.assertEqual(CALLS, ["first", "second"])
+
+    def test_retry_yields_to_newer_job(self):
+        """Повтор упавшей задачи не ставится, если в очереди уже ждёт
+        задача с тем же ключом."""
+        job = jobs.enqueue(explode, key="explode")
+        jobs.claim(1, "test")
+        newer = jobs.enqueue(explode, key="explode")
+        jobs.execute(job.pk)
+        self.assertEqual(
+            list(Job.objects.values_list("pk", flat=True)), [newer.pk]
+        )
+
+    def test_worker_runs_and_removes_jobs(self):
+        """Выполненная задача удаляется из очереди."""
+        jobs.enqueue(record, "low", priority=jobs.LOW)
+        jobs.enqueue(record, "high", priority=jobs.HIGH)
+        self.assertEqual(self.run_worker(), 2)
+        self.assertEqual(CALLS, ["high", "low"])
+        self.assertFalse(Job.objects.exists())
+
+    def test_retry_with_backoff(self):
+        """Упавшая задача откладывается с растущей паузой,
+        а после последней попытки остаётся проваленной."""
+        job = jobs.enqueue(explode, key="explode")
+        started = timezone.now()
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreaterEqual(
+            job.run_at, started + timedelta(seconds=JOB_RETRY_DELAY)
+        )
+        self.assertIn("сломалось", job.last_error)
+        self.assertEqual(jobs.enqueue(explode, key="explode"), job)
+        self.assertEqual(self.run_worker(), 0)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("сломалось", job.last_error)
+        self.assertNotEqual(jobs.enqueue(explode, key="explode"), job)
+        self.assertGreater(jobs.backoff(3), 3 * JOB_RETRY_DELAY)
+
+    def test_stale_jobs_requeued(self):
+        """Задача умершего воркера возвращается в очередь."""
+        job = jobs.enqueue(record, 1)
+        jobs.claim(1, "dead")
+        self.assertEqual(jobs.requeue_stale(), 0)
+        Job.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - timedelta(days=1)
+        )
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(self.run_worker(), 1)
+        self.assertEqual(CALLS, [1])
+
+    def test_command(self):
+        """run_jobs --burst выполняет готовые задачи и выходит."""
+        jobs.enqueue(record, 1)
+        jobs.enqueue(record, 2)
+        output = StringIO()
+        call_command("run_jobs", burst=True, concurrency=0, stdout=output)
+        self.assertEqual(sorted(CALLS), [1, 2])
+        self.assertIn("Выполнено задач: 2", output.getvalue())
+
+    def test_password_reset_mail_is_queued(self):
+        """Письмо сброса пароля уходит из воркера, а не из запроса;
+        в аргументах задачи нет ссылки сброса."""
+        user = User.objects.create_user(
+            username="user", email="user@example.com", password="pass"
+        )
+        response = self.client.post(
+            reverse("users:password_reset_form"),
+            {"email": "user@example.com"},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        job = Job.objects.get()
+        self.assertEqual(job.task, "users.tasks.send_password_reset")
+        self.assertEqual(json.loads(job.args)[0], user.pk)
+        self.assertNotIn("/reset/", job.args)
+        self.assertEqual(self.run_worker(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["user@example.com"])
+        link = re.search(r"https?://\S+/reset/\S+/", mail.outbox[0].body)
+        response = self.client.get(link.group(0))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.endswith("/set-password/"))
+
+
+class JobsCacheCheckTest(TestCase):
+    """Воркер не запускается без общего для процессов кеша."""
+
+    LOCMEM = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    REDIS = {
+        "default": {
+            "BACKEND": "core.redis_cache.RedisCache",
+            "LOCATION": "redis://cache:6379/0",
+        }
+    }
+
+    def test_worker_needs_shared_cache(self):
+        with self.settings(JOBS_SYNC=False, CACHES=self.LOCMEM):
+            errors = jobs_cache_check(None)
+        self.assertEqual([error.id for error in errors], ["core.E001"])
+        with self.settings(JOBS_SYNC=False, CACHES=self.LOCMEM):
+            with self.assertRaises(ImproperlyConfigured):
+                require_shared_cache()
+
+    def test_sync_or_shared_cache_pass(self):
+        with self.settings(JOBS_SYNC=True, CACHES=self.LOCMEM):
+            self.assertEqual(jobs_cache_check(None), [])
+        with self.settings(JOBS_SYNC=False, CACHES=self.REDIS):
+            self.assertEqual(jobs_cache_check(None), [])
@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import Histogram, registry
+from posts.models import Post
+
+User = get_user_model()
+
+
+class MetricsMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+        Post.objects.create(text="Тестовый пост", author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+
+    def timings(self, response):
+        timings = {}
+        for entry in response["Server-Timing"].split(", "):
+            name, *params = entry.split(";")
+            timings[name] = dict(param.split("=", 1) for param in params)
+        return timings
+
+    def test_server_timing_header(self):
+        """Заголовок Server-Timing содержит SQL, шаблоны, кеш и итог."""
+        timings = self.timings(self.client.get(reverse("posts:index")))
+        self.assertRegex(timings["db"]["desc"], r'^"[1-9]\d* queries"$')
+        self.assertGreater(float(timings["tpl"]["dur"]), 0)
+        self.assertEqual(timings["cache"]["desc"], '"0 hits / 2 misses"')
+        self.assertGreaterEqual(
+            float(timings["total"]["dur"]), float(timings["db"]["dur"])
+        )
+        timings = self.timings(self.client.get(reverse("posts:index")))
+        self.assertEqual(timings["cache"]["desc"], '"2 hits / 0 misses"')
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_endpoint(self):
+        """/metrics отдаёт гистограммы по имени URL в формате Prometheus."""
+        self.client.get(reverse("posts:index"))
+        self.client.get(reverse("posts:index"))
+        self.client.get("/missing-page/")
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4")
+        body = response.content.decode()
+        self.assertIn("# TYPE yatube_request_duration_seconds histogram", body)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            body,
+        )
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="+Inf"} 2', body
+        )
+        self.assertIn(
+            'yatube_requests_total{view="posts:index",status="200"} 2', body
+        )
+        self.assertIn(
+            'yatube_requests_total{view="unresolved",status="404"} 1', body
+        )
+        self.assertIn('yatube_cache_hits_total{view="posts:index"} 2', body)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        """С METRICS_TOKEN метрики отдаются только с токеном."""
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong"
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_metrics_closed_without_token(self):
+        """Без METRICS_TOKEN метрики видит только персонал."""
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer None"
+        )
+        self.assertEqual(response.status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        staff = User.objects.create_user(username="staff", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 200)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Значения корзин гистограммы накапливаются."""
+        histogram = Histogram((1, 5))
+        for value in (0.5, 3, 3, 10):
+            histogram.observe(value)
+        self.assertEqual(
+            list(histogram.samples()), [("1", 1), ("5", 3), ("+Inf", 4)]
+        )
+        self.assertEqual(histogram.sum, 16.5)
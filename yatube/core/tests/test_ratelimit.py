@@ -0,0 +1,134 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.shortcuts import render
+from django.urls import reverse
+
+from constants import SHED_RETRY_AFTER, SHED_WINDOW
+from core.ratelimit import parse_rate, take
+from core.shedding import OVERLOADED_KEY, LoadSheddingMiddleware
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(
+    RATELIMITS={"add_comment": "2/m", "signup": "1/h"},
+    REAL_IP_HEADER="HTTP_X_REAL_IP",
+)
+class RateLimitTest(TestCase):
+    """Token bucket на запросы записи."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="writer")
+        cls.other = User.objects.create_user(username="other")
+        cls.post = Post.objects.create(text="Пост", author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        # Пустые вёдра с маленькими лимитами не должны доставаться
+        # другим тестам: id пользователей в TestCase повторяются.
+        cache.clear()
+
+    def test_bucket(self):
+        """Ведро отдаёт ёмкость подряд и пополняется со временем."""
+        self.assertEqual(parse_rate("10/m"), (10, 10 / 60))
+        self.assertEqual(take("bucket", 2, 1, now=100), 0)
+        self.assertEqual(take("bucket", 2, 1, now=100), 0)
+        self.assertEqual(take("bucket", 2, 1, now=100), 1)
+        self.assertAlmostEqual(take("bucket", 2, 1, now=100.5), 0.5)
+        self.assertEqual(take("bucket", 2, 1, now=101), 0)
+
+    def comment(self, user):
+        client = Client()
+        client.force_login(user)
+        return client.post(
+            reverse("posts:add_comment", args=[self.post.pk]),
+            {"text": "Комментарий"},
+        )
+
+    def test_limits_per_user(self):
+        """Сверх лимита — 429 с Retry-After, у другого
+        пользователя своё ведро."""
+        self.assertEqual(self.comment(self.user).status_code, 302)
+        self.assertEqual(self.comment(self.user).status_code, 302)
+        response = self.comment(self.user)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertTemplateUsed(response, "core/429.html")
+        self.assertEqual(self.comment(self.other).status_code, 302)
+        self.assertEqual(Comment.objects.count(), 3)
+
+    def test_limits_anonymous_per_ip(self):
+        """Регистрация ограничена по адресу клиента от прокси;
+        GET формы не тратит жетонов."""
+        url = reverse("users:signup")
+        client = Client(HTTP_X_REAL_IP="10.0.0.1")
+        self.assertEqual(client.get(url).status_code, 200)
+        self.assertEqual(client.post(url, {}).status_code, 200)
+        self.assertEqual(client.post(url, {}).status_code, 429)
+        self.assertEqual(client.get(url).status_code, 200)
+        other = Client(HTTP_X_REAL_IP="10.0.0.2")
+        self.assertEqual(other.post(url, {}).status_code, 200)
+
+
+class LoadSheddingTest(TestCase):
+    """Сброс второстепенных запросов по p99 задержки."""
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_sheds_low_priority_views_when_slow(self):
+        """После окна медленных запросов второстепенные виды
+        получают 503 во всех процессах, остальные обслуживаются."""
+        search_url = reverse("posts:search")
+        index_url = reverse("posts:index")
+        with mock.patch("core.shedding.SHED_WINDOW", 5), override_settings(
+            SHED_P99_THRESHOLD=0.05
+        ):
+            client = Client()
+            other_worker = Client()
+            self.assertEqual(client.get(search_url).status_code, 200)
+            with mock.patch("posts.views.render", slow(render)):
+                for _ in range(5):
+                    self.assertEqual(client.get(index_url).status_code, 200)
+            response = client.get(search_url)
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], str(SHED_RETRY_AFTER))
+            self.assertEqual(other_worker.get(search_url).status_code, 503)
+            self.assertEqual(client.get(index_url).status_code, 200)
+            cache.delete(OVERLOADED_KEY)
+            self.assertEqual(client.get(search_url).status_code, 200)
+
+    @override_settings(SHED_P99_THRESHOLD=0.05)
+    def test_single_slow_request_or_write_does_not_shed(self):
+        """Один медленный запрос на окно отметку перегрузки не ставит,
+        а запись в окно не попадает."""
+        middleware = LoadSheddingMiddleware(slow(lambda request: None))
+        for duration in [1.0] + [0.01] * (SHED_WINDOW - 1):
+            middleware.record(duration)
+        self.assertIsNone(cache.get(OVERLOADED_KEY))
+        middleware(RequestFactory().post("/create/"))
+        self.assertEqual(len(middleware.durations), SHED_WINDOW)
+        self.assertEqual(max(middleware.durations), 1.0)
+        for duration in [1.0] * 3:
+            middleware.record(duration)
+        self.assertTrue(cache.get(OVERLOADED_KEY))
+
+
+def slow(function):
+    def wrapper(*args, **kwargs):
+        time.sleep(0.1)
+        return function(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,143 @@
+import socket
+import time
+
+from django.test import SimpleTestCase
+
+from core.fake_redis import FakeRedisServer
+from core.redis_cache import COMPRESSED, RedisCache, RedisError
+
+
+class RedisCacheTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer(password="secret").start()
+        host, port = cls.server.address
+        cls.cache = RedisCache(
+            f"redis://:secret@{host}:{port}/1",
+            {"OPTIONS": {"MAX_CONNECTIONS": 2}},
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cache.pool.disconnect()
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache.clear()
+
+    def test_get_set_delete(self):
+        """Базовые операции кеша."""
+        self.cache.set("key", {"value": [1, 2]})
+        self.assertEqual(self.cache.get("key"), {"value": [1, 2]})
+        self.assertTrue(self.cache.has_key("key"))
+        self.cache.delete("key")
+        self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(self.cache.get("key", "default"), "default")
+
+    def test_add_only_sets_missing_key(self):
+        """add не перезаписывает существующий ключ."""
+        self.assertTrue(self.cache.add("lock", 1))
+        self.assertFalse(self.cache.add("lock", 2))
+        self.assertEqual(self.cache.get("lock"), 1)
+
+    def test_incr(self):
+        """incr атомарно увеличивает число и падает на пустом ключе."""
+        with self.assertRaises(ValueError):
+            self.cache.incr("counter")
+        self.cache.set("counter", 5)
+        self.assertEqual(self.cache.incr("counter", 3), 8)
+        self.assertEqual(self.cache.get("counter"), 8)
+        self.cache.set("expiring", 1, timeout=0.05)
+        time.sleep(0.1)
+        with self.assertRaises(ValueError):
+            self.cache.incr("expiring")
+        self.assertFalse(self.cache.has_key("expiring"))
+
+    def test_get_many_set_many(self):
+        """get_many и set_many работают одним пакетом команд."""
+        self.cache.set_many({"a": 1, "b": "два", "c": None})
+        self.assertEqual(
+            self.cache.get_many(["a", "b", "c", "missing"]),
+            {"a": 1, "b": "два", "c": None},
+        )
+        self.cache.delete_many(["a", "b"])
+        self.assertEqual(self.cache.get_many(["a", "b", "c"]), {"c": None})
+
+    def test_large_values_are_compressed(self):
+        """Большие значения хранятся сжатыми."""
+        value = "пост " * 1000
+        self.cache.set("big", value)
+        raw = self.cache.pipeline([[b"GET", self.cache.make_key("big")]])[0]
+        self.assertTrue(raw.startswith(COMPRESSED))
+        self.assertLess(len(raw), len(value))
+        self.assertEqual(self.cache.get("big"), value)
+
+    def test_timeouts(self):
+        """Ключи истекают по таймауту, timeout=0 не сохраняет ключ."""
+        self.cache.set("short", 1, timeout=0.05)
+        self.cache.set("zero", 1, timeout=0)
+        self.cache.set("forever", 1, timeout=None)
+        time.sleep(0.1)
+        self.assertEqual(
+            self.cache.get_many(["short", "zero", "forever"]), {"forever": 1}
+        )
+
+    def test_connections_are_reused(self):
+        """Соединения возвращаются в пул и переиспользуются."""
+        for i in range(10):
+            self.cache.set(f"key{i}", i)
+        self.assertLessEqual(self.cache.pool.idle.qsize(), 2)
+        self.assertEqual(self.cache.get("key9"), 9)
+
+    def test_password_and_database(self):
+        """Соединение проходит AUTH и SELECT; с неверным паролем
+        команды не выполняются."""
+        self.cache.set("key", 1)
+        self.assertIn(
+            self.cache.make_key("key").encode(), self.server.store.db(1)
+        )
+        host, port = self.server.address
+        stranger = RedisCache(f"redis://:wrong@{host}:{port}/1", {})
+        with self.assertRaises(RedisError):
+            stranger.get("key")
+
+    def test_stale_connection_is_retried(self):
+        """Разорванное соединение из пула заменяется новым,
+        команда повторяется один раз."""
+        self.cache.set("key", 1)
+        for conn in list(self.cache.pool.idle.queue):
+            conn.sock.shutdown(socket.SHUT_RDWR)
+        self.assertEqual(self.cache.get("key"), 1)
+        self.assertEqual(self.cache.get("key"), 1)
+
+    def test_clear_keeps_foreign_keys(self):
+        """clear удаляет только ключи со своим KEY_PREFIX."""
+        host, port = self.server.address
+        neighbour = RedisCache(
+            f"redis://:secret@{host}:{port}/1", {"KEY_PREFIX": "other*"}
+        )
+        self.addCleanup(neighbour.pool.disconnect)
+        self.cache.set("key", 1)
+        neighbour.set("key", 2)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(neighbour.get("key"), 2)
+        neighbour.clear()
+        self.assertIsNone(neighbour.get("key"))
+
+    def test_reads_fail_open(self):
+        """Без сервера чтение отвечает как промах и пишет в лог,
+        запись падает."""
+        with socket.socket() as closed:
+            closed.bind(("127.0.0.1", 0))
+            port = closed.getsockname()[1]
+        offline = RedisCache(f"redis://127.0.0.1:{port}/0", {})
+        with self.assertLogs("core.redis_cache", "WARNING") as logs:
+            self.assertEqual(offline.get("key", "default"), "default")
+            self.assertEqual(offline.get_many(["a", "b"]), {})
+            self.assertFalse(offline.has_key("key"))
+        self.assertEqual(len(logs.output), 3)
+        with self.assertRaises(OSError):
+            offline.set("key", 1)
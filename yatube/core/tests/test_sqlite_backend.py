@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import SimpleTestCase
+
+from core.backends.sqlite3.base import DatabaseWrapper
+
+
+class SQLiteProfileTest(SimpleTestCase):
+    """Профиль SQLite применяется к каждому новому соединению."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.name = os.path.join(self.directory, "db.sqlite3")
+
+    def wrapper(self, **options):
+        wrapper = DatabaseWrapper(
+            {
+                "ENGINE": "core.backends.sqlite3",
+                "NAME": self.name,
+                "OPTIONS": {
+                    "pragmas": {
+                        "journal_mode": "wal",
+                        "synchronous": "normal",
+                        "busy_timeout": 50,
+                    },
+                    "transaction_mode": "IMMEDIATE",
+                    **options,
+                },
+                "ATOMIC_REQUESTS": False,
+                "AUTOCOMMIT": True,
+                "CONN_MAX_AGE": 0,
+                "TIME_ZONE": None,
+                "TEST": {},
+            }
+        )
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """WAL, synchronous=NORMAL и busy_timeout из OPTIONS."""
+        wrapper = self.wrapper()
+        self.assertEqual(self.pragma(wrapper, "journal_mode"), "wal")
+        self.assertEqual(self.pragma(wrapper, "synchronous"), 1)
+        self.assertEqual(self.pragma(wrapper, "busy_timeout"), 50)
+
+    def test_atomic_takes_write_lock(self):
+        """transaction.atomic начинается с BEGIN IMMEDIATE: вторая
+        транзакция ждёт, а не падает посреди записи."""
+        first, second = self.wrapper(), self.wrapper()
+        with first.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (id INTEGER PRIMARY KEY)")
+        first.set_autocommit(True)
+        first._start_transaction_under_autocommit()
+        self.assertTrue(first.connection.in_transaction)
+        with self.assertRaises(OperationalError):
+            second._start_transaction_under_autocommit()
+        first.connection.rollback()
+
+    def test_busy_retry(self):
+        """Запрос вне транзакции повторяется, пока база занята."""
+        holder = self.wrapper()
+        with holder.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (id INTEGER PRIMARY KEY)")
+            cursor.execute("BEGIN IMMEDIATE")
+        threading.Timer(0.1, holder.connection.rollback).start()
+        writer = self.wrapper(busy_retries=3)
+        with writer.cursor() as cursor:
+            cursor.execute("INSERT INTO item VALUES (1)")
+        self.assertEqual(self.pragma(writer, "busy_timeout"), 50)
+        impatient = self.wrapper(busy_retries=0)
+        with holder.cursor() as cursor:
+            cursor.execute("BEGIN IMMEDIATE")
+        with self.assertRaises(OperationalError):
+            with impatient.cursor() as cursor:
+                cursor.execute("INSERT INTO item VALUES (2)")
+        holder.connection.rollback()
+
+    def test_health_check(self):
+        """С health_checks неживое соединение заменяется в начале
+        запроса, без них — остаётся до ошибки."""
+        wrapper = self.wrapper(health_checks=True)
+        wrapper.settings_dict["CONN_MAX_AGE"] = None
+        wrapper.ensure_connection()
+        first = wrapper.connection
+        wrapper.close_if_unusable_or_obsolete()
+        with mock.patch.object(wrapper, "is_usable", return_value=False):
+            self.pragma(wrapper, "busy_timeout")
+        self.assertIsNot(wrapper.connection, first)
+        unchecked = self.wrapper()
+        unchecked.settings_dict["CONN_MAX_AGE"] = None
+        unchecked.ensure_connection()
+        first = unchecked.connection
+        unchecked.close_if_unusable_or_obsolete()
+        with mock.patch.object(unchecked, "is_usable", return_value=False):
+            self.pragma(unchecked, "busy_timeout")
+        self.assertIs(unchecked.connection, first)
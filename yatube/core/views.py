@@ -1,5 +1,12 @@
+import hmac
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from core.metrics import registry
+
 
 def page_not_found(request, exception):
     return render(request, "core/404.html", {"path": request.path}, status=404)
@@ -7,3 +14,25 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=""):
     return render(request, "core/403csrf.html")
+
+
+def permission_denied(request, exception):
+    return render(request, "core/403.html", {"path": request.path}, status=403)
+
+
+def metrics(request):
+    """Метрики Prometheus: для сборщика с токеном METRICS_TOKEN
+    и для персонала. Без токена в настройках — только персоналу."""
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get("HTTP_AUTHORIZATION", "")
+    allowed = request.user.is_staff or (
+        token
+        and hmac.compare_digest(
+            authorization.encode(), f"Bearer {token}".encode()
+        )
+    )
+    if not allowed:
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4"
+    )
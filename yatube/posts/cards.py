@@ -0,0 +1,121 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from constants import CARD_CACHE_TIMEOUT, CARD_STATS_FLUSH_INTERVAL
+from core.metrics import count_cache
+
+CARD_TEMPLATE = "includes/post_card.html"
+HITS_KEY = "post-card:hits"
+MISSES_KEY = "post-card:misses"
+
+# Счётчики попаданий копятся в процессе и уходят в кеш пачкой
+# не чаще раза в CARD_STATS_FLUSH_INTERVAL секунд, а не двумя incr
+# на каждую страницу.
+_pending = {HITS_KEY: 0, MISSES_KEY: 0}
+_pending_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def version_key(kind, pk):
+    return f"post-card:version:{kind}:{pk}"
+
+
+# Версии хранятся без срока: истёкшая версия разом сбросила бы все
+# зависящие от неё карточки. Сбросы воркера веб-процессы видят через
+# общий кеш (core.checks).
+ALL_VERSION_KEY = version_key("all", 0)
+
+
+def invalidate(kind, pk):
+    """Меняет версию поста, автора или группы: их карточки устаревают."""
+    cache.set(version_key(kind, pk), time.time_ns(), None)
+
+
+def invalidate_all():
+    """Делает устаревшими все карточки, не трогая остальной кеш."""
+    cache.set(ALL_VERSION_KEY, time.time_ns(), None)
+
+
+def _versions(posts):
+    keys = {ALL_VERSION_KEY}
+    for post in posts:
+        keys.add(version_key("post", post.pk))
+        keys.add(version_key("author", post.author_id))
+        if post.group_id:
+            keys.add(version_key("group", post.group_id))
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys - versions.keys()}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def card_key(post, versions):
+    return "post-card:{}:{}:{}:{}:{}".format(
+        post.pk,
+        versions[version_key("post", post.pk)],
+        versions[version_key("author", post.author_id)],
+        versions.get(version_key("group", post.group_id), 0),
+        versions[ALL_VERSION_KEY],
+    )
+
+
+def _count(hits, misses):
+    with _pending_lock:
+        _pending[HITS_KEY] += hits
+        _pending[MISSES_KEY] += misses
+        due = time.monotonic() - _flushed_at >= CARD_STATS_FLUSH_INTERVAL
+    if due:
+        flush()
+
+
+def flush():
+    """Переносит накопленные в процессе счётчики в кеш."""
+    global _flushed_at
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.update(dict.fromkeys(_pending, 0))
+        _flushed_at = time.monotonic()
+    for key, value in pending.items():
+        if not value:
+            continue
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            cache.add(key, value, None)
+
+
+def render_cards(posts):
+    """Возвращает HTML карточек постов, рендеря только отсутствующие в кеше.
+
+    Кеш читается и пополняется двумя пакетными запросами на страницу.
+    """
+    posts = list(posts)
+    versions = _versions(posts)
+    keys = [card_key(post, versions) for post in posts]
+    cached = cache.get_many(keys)
+    rendered = {}
+    for post, key in zip(posts, keys):
+        if key not in cached:
+            rendered[key] = render_to_string(CARD_TEMPLATE, {"post": post})
+    if rendered:
+        cache.set_many(rendered, CARD_CACHE_TIMEOUT)
+    count_cache(hits=len(cached), misses=len(rendered))
+    _count(len(cached), len(rendered))
+    cached.update(rendered)
+    return [cached[key] for key in keys]
+
+
+def stats():
+    """Счётчики попаданий и промахов кеша карточек. Другие процессы
+    досылают свои не позже чем через CARD_STATS_FLUSH_INTERVAL."""
+    flush()
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {
+        "hits": counters.get(HITS_KEY, 0),
+        "misses": counters.get(MISSES_KEY, 0),
+    }
@@ -0,0 +1,147 @@
+"""Условные GET-запросы: ETag и Last-Modified без запроса страницы.
+
+Валидаторы собираются из версий «областей» в кеше: поста, группы,
+профиля автора и всего сайта. Версия — время последнего изменения
+в наносекундах, её сдвигают сигналы моделей. Проверка стоит двух
+обращений к кешу и не трогает базу, 304 отдаётся до запроса ленты
+и рендеринга шаблона.
+
+Страницы общие для всех посетителей (core.shell), поэтому валидатор
+не зависит от пользователя.
+"""
+
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+from core.db_router import replica_may_lag
+
+from .models import Group, Post, User
+
+SITE = "site"
+
+
+def version_key(scope):
+    return f"page-version:{scope}"
+
+
+def touch(*scopes):
+    """Отмечает, что страницы этих областей изменились."""
+    now = time.time_ns()
+    cache.set_many({version_key(scope): now for scope in scopes}, None)
+
+
+def versions(scopes):
+    """Версии областей; отсутствующие в кеше считаются изменёнными сейчас."""
+    keys = [version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def page_versions(request, scopes_func, kwargs):
+    """Версии областей страницы или None, если валидаторов не будет:
+    объекта нет или реплика могла ещё не получить изменение."""
+    if not hasattr(request, "_page_versions"):
+        scopes = scopes_func(**kwargs)
+        found = versions([SITE, *scopes]) if scopes is not None else None
+        if found is not None and replica_may_lag(max(found)):
+            found = None
+        request._page_versions = found
+    return request._page_versions
+
+
+def conditional_page(scopes_func):
+    """Декоратор вида: условный GET по версиям областей.
+
+    scopes_func(**kwargs) возвращает области страницы или None, если
+    объекта нет — тогда проверка пропускается и вид сам отдаст 404.
+    """
+
+    def etag(request, **kwargs):
+        found = page_versions(request, scopes_func, kwargs)
+        if found is None:
+            return None
+        raw = "|".join([*map(str, found), request.get_full_path()])
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        found = page_versions(request, scopes_func, kwargs)
+        if found is None:
+            return None
+        # В заголовке только секунды: время округляется вверх, и пока
+        # эта секунда не кончилась, заголовка нет. Иначе изменение
+        # в ту же секунду дало бы тот же Last-Modified и устаревший 304
+        # клиенту, который шлёт только If-Modified-Since.
+        seconds = -(-max(found) // 10**9)
+        if time.time() < seconds:
+            return None
+        return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def scope_key(key):
+    # slug и username приходят из URL: в ключе кеша только их хеш,
+    # иначе длина и символы не подходят memcached (CacheKeyWarning).
+    return "page-scope:" + hashlib.md5(key.encode()).hexdigest()
+
+
+def cached_id(key, queryset, field="id"):
+    """id объекта по его slug или username, из кеша или из базы.
+
+    Ключ удаляют сигналы при создании, переименовании и удалении
+    объекта, иначе прежний или повторно занятый slug или username
+    указывал бы на старый id.
+    """
+    key = scope_key(key)
+    found = cache.get(key)
+    if found is None:
+        found = queryset.values_list(field, flat=True).first()
+        if found is not None:
+            cache.set(key, found, None)
+    return found
+
+
+def forget(*keys):
+    cache.delete_many([scope_key(key) for key in keys])
+
+
+def group_scopes(slug):
+    group_id = cached_id(f"group:{slug}", Group.objects.filter(slug=slug))
+    return None if group_id is None else [f"group:{group_id}"]
+
+
+def profile_scopes(username):
+    user_id = cached_id(
+        f"user:{username}", User.objects.filter(username=username)
+    )
+    return None if user_id is None else [f"profile:{user_id}"]
+
+
+def post_scopes(post_id):
+    author_id = cached_id(
+        f"post-author:{post_id}",
+        Post.objects.filter(pk=post_id),
+        "author_id",
+    )
+    if author_id is None:
+        return None
+    return [f"post:{post_id}", f"profile:{author_id}"]
+
+
+def post_scopes_changed(post, group_ids=()):
+    """Области, которые задевает изменение поста или его комментариев."""
+    scopes = {f"post:{post.pk}", f"profile:{post.author_id}"}
+    scopes.update(
+        f"group:{group_id}"
+        for group_id in (post.group_id, *group_ids)
+        if group_id
+    )
+    return scopes
@@ -0,0 +1,77 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post
+
+
+def bump(model, filters, field, delta):
+    """Атомарно меняет счётчик на delta через F-выражение.
+
+    Счётчик не уходит ниже нуля: при расхождении его чинит
+    команда rebuild_counters.
+    """
+    queryset = model.objects.filter(**filters)
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def bump_author(user_id, field, delta):
+    if bump(AuthorStats, {"user_id": user_id}, field, delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(user_id=user_id, **{field: delta})
+    except IntegrityError:
+        bump(AuthorStats, {"user_id": user_id}, field, delta)
+
+
+def author_stats(user):
+    """Счётчики автора; пустые, если он ещё ничего не публиковал."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(user=user)
+
+
+def totals_by_author(model):
+    """{author_id: число строк} одним сгруппированным запросом."""
+    return dict(
+        model.objects.order_by()
+        .values("author_id")
+        .annotate(total=Count("id"))
+        .values_list("author_id", "total")
+    )
+
+
+def rebuild():
+    """Пересчитывает все счётчики по данным из таблиц.
+
+    Посты и подписчиков считают отдельные запросы: JOIN обеих таблиц
+    к пользователям дал бы на автора posts × followers строк.
+    """
+    posts = totals_by_author(Post)
+    followers = totals_by_author(Follow)
+    with transaction.atomic():
+        AuthorStats.objects.all().delete()
+        AuthorStats.objects.bulk_create(
+            AuthorStats(
+                user_id=user_id,
+                posts_count=posts.get(user_id, 0),
+                followers_count=followers.get(user_id, 0),
+            )
+            for user_id in posts.keys() | followers.keys()
+        )
+        Post.objects.update(
+            comments_count=Coalesce(
+                Subquery(
+                    Comment.objects.filter(post=OuterRef("pk"))
+                    .order_by()
+                    .values("post")
+                    .annotate(total=Count("id"))
+                    .values("total")
+                ),
+                0,
+            )
+        )
@@ -0,0 +1,93 @@
+import hashlib
+import math
+import random
+import time
+
+from django.core.cache import cache
+
+from constants import FEED_CACHE_TIMEOUT, FEED_LOCK_TIMEOUT, SHOW_TEN
+from core.db_router import replica_may_lag
+from core.metrics import count_cache
+from core.paginator import CursorPaginator
+
+GENERATION_KEY = "feed:generation"
+EARLY_REFRESH_BETA = 1.0
+
+
+def bump_generation():
+    """Делает устаревшими все закешированные страницы лент."""
+    generation = time.time_ns()
+    cache.set(GENERATION_KEY, generation, None)
+    return generation
+
+
+def page_key(feed, cursor):
+    digest = hashlib.md5((cursor or "").encode()).hexdigest()
+    return f"feed:{feed}:{digest}"
+
+
+def expires_early(entry):
+    """Вероятностное раннее обновление (XFetch).
+
+    Чем ближе срок годности и чем дольше пересчёт, тем выше шанс,
+    что этот запрос обновит страницу заранее, пока остальные
+    ещё получают кеш.
+    """
+    jitter = -math.log(1.0 - random.random())
+    early = entry["delta"] * EARLY_REFRESH_BETA * jitter
+    return time.time() + early >= entry["expires"]
+
+
+def restore(queryset, entry, per_page):
+    count_cache(hits=1)
+    posts = queryset.in_bulk(entry["ids"])
+    rows = [posts[pk] for pk in entry["ids"] if pk in posts]
+    return CursorPaginator(queryset, per_page).restore(rows, entry["state"])
+
+
+def compute(queryset, cursor, per_page, key, generation):
+    count_cache(misses=1)
+    started = time.monotonic()
+    paginator = CursorPaginator(queryset, per_page)
+    page = paginator.get_page(cursor)
+    entry = {
+        "generation": generation,
+        "ids": [post.pk for post in page.object_list],
+        "state": paginator.state(page),
+        "delta": time.monotonic() - started,
+        "expires": time.time() + FEED_CACHE_TIMEOUT,
+    }
+    # Реплика могла не получить изменение, сменившее поколение:
+    # такой список id не должен попасть в кеш под новым поколением.
+    if not replica_may_lag(generation):
+        cache.set(key, entry, FEED_CACHE_TIMEOUT * 2)
+    return page
+
+
+def feed_page(feed, queryset, cursor, per_page=SHOW_TEN):
+    """Страница ленты, список id которой хранится в кеше.
+
+    Запись действительна, пока не сменилось поколение (оно меняется
+    при сохранении и удалении постов). Пересчитывает запись один
+    воркер под блокировкой, остальные в это время отдают прежний
+    список id.
+    """
+    key = page_key(feed, cursor)
+    found = cache.get_many([GENERATION_KEY, key])
+    generation = found.get(GENERATION_KEY) or bump_generation()
+    entry = found.get(key)
+    if (
+        entry
+        and entry["generation"] == generation
+        and not expires_early(entry)
+    ):
+        return restore(queryset, entry, per_page)
+    lock = f"{key}:lock"
+    if not cache.add(lock, True, FEED_LOCK_TIMEOUT):
+        if entry:
+            return restore(queryset, entry, per_page)
+        return compute(queryset, cursor, per_page, key, generation)
+    try:
+        return compute(queryset, cursor, per_page, key, generation)
+    finally:
+        cache.delete(lock)
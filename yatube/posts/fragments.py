@@ -0,0 +1,66 @@
+"""Персональные фрагменты страниц-оболочек (см. core.shell).
+
+Каждый фрагмент — функция от запроса, возвращающая шаблон и контекст
+или None, если параметров не хватает. Корневой элемент шаблона несёт
+тот же data-personal, что и место на странице, и заменяет его целиком.
+"""
+
+import uuid
+
+from django.template.loader import render_to_string
+
+from .forms import CommentForm
+from .models import Follow
+
+
+def user_menu(request):
+    return "includes/user_menu.html", {}
+
+
+def switcher(request):
+    return "includes/switcher.html", {}
+
+
+def follow_button(request):
+    username = request.GET.get("author")
+    if not username:
+        return None
+    following = (
+        request.user.is_authenticated
+        and Follow.objects.filter(
+            user=request.user, author__username=username
+        ).exists()
+    )
+    context = {"author_username": username, "following": following}
+    return "includes/follow_button.html", context
+
+
+def comment_form(request):
+    post_id = request.GET.get("post", "")
+    if not post_id.isdigit():
+        return None
+    context = {
+        "post_id": int(post_id),
+        "form": CommentForm(),
+        "idempotency_key": uuid.uuid4().hex,
+    }
+    return "includes/comment_form.html", context
+
+
+FRAGMENTS = {
+    "user_menu": user_menu,
+    "switcher": switcher,
+    "follow": follow_button,
+    "comment_form": comment_form,
+}
+
+
+def render_fragments(request, names):
+    """HTML запрошенных фрагментов по именам; неизвестные пропускаются."""
+    rendered = {}
+    for name in names:
+        found = FRAGMENTS[name](request) if name in FRAGMENTS else None
+        if found is not None:
+            template, context = found
+            rendered[name] = render_to_string(template, context, request)
+    return rendered
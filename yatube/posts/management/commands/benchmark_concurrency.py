@@ -0,0 +1,139 @@
+import json
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from constants import COMMENTS_PER_PAGE, SHOW_TEN
+from core.benchmark import latency_summary
+from posts.models import Comment, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет чтение ленты и комментариев несколькими потоками "
+        "сначала без записи, затем вместе с потоками, пишущими "
+        "комментарии, и печатает пропускную способность в JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument(
+            "--seconds", type=float, default=5, help="Длительность фазы"
+        )
+        parser.add_argument("--output", help="Файл для отчёта вместо stdout")
+
+    def handle(self, *args, **options):
+        self.post_ids = list(
+            Post.objects.order_by("-id").values_list("id", flat=True)[:1000]
+        )
+        self.user_ids = list(User.objects.values_list("id", flat=True)[:1000])
+        if not self.post_ids or not self.user_ids:
+            raise CommandError("База пуста, сначала запустите seed_data")
+        connection.close()
+        baseline = self.phase(options["readers"], 0, options["seconds"])
+        loaded = self.phase(
+            options["readers"], options["writers"], options["seconds"]
+        )
+        report = {
+            "database": {
+                "vendor": connection.vendor,
+                "journal_mode": self.pragma("journal_mode"),
+            },
+            "readers": options["readers"],
+            "writers": options["writers"],
+            "seconds": options["seconds"],
+            "reads_only": baseline,
+            "reads_with_writes": loaded,
+            "read_throughput_ratio": round(
+                loaded["reads_per_second"]
+                / max(baseline["reads_per_second"], 1e-9),
+                3,
+            ),
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def pragma(self, name):
+        if connection.vendor != "sqlite":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def phase(self, readers, writers, seconds):
+        """Запускает потоки на seconds секунд и сводит их результаты."""
+        deadline = time.monotonic() + seconds
+        results = {"read": [], "write": [], "errors": 0}
+        lock = threading.Lock()
+        threads = [
+            threading.Thread(
+                target=self.worker,
+                args=(self.read, "read", deadline, results, lock, seed),
+            )
+            for seed in range(readers)
+        ] + [
+            threading.Thread(
+                target=self.worker,
+                args=(self.write, "write", deadline, results, lock, seed),
+            )
+            for seed in range(readers, readers + writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        summary = {
+            "reads": len(results["read"]),
+            "reads_per_second": round(len(results["read"]) / seconds, 1),
+            "writes": len(results["write"]),
+            "writes_per_second": round(len(results["write"]) / seconds, 1),
+            "errors": results["errors"],
+        }
+        if results["read"]:
+            summary["read_latency"] = latency_summary(results["read"])
+        if results["write"]:
+            summary["write_latency"] = latency_summary(results["write"])
+        return summary
+
+    def worker(self, action, kind, deadline, results, lock, seed):
+        """Повторяет action до срока; у каждого потока своё соединение."""
+        rng = random.Random(seed)
+        timings = []
+        errors = 0
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    action(rng)
+                except OperationalError:
+                    errors += 1
+                    continue
+                timings.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        with lock:
+            results[kind].extend(timings)
+            results["errors"] += errors
+
+    def read(self, rng):
+        list(Post.objects.for_feed()[:SHOW_TEN])
+        list(
+            Comment.objects.filter(post_id=rng.choice(self.post_ids))
+            .select_related("author")
+            .order_by("created", "id")[:COMMENTS_PER_PAGE]
+        )
+
+    def write(self, rng):
+        Comment.objects.create(
+            post_id=rng.choice(self.post_ids),
+            author_id=rng.choice(self.user_ids),
+            text="Комментарий нагрузочного теста",
+        )
@@ -0,0 +1,100 @@
+import json
+import random
+from io import BytesIO
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
+
+from posts.thumbnails import THUMBNAIL_SIZE, WIDTHS, render_variants
+
+# Так раньше отдавал картинки sorl: один JPEG 960x339 с качеством 95.
+BASELINE_QUALITY = 95
+
+
+def synthetic_corpus(count, seed):
+    """Фотоподобные картинки: градиент, фигуры, размытие и шум."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        image = Image.linear_gradient("L").resize((1600, 1200))
+        image = ImageOps.colorize(
+            image,
+            tuple(rng.randrange(256) for _ in range(3)),
+            tuple(rng.randrange(256) for _ in range(3)),
+        )
+        draw = ImageDraw.Draw(image)
+        for _ in range(40):
+            x, y = rng.randrange(1600), rng.randrange(1200)
+            radius = rng.randrange(20, 300)
+            draw.ellipse(
+                (x - radius, y - radius, x + radius, y + radius),
+                fill=tuple(rng.randrange(256) for _ in range(3)),
+            )
+        image = image.filter(ImageFilter.GaussianBlur(3))
+        noise = Image.effect_noise(image.size, 24).convert("RGB")
+        yield Image.blend(image, noise, 0.08)
+
+
+def file_corpus(path):
+    for file in sorted(Path(path).iterdir()):
+        try:
+            with Image.open(file) as image:
+                image.load()
+                yield image
+        except OSError:
+            continue
+
+
+def baseline_size(image):
+    buffer = BytesIO()
+    ImageOps.fit(image.convert("RGB"), THUMBNAIL_SIZE, Image.LANCZOS).save(
+        buffer, "JPEG", quality=BASELINE_QUALITY
+    )
+    return len(buffer.getvalue())
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает объём адаптивных вариантов картинок с прежним "
+        "JPEG 960x339 и печатает отчёт в JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--path", help="Каталог с картинками вместо синтетических"
+        )
+
+    def handle(self, *args, **options):
+        if options["path"]:
+            corpus = file_corpus(options["path"])
+        else:
+            corpus = synthetic_corpus(options["count"], options["seed"])
+        images = 0
+        baseline = 0
+        totals = {}
+        for image in corpus:
+            images += 1
+            baseline += baseline_size(image)
+            for key, content in render_variants(image).items():
+                totals[key] = totals.get(key, 0) + len(content)
+        report = {
+            "images": images,
+            "baseline_bytes": baseline,
+            "variants": (
+                [
+                    {
+                        "format": image_format,
+                        "width": width,
+                        "bytes": size,
+                        "saved_percent": round(100 * (1 - size / baseline), 1),
+                    }
+                    for (image_format, width), size in sorted(totals.items())
+                ]
+                if baseline
+                else []
+            ),
+            "widths": list(WIDTHS),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
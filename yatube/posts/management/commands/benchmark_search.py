@@ -0,0 +1,120 @@
+import json
+import random
+import sqlite3
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from constants import SEARCH_MAX_RESULTS
+from core.benchmark import percentile
+from posts.search import FTS5Search
+
+SYLLABLES = "ка ро ми то ла не су ве да по ры ши ко зу ле на".split()
+
+
+def vocabulary(rng, size):
+    return [
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        for _ in range(size)
+    ]
+
+
+def synthetic_posts(words, count, rng):
+    """Тексты со словами по закону Ципфа: частые и редкие слова."""
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    for _ in range(count):
+        yield " ".join(rng.choices(words, weights, k=rng.randint(5, 60)))
+
+
+def measure(db, sql, params, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.execute(sql, params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает поиск FTS5 с LIKE на синтетических постах "
+        "в SQLite в памяти и печатает отчёт в JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=50000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--query",
+            action="append",
+            help="Запрос; можно указать несколько раз. По умолчанию "
+            "слова с рангами --ranks в словаре",
+        )
+        parser.add_argument(
+            "--ranks",
+            default="1,10,100,1000",
+            help="Ранги слов по частоте через запятую: 1 — самое "
+            "частое, на нём ранжирование дороже всего",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        words = vocabulary(rng, 5000)
+        queries = options["query"] or [
+            words[int(rank) - 1] for rank in options["ranks"].split(",")
+        ]
+        db = sqlite3.connect(":memory:")
+        db.execute("CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT)")
+        db.execute(
+            "CREATE VIRTUAL TABLE post_fts USING "
+            "fts5(text, tokenize='unicode61 remove_diacritics 2')"
+        )
+        db.executemany(
+            "INSERT INTO post (text) VALUES (?)",
+            (
+                (text,)
+                for text in synthetic_posts(words, options["posts"], rng)
+            ),
+        )
+        db.execute(
+            "INSERT INTO post_fts (rowid, text) SELECT id, text FROM post"
+        )
+        report = {
+            "posts": options["posts"],
+            "queries": [
+                self.measure_query(db, query, options["repeat"])
+                for query in queries
+            ],
+        }
+        self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+
+    def measure_query(self, db, query, repeat):
+        expression = FTS5Search.expression(query)
+        terms = query.split()
+        like = " AND ".join("text LIKE ?" for _ in terms) or "1"
+        (matches,) = db.execute(
+            "SELECT count(*) FROM post_fts WHERE post_fts MATCH ?",
+            [expression],
+        ).fetchone()
+        return {
+            "query": query,
+            "matches": matches,
+            "fts5": measure(
+                db,
+                "SELECT rowid FROM post_fts WHERE post_fts MATCH ? "
+                "ORDER BY rank, rowid DESC LIMIT ?",
+                [expression, SEARCH_MAX_RESULTS],
+                repeat,
+            ),
+            "like": measure(
+                db,
+                f"SELECT id FROM post WHERE {like} ORDER BY id DESC LIMIT ?",
+                [f"%{term}%" for term in terms] + [SEARCH_MAX_RESULTS],
+                repeat,
+            ),
+        }
@@ -0,0 +1,205 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from constants import SHOW_TEN
+from core.benchmark import latency_summary
+from core.paginator import CursorPaginator
+from posts import cards, feeds
+from posts.models import Follow, Group, Post, TimelineEntry, User
+
+
+def cursor_at(queryset, depth, ordering=("-pub_date", "-id")):
+    """Курсор страницы номер depth, как если бы до неё дошли по ссылкам."""
+    if depth <= 1:
+        return None
+    paginator = CursorPaginator(queryset, SHOW_TEN, ordering)
+    offset = (depth - 1) * SHOW_TEN - 1
+    rows = list(paginator.object_list[offset:][:1])
+    return rows and paginator.encode_cursor(rows[0], depth) or None
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет основные страницы на текущей базе (например, после "
+        "seed_data) на нескольких глубинах пагинации и печатает "
+        "p50/p95/p99, число запросов и размер ответа в JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=30)
+        parser.add_argument(
+            "--depths", default="1,10,100", help="Номера страниц через запятую"
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Сбрасывать кеш лент и карточек перед каждым запросом",
+        )
+        parser.add_argument("--output", help="Файл для отчёта вместо stdout")
+
+    def handle(self, *args, **options):
+        if "testserver" not in settings.ALLOWED_HOSTS:
+            settings.ALLOWED_HOSTS.append("testserver")
+        depths = [int(depth) for depth in options["depths"].split(",")]
+        targets = self.targets()
+        results = []
+        for route, kwargs, params, queryset, ordering, user in targets:
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+            for depth in depths:
+                cursor = cursor_at(queryset, depth, ordering)
+                if depth > 1 and cursor is None:
+                    continue
+                results.append(
+                    self.measure(
+                        client,
+                        route,
+                        reverse(route, kwargs=kwargs),
+                        {**params, "cursor": cursor} if cursor else params,
+                        depth,
+                        options,
+                    )
+                )
+        report = {
+            "dataset": {
+                "users": User.objects.count(),
+                "groups": Group.objects.count(),
+                "posts": Post.objects.count(),
+                "follows": Follow.objects.count(),
+            },
+            "repeat": options["repeat"],
+            "cold_cache": options["cold"],
+            "results": results,
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def targets(self):
+        """Самые тяжёлые экземпляры каждой страницы: крупнейшая группа,
+        самый плодовитый автор, самый обсуждаемый пост и т.д.
+
+        Порция карточек общей ленты (posts:feed_cards) замеряется рядом
+        с posts:index для сравнения с полной страницей.
+        """
+        post = Post.objects.order_by("-comments_count", "-id").first()
+        if post is None:
+            raise CommandError("База пуста, сначала запустите seed_data")
+        group = (
+            Group.objects.annotate(total=Count("posts"))
+            .order_by("-total")
+            .first()
+        )
+        author = (
+            User.objects.filter(stats__isnull=False)
+            .order_by("-stats__posts_count")
+            .first()
+        )
+        reader = (
+            User.objects.annotate(total=Count("follower"))
+            .order_by("-total")
+            .first()
+        )
+        targets = [
+            ("posts:index", {}, {}, Post.objects.all(), None, None),
+            (
+                "posts:feed_cards",
+                {},
+                {"feed": "index"},
+                Post.objects.all(),
+                None,
+                None,
+            ),
+            (
+                "posts:post_detail",
+                {"post_id": post.pk},
+                {},
+                Post.objects.none(),
+                None,
+                None,
+            ),
+        ]
+        if group is not None:
+            targets.append(
+                (
+                    "posts:group_posts",
+                    {"slug": group.slug},
+                    {},
+                    group.posts.all(),
+                    None,
+                    None,
+                )
+            )
+        if author is not None:
+            targets.append(
+                (
+                    "posts:profile",
+                    {"username": author.username},
+                    {},
+                    author.posts.all(),
+                    None,
+                    None,
+                )
+            )
+        if reader is not None:
+            targets.append(
+                (
+                    "posts:follow_index",
+                    {},
+                    {},
+                    TimelineEntry.objects.filter(user=reader),
+                    ("-pub_date", "-post_id"),
+                    reader,
+                )
+            )
+        return [
+            (
+                route,
+                kwargs,
+                params,
+                queryset,
+                ordering or ("-pub_date", "-id"),
+                user,
+            )
+            for route, kwargs, params, queryset, ordering, user in targets
+        ]
+
+    def measure(self, client, route, url, data, depth, options):
+        timings = []
+        queries = []
+        sizes = []
+        for _ in range(options["repeat"]):
+            if options["cold"]:
+                # Только свои пространства ключей: cache.clear() на общем
+                # Redis стёр бы и лимиты, и ключи очереди живого сайта.
+                feeds.bump_generation()
+                cards.invalidate_all()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url, data)
+                timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f"{url}: ответ {response.status_code}")
+            queries.append(len(captured))
+            sizes.append(len(response.content))
+        return {
+            "route": route,
+            "depth": depth,
+            **latency_summary(timings),
+            "queries_median": statistics.median(queries),
+            "queries_max": max(queries),
+            "bytes": max(sizes),
+        }
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Создаёт миниатюры для постов с картинкой, у которых их нет."
+
+    def handle(self, *args, **options):
+        posts = (
+            Post.objects.exclude(image="")
+            .filter(thumbnail="")
+            .values_list("pk", flat=True)
+        )
+        total = 0
+        for post_id in posts.iterator():
+            thumbnails.generate(post_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"Обработано постов: {total}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Перестраивает полнотекстовый индекс постов (SQLite FTS5); "
+        "индекс PostgreSQL база обновляет сама."
+    )
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS("Индекс поиска перестроен"))
@@ -0,0 +1,238 @@
+import json
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from posts import conditional, counters, feeds, search, timeline
+from posts.models import Comment, Follow, Group, Post, User
+
+TEXT_POOL_SIZE = 2000
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса по степенному закону для random.choices:
+    первый элемент самый популярный."""
+    return list(accumulate(1 / rank**exponent for rank in range(1, count + 1)))
+
+
+def batches(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+@contextmanager
+def explicit_pub_date():
+    """Отключает auto_now_add у Post.pub_date, чтобы bulk_create
+    сохранил заданные даты, а не одно и то же «сейчас»."""
+    field = Post._meta.get_field("pub_date")
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        "Наполняет базу большим синтетическим набором данных: "
+        "пользователи, группы, посты, комментарии и подписки "
+        "со степенным распределением."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--groups", type=int, default=1000)
+        parser.add_argument("--posts", type=int, default=1000000)
+        parser.add_argument("--comments", type=int, default=200000)
+        parser.add_argument(
+            "--follows",
+            type=int,
+            default=20,
+            help="Среднее число подписок на пользователя",
+        )
+        parser.add_argument(
+            "--exponent",
+            type=float,
+            default=1.1,
+            help="Показатель степенного закона популярности авторов",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="За сколько последних дней распределить даты постов",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        Faker.seed(options["seed"])
+        self.fake = Faker("ru_RU")
+        self.batch_size = options["batch_size"]
+        self.texts = [
+            self.fake.paragraph(nb_sentences=self.rng.randint(1, 6))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        started = time.monotonic()
+        user_ids = self.create_users(options["users"])
+        group_ids = self.create_groups(options["groups"])
+        # Популярность авторов: несколько «знаменитостей» и длинный хвост.
+        authors = user_ids[:]
+        self.rng.shuffle(authors)
+        weights = zipf_weights(len(authors), options["exponent"])
+        self.create_posts(
+            options["posts"], authors, weights, group_ids, options["days"]
+        )
+        follows = self.create_follows(
+            user_ids, authors, weights, options["follows"]
+        )
+        comments = self.create_comments(options["comments"], user_ids)
+        self.stdout.write("Пересчёт счётчиков, лент и поискового индекса…")
+        counters.rebuild()
+        timeline.rebuild()
+        search.rebuild()
+        feeds.bump_generation()
+        conditional.touch(conditional.SITE)
+        report = {
+            "users": len(user_ids),
+            "groups": len(group_ids),
+            "posts": options["posts"],
+            "comments": comments,
+            "follows": follows,
+            "seconds": round(time.monotonic() - started, 1),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def create_users(self, count):
+        start = User.objects.count()
+        last_id = self.last_id(User)
+        # Один хеш на всех: честный PBKDF2 на каждого занял бы часы.
+        password = make_password("password")
+        for offset, size in batches(count, self.batch_size):
+            User.objects.bulk_create(
+                User(
+                    username=f"seed{start + offset + i}",
+                    first_name=self.fake.first_name(),
+                    last_name=self.fake.last_name(),
+                    password=password,
+                )
+                for i in range(size)
+            )
+        return self.ids_after(User, last_id)
+
+    def create_groups(self, count):
+        start = Group.objects.count()
+        last_id = self.last_id(Group)
+        Group.objects.bulk_create(
+            (
+                Group(
+                    title=self.fake.catch_phrase()[:200],
+                    slug=f"seed-group-{start + i}",
+                    description=self.rng.choice(self.texts),
+                )
+                for i in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        return self.ids_after(Group, last_id)
+
+    @staticmethod
+    def last_id(model):
+        return model.objects.aggregate(last=Max("id"))["last"] or 0
+
+    @staticmethod
+    def ids_after(model, last_id):
+        """id строк, созданных после last_id: bulk_create в SQLite
+        их не возвращает, а смещение по count() ломается, если
+        раньше удаляли строки."""
+        return list(
+            model.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+    def create_posts(self, count, authors, weights, group_ids, days):
+        """Посты с датами, равномерно растущими вместе с id
+        за последние days дней."""
+        if not group_ids:
+            group_ids = [None]
+        group_weights = zipf_weights(len(group_ids), 1.0)
+        now = timezone.now()
+        step = timedelta(days=days) / max(count, 1)
+        start = now - step * count
+        for offset, size in batches(count, self.batch_size):
+            author_ids = self.rng.choices(authors, cum_weights=weights, k=size)
+            groups = self.rng.choices(
+                group_ids, cum_weights=group_weights, k=size
+            )
+            with transaction.atomic(), explicit_pub_date():
+                Post.objects.bulk_create(
+                    Post(
+                        text=self.rng.choice(self.texts),
+                        author_id=author_id,
+                        group_id=group_id if self.rng.random() < 0.7 else None,
+                        pub_date=start + step * (offset + i + 1),
+                    )
+                    for i, (author_id, group_id) in enumerate(
+                        zip(author_ids, groups)
+                    )
+                )
+            self.stdout.write(f"Посты: {offset + size}/{count}")
+
+    def create_follows(self, user_ids, authors, weights, average):
+        """Подписки: число подписок у пользователя распределено по Парето,
+        на кого подписываться — по популярности автора."""
+        created = 0
+        pending = []
+        for user_id in user_ids:
+            wanted = min(
+                len(authors) - 1,
+                int(average * self.rng.paretovariate(2) / 2),
+            )
+            targets = set(
+                self.rng.choices(authors, cum_weights=weights, k=wanted)
+            )
+            targets.discard(user_id)
+            pending.extend(
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in targets
+            )
+            if len(pending) >= self.batch_size:
+                Follow.objects.bulk_create(pending, ignore_conflicts=True)
+                created += len(pending)
+                pending = []
+        Follow.objects.bulk_create(pending, ignore_conflicts=True)
+        return created + len(pending)
+
+    def create_comments(self, count, user_ids):
+        """Комментарии к свежим постам: у немногих постов их очень много."""
+        post_ids = list(
+            Post.objects.order_by("-id").values_list("id", flat=True)[
+                : max(count, 1)
+            ]
+        )
+        if not post_ids or not count:
+            return 0
+        post_weights = zipf_weights(len(post_ids), 1.0)
+        for _, size in batches(count, self.batch_size):
+            Comment.objects.bulk_create(
+                Comment(
+                    post_id=post_id,
+                    author_id=self.rng.choice(user_ids),
+                    text=self.rng.choice(self.texts),
+                )
+                for post_id in self.rng.choices(
+                    post_ids, cum_weights=post_weights, k=size
+                )
+            )
+        return count
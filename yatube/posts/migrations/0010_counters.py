@@ -0,0 +1,92 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    AuthorStats = apps.get_model("posts", "AuthorStats")
+    Comment = apps.get_model("posts", "Comment")
+    Follow = apps.get_model("posts", "Follow")
+    Post = apps.get_model("posts", "Post")
+    # По запросу на таблицу: JOIN постов и подписок к пользователям
+    # дал бы на автора posts × followers строк.
+    posts, followers = (
+        dict(
+            model.objects.order_by()
+            .values("author_id")
+            .annotate(total=Count("id"))
+            .values_list("author_id", "total")
+        )
+        for model in (Post, Follow)
+    )
+    AuthorStats.objects.bulk_create(
+        AuthorStats(
+            user_id=user_id,
+            posts_count=posts.get(user_id, 0),
+            followers_count=followers.get(user_id, 0),
+        )
+        for user_id in posts.keys() | followers.keys()
+    )
+    totals = (
+        Comment.objects.order_by()
+        .values("post_id")
+        .annotate(total=Count("id"))
+    )
+    for row in totals:
+        Post.objects.filter(id=row["post_id"]).update(
+            comments_count=row["total"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0009_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuthorStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Автор",
+                    ),
+                ),
+                (
+                    "posts_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Число постов"
+                    ),
+                ),
+                (
+                    "followers_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Число подписчиков"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Счётчики автора",
+                "verbose_name_plural": "Счётчики авторов",
+            },
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="comments_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Число комментариев"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
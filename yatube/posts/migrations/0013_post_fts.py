@@ -0,0 +1,32 @@
+from django.db import migrations
+
+CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5("
+    "text, tokenize = 'unicode61 remove_diacritics 2')"
+)
+FILL = (
+    "INSERT INTO posts_post_fts (rowid, text) SELECT id, text FROM posts_post"
+)
+DROP = "DROP TABLE IF EXISTS posts_post_fts"
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(CREATE)
+        schema_editor.execute(FILL)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0012_post_image_variants"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
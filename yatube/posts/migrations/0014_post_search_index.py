@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# Выражение должно совпадать с posts.search.PostgresSearch.
+CREATE = (
+    "CREATE INDEX IF NOT EXISTS posts_post_text_search "
+    "ON posts_post USING GIN (to_tsvector('russian', text))"
+)
+DROP = "DROP INDEX IF EXISTS posts_post_text_search"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0013_post_fts"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,60 @@
+from itertools import groupby
+
+from django.db import migrations
+
+from constants import TIMELINE_BACKFILL, TIMELINE_FANOUT_LIMIT
+
+
+def rebuild_timelines(apps, schema_editor):
+    """posts.timeline.rebuild() на исторических моделях.
+
+    Ленты заполняются здесь, а не в 0008: знаменитостей определяет
+    AuthorStats.followers_count из 0010, и их посты, как в rebuild(),
+    не раскладываются. Отбор должен совпадать с timeline.celebrities()
+    и timeline.spread().
+    """
+    AuthorStats = apps.get_model("posts", "AuthorStats")
+    Follow = apps.get_model("posts", "Follow")
+    Post = apps.get_model("posts", "Post")
+    TimelineEntry = apps.get_model("posts", "TimelineEntry")
+    celebrities = AuthorStats.objects.filter(
+        followers_count__gt=TIMELINE_FANOUT_LIMIT
+    ).values("user_id")
+    follows = (
+        Follow.objects.exclude(author_id__in=celebrities)
+        .order_by("author_id")
+        .values_list("author_id", "user_id")
+    )
+    TimelineEntry.objects.all().delete()
+    for author_id, pairs in groupby(follows.iterator(), lambda f: f[0]):
+        user_ids = [user_id for _, user_id in pairs]
+        posts = list(
+            Post.objects.filter(author_id=author_id)
+            .order_by("-pub_date")
+            .values_list("id", "pub_date")[:TIMELINE_BACKFILL]
+        )
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                    pub_date=pub_date,
+                )
+                for user_id in user_ids
+                for post_id, pub_date in posts
+            ),
+            batch_size=TIMELINE_BACKFILL,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0014_post_search_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-17 09:15
+
+from django.db import migrations, models
+import posts.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0015_rebuild_timelines"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="comment",
+            name="post",
+            field=models.ForeignKey(
+                on_delete=posts.models.cascade_from_post,
+                related_name="comments",
+                to="posts.Post",
+                verbose_name="Пост",
+            ),
+        ),
+    ]
@@ -1,4 +1,7 @@
+import json
+
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.db import models
 
 from constants import SYMBOLS_LIMIT
@@ -18,6 +21,34 @@ class Group(models.Model):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        group = super().from_db(db, field_names, values)
+        # slug на момент загрузки: после переименования сигналам
+        # нужно забыть и прежний.
+        group.loaded_slug = group.__dict__.get("slug")
+        return group
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для лент: автор и группа одним запросом и нужные поля."""
+        return self.select_related("author", "group").only(
+            "text",
+            "pub_date",
+            "image",
+            "thumbnail",
+            "image_variants",
+            "comments_count",
+            "author",
+            "author__username",
+            "author__first_name",
+            "author__last_name",
+            "group",
+            "group__title",
+            "group__slug",
+        )
+
 
 class Post(models.Model):
     text = models.TextField(
@@ -47,20 +78,97 @@ class Post(models.Model):
         verbose_name="Картинка", upload_to="posts/", blank=True
     )
 
+    thumbnail = models.ImageField(
+        verbose_name="Миниатюра",
+        upload_to="posts/thumbs/",
+        blank=True,
+        editable=False,
+    )
+    image_variants = models.TextField(
+        verbose_name="Варианты картинки (JSON)", blank=True, editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name="Число комментариев", default=0, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ("-pub_date",)
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
+        indexes = [
+            models.Index(fields=["-pub_date", "-id"], name="post_date_idx"),
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_date_idx",
+            ),
+            models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_date_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.text[:SYMBOLS_LIMIT]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Группа на момент загрузки: при переносе поста в другую группу
+        # сигналам нужно знать и прежнюю.
+        post.loaded_group_id = post.__dict__.get("group_id")
+        return post
+
+    def image_srcsets(self):
+        """srcset для каждого формата из image_variants."""
+        try:
+            variants = json.loads(self.image_variants or "{}")
+            return {
+                image_format: ", ".join(
+                    f"{default_storage.url(name)} {width}w"
+                    for width, name in sorted(
+                        by_width.items(), key=lambda item: int(item[0])
+                    )
+                )
+                for image_format, by_width in variants.items()
+            }
+        except (AttributeError, TypeError, ValueError):
+            return {}
+
+    @property
+    def image_sources(self):
+        """<source> для <picture>: сначала компактные форматы."""
+        srcsets = self.image_srcsets()
+        return [
+            {"type": f"image/{image_format.lower()}", "srcset": srcset}
+            for image_format, srcset in srcsets.items()
+            if image_format != "JPEG"
+        ]
+
+    @property
+    def image_srcset(self):
+        return self.image_srcsets().get("JPEG", "")
+
+
+def cascade_from_post(collector, field, sub_objs, using):
+    """CASCADE, который помечает комментарии удаляемого поста.
+
+    Счётчик и страницы поста обновит удаление самого поста, поэтому
+    сигнал комментария такие комментарии пропускает. Пометка живёт
+    на объектах одного удаления: между потоками и после отката
+    ничего не остаётся.
+    """
+    models.CASCADE(collector, field, sub_objs, using)
+    for comment in sub_objs:
+        comment.deleted_with_post = True
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
         verbose_name="Пост",
-        on_delete=models.CASCADE,
+        on_delete=cascade_from_post,
         related_name="comments",
     )
     author = models.ForeignKey(
@@ -75,6 +183,13 @@ class Comment(models.Model):
     )
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["post", "created", "id"], name="comment_post_idx"
+            ),
+        ]
+
     def __str__(self):
         return self.text[:SYMBOLS_LIMIT]
 
@@ -92,3 +207,73 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name="following",
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"], name="unique_follow"
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Счётчики автора, обновляемые при записи вместо COUNT(*) при чтении."""
+
+    user = models.OneToOneField(
+        User,
+        verbose_name="Автор",
+        on_delete=models.CASCADE,
+        related_name="stats",
+        primary_key=True,
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name="Число постов", default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name="Число подписчиков", default=0
+    )
+
+    class Meta:
+        verbose_name = "Счётчики автора"
+        verbose_name_plural = "Счётчики авторов"
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class TimelineEntry(models.Model):
+    """Строка ленты подписок: пост, разложенный подписчику при записи."""
+
+    user = models.ForeignKey(
+        User,
+        verbose_name="Подписчик",
+        on_delete=models.CASCADE,
+        related_name="timeline",
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name="Пост",
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name="Автор",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    pub_date = models.DateTimeField(verbose_name="Publication date,time")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        unique_together = ("user", "post")
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-post"],
+                name="timeline_user_date_idx",
+            ),
+            models.Index(
+                fields=["user", "author"], name="timeline_user_author_idx"
+            ),
+        ]
@@ -0,0 +1,219 @@
+"""Полнотекстовый поиск постов с бэкендом под каждую базу.
+
+SQLite ищет по виртуальной таблице FTS5 (миграция 0013), которую
+сигналы обновляют при каждом сохранении поста. PostgreSQL ищет
+по GIN-индексу на to_tsvector (миграция 0014): индекс функциональный,
+база обновляет его сама. Остальные базы получают медленный, но
+рабочий поиск по вхождению слов.
+
+Ранжирование перебирает все совпадения, и для частого слова это
+дорого. Поэтому список id запроса кешируется: листание страниц
+ранжирует один раз, а не на каждой странице.
+"""
+
+import hashlib
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+from constants import SEARCH_CACHE_TIMEOUT, SEARCH_MAX_RESULTS
+
+from .feeds import GENERATION_KEY, bump_generation
+from .models import Post
+
+FTS_TABLE = "posts_post_fts"
+PG_CONFIG = "russian"
+WORD = re.compile(r"\w+")
+
+
+def words(query):
+    return WORD.findall(query.lower())
+
+
+class LikeSearch:
+    """Поиск по вхождению всех слов, без индекса."""
+
+    indexed = False
+
+    def filter(self, queryset, query):
+        condition = Q()
+        for word in words(query):
+            condition &= Q(text__icontains=word)
+        return queryset.filter(condition)
+
+    def search_ids(self, query, limit):
+        return list(
+            self.filter(Post.objects, query)
+            .order_by("-pub_date", "-id")
+            .values_list("id", flat=True)[:limit]
+        )
+
+    def index_post(self, post):
+        pass
+
+    def unindex_post(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class FTS5Search(LikeSearch):
+    indexed = True
+
+    @staticmethod
+    def expression(query):
+        """Превращает ввод пользователя в безопасный запрос FTS5.
+
+        Каждое слово ищется как префикс, все слова должны встретиться.
+        """
+        return " ".join(f'"{word}"*' for word in words(query))
+
+    def filter(self, queryset, query):
+        # extra, а не pk__in=RawSQL: Django обернул бы подзапрос
+        # во вторые скобки, и SQLite взял бы из него одну строку.
+        return queryset.extra(
+            where=[
+                f"posts_post.id IN (SELECT rowid FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s)"
+            ],
+            params=[self.expression(query)],
+        )
+
+    def search_ids(self, query, limit):
+        """id по убыванию релевантности (bm25), затем по новизне."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                "ORDER BY rank, rowid DESC LIMIT %s",
+                [self.expression(query), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk]
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)",
+                [post.pk, post.text],
+            )
+
+    def unindex_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id]
+            )
+
+    def rebuild(self):
+        """Перестраивает индекс по всей таблице постов."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, text) "
+                "SELECT id, text FROM posts_post"
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES (%s)",
+                ["optimize"],
+            )
+
+
+class PostgresSearch(LikeSearch):
+    indexed = True
+
+    @staticmethod
+    def expression(query):
+        """Запрос to_tsquery: все слова как префиксы. В слове только
+        буквы, цифры и «_», поэтому синтаксис tsquery не сломать."""
+        return " & ".join(f"{word}:*" for word in words(query))
+
+    def filter(self, queryset, query):
+        return queryset.extra(
+            where=[
+                f"to_tsvector('{PG_CONFIG}', posts_post.text) "
+                f"@@ to_tsquery('{PG_CONFIG}', %s)"
+            ],
+            params=[self.expression(query)],
+        )
+
+    def search_ids(self, query, limit):
+        """id по убыванию ts_rank, затем по новизне. Выражение
+        to_tsvector то же, что в индексе, иначе индекс не подойдёт."""
+        vector = f"to_tsvector('{PG_CONFIG}', text)"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM posts_post, "
+                f"to_tsquery('{PG_CONFIG}', %s) AS query "
+                f"WHERE {vector} @@ query "
+                f"ORDER BY ts_rank({vector}, query) DESC, id DESC LIMIT %s",
+                [self.expression(query), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {"sqlite": FTS5Search(), "postgresql": PostgresSearch()}
+FALLBACK = LikeSearch()
+
+
+def backend():
+    return BACKENDS.get(connection.vendor, FALLBACK)
+
+
+def enabled():
+    """Есть ли у базы полнотекстовый индекс."""
+    return backend().indexed
+
+
+def result_key(query, limit):
+    normalized = " ".join(words(query))
+    digest = hashlib.md5(
+        f"{type(backend()).__name__}:{limit}:{normalized}".encode()
+    ).hexdigest()
+    return f"search:{digest}"
+
+
+def search_ids(query, limit=SEARCH_MAX_RESULTS):
+    """id найденных постов, самые подходящие первыми.
+
+    Результат кешируется вместе с поколением лент: сохранение
+    или удаление поста меняет поколение, и запрос ранжируется заново.
+    """
+    if not words(query):
+        return []
+    key = result_key(query, limit)
+    found = cache.get_many([GENERATION_KEY, key])
+    generation = found.get(GENERATION_KEY) or bump_generation()
+    entry = found.get(key)
+    if entry and entry["generation"] == generation:
+        return entry["ids"]
+    ids = backend().search_ids(query, limit)
+    cache.set(
+        key, {"generation": generation, "ids": ids}, SEARCH_CACHE_TIMEOUT
+    )
+    return ids
+
+
+def filter_posts(queryset, query):
+    """Все найденные посты из queryset, без ранжирования, без предела
+    SEARCH_MAX_RESULTS и без кеша: для админки, где порядок и число
+    результатов задаёт список изменений."""
+    if not words(query):
+        return queryset.none()
+    return backend().filter(queryset, query)
+
+
+def index_post(post):
+    backend().index_post(post)
+
+
+def unindex_post(post_id):
+    backend().unindex_post(post_id)
+
+
+def rebuild():
+    backend().rebuild()
+    bump_generation()
@@ -0,0 +1,154 @@
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_save,
+)
+from django.dispatch import receiver
+
+from core import jobs
+
+from . import (
+    cards,
+    conditional,
+    counters,
+    feeds,
+    search,
+    thumbnails,
+    timeline,
+    watermarks,
+)
+from .models import Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    loaded_group_id = getattr(instance, "loaded_group_id", None)
+    cards.invalidate("post", instance.pk)
+    feeds.bump_generation()
+    search.index_post(instance)
+    conditional.touch(
+        *conditional.post_scopes_changed(instance, [loaded_group_id])
+    )
+    if created:
+        counters.bump_author(instance.author_id, "posts_count", 1)
+        jobs.enqueue(
+            timeline.fan_out, instance.pk, key=f"fan-out:{instance.pk}"
+        )
+        watermarks.push(instance)
+    elif instance.group_id != loaded_group_id:
+        watermarks.forget(watermarks.post_feeds(instance, [loaded_group_id]))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    cards.invalidate("post", instance.pk)
+    feeds.bump_generation()
+    search.unindex_post(instance.pk)
+    conditional.touch(*conditional.post_scopes_changed(instance))
+    conditional.forget(f"post-author:{instance.pk}")
+    watermarks.forget(watermarks.post_feeds(instance))
+    counters.bump_author(instance.author_id, "posts_count", -1)
+    # Поля картинки могли не загрузить (only/defer): тогда не трогаем.
+    if {"image", "thumbnail", "image_variants"} <= instance.__dict__.keys():
+        thumbnails.discard(thumbnails.stored_files(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(Post, {"pk": instance.post_id}, "comments_count", 1)
+        cards.invalidate("post", instance.post_id)
+        touch_comment_pages(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # Комментарии удаляемого поста: его обновит post_deleted.
+    if getattr(instance, "deleted_with_post", False):
+        return
+    counters.bump(Post, {"pk": instance.post_id}, "comments_count", -1)
+    cards.invalidate("post", instance.post_id)
+    touch_comment_pages(instance)
+
+
+def touch_comment_pages(comment):
+    """Число комментариев видно в карточке поста в группе и профиле."""
+    if Comment.post.is_cached(comment):
+        conditional.touch(*conditional.post_scopes_changed(comment.post))
+        return
+    post = (
+        Post.objects.filter(pk=comment.post_id)
+        .only("author_id", "group_id")
+        .first()
+    )
+    if post is not None:
+        conditional.touch(*conditional.post_scopes_changed(post))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_author(instance.author_id, "followers_count", 1)
+        jobs.enqueue(
+            timeline.backfill,
+            instance.user_id,
+            instance.author_id,
+            key=timeline.backfill_key(instance.user_id, instance.author_id),
+        )
+        conditional.touch(f"profile:{instance.author_id}")
+        watermarks.forget_following(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, "followers_count", -1)
+    timeline.trim(instance.user_id, instance.author_id)
+    timeline.follower_left(instance.author_id)
+    conditional.touch(f"profile:{instance.author_id}")
+    watermarks.forget_following(instance.user_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_cards(sender, instance, **kwargs):
+    cards.invalidate("group", instance.pk)
+    # Название группы есть в карточках на любых страницах.
+    conditional.touch(conditional.SITE)
+    # Прежний slug тоже: иначе он так и указывал бы на группу.
+    loaded_slug = getattr(instance, "loaded_slug", None)
+    conditional.forget(
+        *{f"group:{slug}" for slug in (instance.slug, loaded_slug) if slug}
+    )
+    instance.loaded_slug = instance.slug
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    # Модель пользователя не наша, поэтому имя на момент загрузки
+    # запоминает сигнал, а не from_db, как у Post и Group.
+    instance.loaded_username = instance.__dict__.get("username")
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(
+    sender, instance, created, update_fields, **kwargs
+):
+    # Вход в систему сохраняет только last_login: страницы не меняются.
+    if update_fields == frozenset(["last_login"]):
+        return
+    cards.invalidate("author", instance.pk)
+    conditional.forget(
+        *{
+            f"user:{username}"
+            for username in (instance.username, instance.loaded_username)
+            if username
+        }
+    )
+    instance.loaded_username = instance.username
+    if not created:
+        conditional.touch(conditional.SITE)
+
+
+@receiver(post_delete, sender=User)
+def forget_author(sender, instance, **kwargs):
+    conditional.forget(f"user:{instance.username}")
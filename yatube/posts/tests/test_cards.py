@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import cards
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_slug",
+            description="Тестовое описание",
+        )
+        cls.post = Post.objects.create(
+            text="Тестовый пост", author=cls.user, group=cls.group
+        )
+
+    def setUp(self):
+        # Счётчики, накопленные процессом в других тестах, уходят
+        # в кеш и стираются вместе с ним.
+        cards.flush()
+        cache.clear()
+
+    def render_feed(self):
+        return self.client.get(
+            reverse("posts:group_posts", args=(self.group.slug,))
+        ).content.decode()
+
+    def test_cards_are_served_from_cache(self):
+        """Повторный показ ленты берёт карточки из кеша."""
+        self.render_feed()
+        self.assertEqual(cards.stats(), {"hits": 0, "misses": 1})
+        self.render_feed()
+        self.assertEqual(cards.stats(), {"hits": 1, "misses": 1})
+
+    def test_card_stats_are_batched(self):
+        """Показ ленты не пишет счётчики в кеш: они копятся
+        в процессе до stats() или до конца интервала."""
+        self.render_feed()
+        self.render_feed()
+        self.assertIsNone(cache.get(cards.MISSES_KEY))
+        self.assertIsNone(cache.get(cards.HITS_KEY))
+        self.assertEqual(cards.stats(), {"hits": 1, "misses": 1})
+        with mock.patch("posts.cards.CARD_STATS_FLUSH_INTERVAL", 0):
+            self.render_feed()
+        self.assertEqual(cache.get(cards.HITS_KEY), 2)
+
+    def test_cards_are_invalidated(self):
+        """Карточка обновляется после правки поста, группы,
+        автора и добавления комментария."""
+        changes = (
+            ("post", "Новый текст поста"),
+            ("group", "Новое название группы"),
+            ("author", "Новое Имя"),
+            ("comment", "комментариев: 1"),
+        )
+        for change, expected in changes:
+            with self.subTest(change=change):
+                self.render_feed()
+                if change == "post":
+                    self.post.text = expected
+                    self.post.save()
+                elif change == "group":
+                    self.group.title = expected
+                    self.group.save()
+                elif change == "author":
+                    (
+                        self.user.first_name,
+                        self.user.last_name,
+                    ) = expected.split()
+                    self.user.save()
+                else:
+                    Comment.objects.create(
+                        post=self.post, author=self.user, text="Комментарий"
+                    )
+                self.assertIn(expected, self.render_feed())
+
+    def test_login_keeps_cards(self):
+        """Вход автора сохраняет только last_login: карточки остаются
+        в кеше."""
+        self.render_feed()
+        self.client.force_login(self.user)
+        self.client.logout()
+        self.render_feed()
+        self.assertEqual(cards.stats(), {"hits": 1, "misses": 1})
@@ -0,0 +1,128 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+
+from posts import cards, feeds
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class BenchmarkCommandsTest(TestCase):
+    def test_seed_and_benchmark(self):
+        """seed_data наполняет базу согласованными данными,
+        benchmark_views отчитывается по каждой странице в JSON."""
+        call_command(
+            "seed_data",
+            users=20,
+            groups=3,
+            posts=300,
+            comments=50,
+            follows=5,
+            batch_size=100,
+            stdout=StringIO(),
+        )
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 50)
+        dates = list(Post.objects.order_by("id").values_list("pub_date"))
+        self.assertEqual(len(set(dates)), 300)
+        self.assertEqual(dates, sorted(dates))
+        follow = Follow.objects.first()
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user_id=follow.user_id, author_id=follow.author_id
+            ).exists()
+        )
+        output = StringIO()
+        call_command("benchmark_views", repeat=2, depths="1,2", stdout=output)
+        report = json.loads(output.getvalue())
+        self.assertEqual(report["dataset"]["posts"], 300)
+        routes = {result["route"] for result in report["results"]}
+        self.assertEqual(
+            routes,
+            {
+                "posts:index",
+                "posts:feed_cards",
+                "posts:group_posts",
+                "posts:profile",
+                "posts:post_detail",
+                "posts:follow_index",
+            },
+        )
+        for result in report["results"]:
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+            self.assertGreaterEqual(result["queries_max"], 1)
+        sizes = {
+            result["route"]: result["bytes"]
+            for result in report["results"]
+            if result["depth"] == 2
+        }
+        self.assertLess(sizes["posts:feed_cards"], sizes["posts:index"])
+
+    def test_cold_benchmark_keeps_other_cache_keys(self):
+        """--cold сбрасывает только ленты и карточки, остальной кеш
+        (лимиты, сессии, очередь) остаётся."""
+        call_command(
+            "seed_data",
+            users=5,
+            groups=2,
+            posts=30,
+            comments=5,
+            follows=2,
+            batch_size=100,
+            stdout=StringIO(),
+        )
+        cache.set("unrelated", "keep")
+        generation = cache.get(feeds.GENERATION_KEY)
+        call_command(
+            "benchmark_views",
+            repeat=1,
+            depths="1",
+            cold=True,
+            stdout=StringIO(),
+        )
+        self.assertEqual(cache.get("unrelated"), "keep")
+        self.assertNotEqual(cache.get(feeds.GENERATION_KEY), generation)
+        self.assertIsNotNone(cache.get(cards.ALL_VERSION_KEY))
+
+    def test_benchmark_search(self):
+        """benchmark_search измеряет и частые, и редкие слова."""
+        output = StringIO()
+        call_command(
+            "benchmark_search",
+            posts=300,
+            repeat=1,
+            ranks="1,50",
+            stdout=output,
+        )
+        queries = json.loads(output.getvalue())["queries"]
+        self.assertEqual(len(queries), 2)
+        self.assertGreater(queries[0]["matches"], queries[1]["matches"])
+        for result in queries:
+            self.assertLessEqual(
+                result["fts5"]["p50_ms"], result["fts5"]["p95_ms"]
+            )
+
+
+class ConcurrencyBenchmarkTest(TransactionTestCase):
+    def test_benchmark_concurrency(self):
+        """benchmark_concurrency сравнивает чтение без записи и с ней."""
+        author = User.objects.create_user(username="author")
+        Post.objects.create(text="Тестовый пост", author=author)
+        output = StringIO()
+        call_command(
+            "benchmark_concurrency",
+            readers=2,
+            writers=1,
+            seconds=0.2,
+            stdout=output,
+        )
+        report = json.loads(output.getvalue())
+        self.assertGreater(report["reads_only"]["reads"], 0)
+        self.assertEqual(report["reads_only"]["writes"], 0)
+        self.assertGreater(report["reads_with_writes"]["writes"], 0)
+        self.assertIn("read_throughput_ratio", report)
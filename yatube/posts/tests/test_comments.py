@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from constants import COMMENTS_PER_PAGE
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+        cls.post = Post.objects.create(text="Тестовый пост", author=cls.user)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f"Комментарий {i}")
+            for i in range(COMMENTS_PER_PAGE + 5)
+        )
+
+    def test_post_detail_shows_first_comments(self):
+        """На странице поста только первая порция комментариев,
+        от старых к новым."""
+        response = self.client.get(
+            reverse("posts:post_detail", args=[self.post.pk])
+        )
+        comments = response.context["comments"]
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, "Комментарий 0")
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, "Показать ещё")
+
+    def test_fragment_returns_next_batch(self):
+        """Фрагмент по курсору отдаёт оставшиеся комментарии
+        без кнопки «Показать ещё»."""
+        response = self.client.get(
+            reverse("posts:post_detail", args=[self.post.pk])
+        )
+        cursor = response.context["comments"].paginator.next_cursor
+        response = self.client.get(
+            reverse("posts:post_comments", args=[self.post.pk]),
+            {"cursor": cursor},
+        )
+        texts = [comment.text for comment in response.context["comments"]]
+        self.assertEqual(
+            texts,
+            [
+                f"Комментарий {i}"
+                for i in range(COMMENTS_PER_PAGE, COMMENTS_PER_PAGE + 5)
+            ],
+        )
+        self.assertNotContains(response, "Показать ещё")
+        self.assertNotContains(response, "<html")
@@ -0,0 +1,154 @@
+import time
+import warnings
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+
+from posts import conditional
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    """ETag и Last-Modified у страниц группы, профиля и поста."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        cls.post = Post.objects.create(
+            text="Тестовый пост", author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = [
+            reverse("posts:group_posts", args=[self.group.slug]),
+            reverse("posts:profile", args=[self.author.username]),
+            reverse("posts:post_detail", args=[self.post.pk]),
+        ]
+
+    def etag(self, url, client=None):
+        response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_unchanged_page_is_not_modified(self):
+        """Повторный запрос с тем же ETag получает 304 без запросов
+        к базе и без рендеринга шаблона."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.etag(url)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+                self.assertEqual(len(queries), 0)
+
+    def test_changes_update_etag(self):
+        """Новый пост, комментарий или подписчик меняют ETag страниц,
+        где они видны."""
+        before = [self.etag(url) for url in self.urls]
+        Comment.objects.create(
+            post=self.post, author=self.reader, text="Комментарий"
+        )
+        after = [self.etag(url) for url in self.urls]
+        self.assertTrue(all(map(str.__ne__, before, after)))
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertNotEqual(self.etag(self.urls[1]), after[1])
+        post_etag = self.etag(self.urls[2])
+        Post.objects.create(text="Новый", author=self.reader, group=self.group)
+        self.assertNotEqual(self.etag(self.urls[0]), after[0])
+        self.assertEqual(self.etag(self.urls[2]), post_etag)
+
+    def test_last_modified_waits_for_the_second_to_end(self):
+        """Last-Modified округлён вверх до секунды и появляется, только
+        когда она прошла: изменение в ту же секунду не даёт 304."""
+        url = self.urls[0]
+        scopes = [conditional.SITE, *conditional.group_scopes("test-slug")]
+
+        def set_version(version):
+            cache.set_many(
+                {conditional.version_key(scope): version for scope in scopes}
+            )
+
+        set_version((int(time.time()) + 1) * 10**9 + 1)
+        self.assertNotIn("Last-Modified", self.client.get(url))
+        second = int(time.time()) - 1
+        set_version(second * 10**9 - 5 * 10**8)
+        response = self.client.get(url)
+        self.assertEqual(response["Last-Modified"], http_date(second))
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(second)
+        )
+        self.assertEqual(response.status_code, 304)
+        conditional.touch(scopes[-1])
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(second)
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_does_not_depend_on_user(self):
+        """Страницы общие для всех, и ETag у гостя и вошедшего один."""
+        reader = Client()
+        reader.force_login(self.reader)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.etag(url), self.etag(url, reader))
+
+    def test_missing_object_is_not_found(self):
+        """Для несуществующих объектов по-прежнему 404."""
+        for url in (
+            reverse("posts:group_posts", args=["missing"]),
+            reverse("posts:profile", args=["missing"]),
+            reverse("posts:post_detail", args=[self.post.pk + 100]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH="*")
+                self.assertEqual(response.status_code, 404)
+
+    def test_arbitrary_names_make_valid_cache_keys(self):
+        """Пробелы и длинные имена из URL не попадают в ключ кеша."""
+        name = "имя с пробелом " * 20
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", CacheKeyWarning)
+            response = self.client.get(reverse("posts:profile", args=[name]))
+            self.assertEqual(response.status_code, 404)
+            response = self.client.get(
+                reverse("posts:feed_cards"), {"feed": f"profile:{name}"}
+            )
+            self.assertEqual(response.status_code, 404)
+
+    def test_renamed_object_old_key_is_not_found(self):
+        """После смены slug или username прежний ключ ленты отдаёт 404,
+        новый работает."""
+        url = reverse("posts:feed_cards")
+        old = [f"group:{self.group.slug}", f"profile:{self.author.username}"]
+        for feed in old:
+            response = self.client.get(url, {"feed": feed})
+            self.assertEqual(response.status_code, 200)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = "renamed-slug"
+        group.save()
+        author = User.objects.get(pk=self.author.pk)
+        author.username = "renamed"
+        author.save()
+        for feed in old:
+            with self.subTest(feed=feed):
+                response = self.client.get(url, {"feed": feed})
+                self.assertEqual(response.status_code, 404)
+        for feed in ("group:renamed-slug", "profile:renamed"):
+            with self.subTest(feed=feed):
+                response = self.client.get(url, {"feed": feed})
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class LightweightEndpointsTest(TestCase):
+    AJAX = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.post = Post.objects.create(text="Тестовый пост", author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_follow_and_unfollow_are_idempotent(self):
+        """Подписка и отписка из скрипта отвечают 204,
+        повторный запрос ничего не меняет."""
+        follow = reverse("posts:profile_follow", args=["author"])
+        unfollow = reverse("posts:profile_unfollow", args=["author"])
+        for _ in range(2):
+            response = self.client.post(follow, **self.AJAX)
+            self.assertEqual(response.status_code, 204)
+        follows = Follow.objects.filter(user=self.reader, author=self.author)
+        self.assertEqual(follows.count(), 1)
+        for _ in range(2):
+            response = self.client.post(unfollow, **self.AJAX)
+            self.assertEqual(response.status_code, 204)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_unknown_author_is_not_found(self):
+        """Подписка и отписка на несуществующего автора — 404."""
+        for route in ("posts:profile_follow", "posts:profile_unfollow"):
+            for extra in ({}, self.AJAX):
+                with self.subTest(route=route, ajax=bool(extra)):
+                    response = self.client.post(
+                        reverse(route, args=["missing"]), **extra
+                    )
+                    self.assertEqual(response.status_code, 404)
+
+    def test_follow_does_not_render_feed(self):
+        """Подписка из скрипта не выполняет запросов ленты подписок:
+        ни один из её запросов не соединяет таблицы."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse("posts:profile_follow", args=["author"]), **self.AJAX
+            )
+        self.assertEqual(response.content, b"")
+        joins = [
+            query["sql"]
+            for query in queries.captured_queries
+            if " JOIN " in query["sql"]
+        ]
+        self.assertEqual(joins, [])
+
+    def test_comment_returns_fragment(self):
+        """Комментарий из скрипта возвращает только свой HTML,
+        повторная отправка той же формы не создаёт дубль."""
+        url = reverse("posts:add_comment", args=[self.post.pk])
+        data = {"text": "Новый комментарий", "idempotency_key": "abc"}
+        response = self.client.post(url, data, **self.AJAX)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Новый комментарий")
+        self.assertNotContains(response, "<html")
+        response = self.client.post(url, data, **self.AJAX)
+        self.assertEqual(response.status_code, 204)
+        response = self.client.post(url, data)
+        self.assertRedirects(
+            response, reverse("posts:post_detail", args=[self.post.pk])
+        )
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_invalid_comment_returns_errors(self):
+        """Пустой комментарий из скрипта — 400 с ошибками формы."""
+        response = self.client.post(
+            reverse("posts:add_comment", args=[self.post.pk]),
+            {"text": ""},
+            **self.AJAX,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("text", response.json()["errors"])
@@ -0,0 +1,257 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from constants import SHOW_TEN
+from posts import feeds
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+        for i in range(13):
+            Post.objects.create(text=f"Тестовый пост {i}", author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def feed_queries(self, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("posts:index"), data)
+        page_queries = [
+            query["sql"]
+            for query in queries.captured_queries
+            if "LIMIT" in query["sql"]
+        ]
+        return response.context["page_obj"], page_queries
+
+    def test_cached_page_skips_feed_query(self):
+        """Повторный запрос страницы не выполняет запрос ленты,
+        включая страницы по курсору."""
+        page, page_queries = self.feed_queries()
+        self.assertEqual(len(page_queries), 1)
+        cached_page, page_queries = self.feed_queries()
+        self.assertEqual(page_queries, [])
+        self.assertEqual(list(cached_page), list(page))
+        data = {"cursor": page.paginator.next_cursor}
+        self.feed_queries(data)
+        second_page, page_queries = self.feed_queries(data)
+        self.assertEqual(page_queries, [])
+        self.assertEqual(len(second_page), 3)
+        self.assertTrue(second_page.has_previous())
+
+    def test_new_post_bumps_generation(self):
+        """Новый пост сразу виден на главной."""
+        self.feed_queries()
+        post = Post.objects.create(text="Свежий пост", author=self.user)
+        page, page_queries = self.feed_queries()
+        self.assertEqual(len(page_queries), 1)
+        self.assertEqual(page[0], post)
+
+    def test_stale_page_served_while_recomputing(self):
+        """Пока другой воркер пересчитывает страницу,
+        отдаётся прежний список без запроса ленты."""
+        page, _ = self.feed_queries()
+        feeds.bump_generation()
+        cache.add(feeds.page_key("index", None) + ":lock", True)
+        stale_page, page_queries = self.feed_queries()
+        self.assertEqual(page_queries, [])
+        self.assertEqual(list(stale_page), list(page))
+
+
+@override_settings(JOBS_SYNC=True)
+class NewPostsTest(TestCase):
+    """Счётчик новых постов в лентах по курсору."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.other = User.objects.create_user(username="other")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.create(text="Старый пост", author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def since(self, url):
+        return self.client.get(url).context["since"]
+
+    def poll(self, feed, since, **headers):
+        return self.client.get(
+            reverse("posts:new_posts"),
+            {"feed": feed, "since": since},
+            **headers,
+        )
+
+    def publish(self, author, count=1, group=None):
+        return [
+            Post.objects.create(text=f"Пост {i}", author=author, group=group)
+            for i in range(count)
+        ]
+
+    def test_index_counts_from_cache(self):
+        """Новые посты считаются по голове ленты в кеше без запросов."""
+        since = self.since(reverse("posts:index"))
+        self.assertEqual(self.poll("index", since).json()["count"], 0)
+        self.publish(self.other, 2)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                reverse("posts:new_posts"), {"feed": "index", "since": since}
+            )
+        self.assertEqual(response.json(), {"count": 2, "more": False})
+        Post.objects.filter(author=self.other).first().delete()
+        self.assertEqual(self.poll("index", since).json()["count"], 1)
+
+    def test_group_and_follow_feeds(self):
+        """Лента группы считает посты группы, лента подписок —
+        посты авторов, на которых подписан пользователь."""
+        group_since = self.since(
+            reverse("posts:group_posts", args=[self.group.slug])
+        )
+        follow_since = self.since(reverse("posts:follow_index"))
+        self.publish(self.other, 2, self.group)
+        self.publish(self.author, 1)
+        response = self.poll(f"group:{self.group.slug}", group_since)
+        self.assertEqual(response.json()["count"], 2)
+        response = self.poll("follow", follow_since)
+        self.assertEqual(response.json()["count"], 1)
+        Follow.objects.create(user=self.reader, author=self.other)
+        response = self.poll("follow", follow_since)
+        self.assertEqual(response.json()["count"], 3)
+
+    def test_head_overflow(self):
+        """Если новых постов больше, чем помещается в голову, общая
+        лента отвечает «не меньше», лента подписок считает по базе."""
+        since = self.since(reverse("posts:index"))
+        with mock.patch("posts.watermarks.NEW_POSTS_HEAD_SIZE", 2):
+            self.publish(self.other, 3)
+            self.publish(self.author, 1)
+            response = self.poll("index", since)
+            self.assertEqual(response.json(), {"count": 2, "more": True})
+            response = self.poll("follow", since)
+            self.assertEqual(response.json(), {"count": 1, "more": False})
+
+    def test_event_stream(self):
+        """Для EventSource ответ — одно событие с интервалом повтора."""
+        response = self.poll("index", "", HTTP_ACCEPT="text/event-stream")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(
+            response.content.decode(),
+            'retry: 15000\ndata: {"count": 1, "more": false}\n\n',
+        )
+
+    def test_errors(self):
+        """Неверный курсор, неизвестная лента или группа и лента
+        подписок без входа дают ошибку."""
+        self.assertEqual(self.poll("index", "abc").status_code, 400)
+        self.assertEqual(self.poll("unknown", "").status_code, 400)
+        self.assertEqual(self.poll("group:missing", "").status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.poll("follow", "").status_code, 403)
+
+    def test_banner_on_first_page_only(self):
+        """Баннер новых постов есть только на первой странице ленты."""
+        self.publish(self.other, SHOW_TEN)
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, "data-new-posts")
+        response = self.client.get(
+            reverse("posts:index"),
+            {"cursor": response.context["page_obj"].paginator.next_cursor},
+        )
+        self.assertNotContains(response, "data-new-posts")
+
+
+class FeedCardsTest(TestCase):
+    """Порции карточек лент для бесконечной прокрутки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.other = User.objects.create_user(username="other")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(SHOW_TEN + 3):
+            Post.objects.create(
+                text=f"Пост группы {i}", author=cls.author, group=cls.group
+            )
+            Post.objects.create(text=f"Другой пост {i}", author=cls.other)
+
+    def setUp(self):
+        cache.clear()
+
+    def cards(self, feed, cursor=None, client=None):
+        return (client or self.client).get(
+            reverse("posts:feed_cards"),
+            {"feed": feed, **({"cursor": cursor} if cursor else {})},
+        )
+
+    def test_cards_match_page(self):
+        """Порция содержит те же посты, что и следующая страница,
+        но без base.html, и ведёт к порции за ней."""
+        url = reverse("posts:index")
+        page = self.client.get(url).context["page_obj"]
+        self.assertContains(self.client.get(url), "data-cards")
+        cursor = page.paginator.next_cursor
+        response = self.cards("index", cursor)
+        expected = self.client.get(url, {"cursor": cursor}).context["page_obj"]
+        self.assertEqual(
+            list(response.context["page_obj"]), list(expected.object_list)
+        )
+        self.assertNotContains(response, "<html")
+        self.assertContains(response, "data-next")
+        self.assertIn("public", response["Cache-Control"])
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+
+    def test_group_and_profile_cards(self):
+        """Порции группы и профиля содержат только их посты."""
+        for feed, author in (
+            (f"group:{self.group.slug}", self.author),
+            ("profile:other", self.other),
+        ):
+            with self.subTest(feed=feed):
+                response = self.cards(feed)
+                posts = response.context["page_obj"]
+                self.assertEqual(len(posts), SHOW_TEN)
+                self.assertTrue(all(post.author == author for post in posts))
+                cursor = posts.paginator.next_cursor
+                response = self.cards(feed, cursor)
+                self.assertEqual(len(response.context["page_obj"]), 3)
+                self.assertNotContains(response, "data-next")
+
+    def test_follow_cards_are_private(self):
+        """Порция ленты подписок только для вошедших и не кешируется
+        общими кешами."""
+        response = self.cards("follow")
+        self.assertEqual(response.status_code, 302)
+        reader = Client()
+        reader.force_login(self.reader)
+        response = self.cards("follow", client=reader)
+        self.assertIn("private", response["Cache-Control"])
+        posts = response.context["page_obj"]
+        self.assertTrue(all(post.author == self.author for post in posts))
+
+    def test_unknown_feed(self):
+        """Неизвестная лента, группа или автор — 404."""
+        for feed in ("unknown", "group:missing", "profile:missing"):
+            with self.subTest(feed=feed):
+                self.assertEqual(self.cards(feed).status_code, 404)
@@ -3,10 +3,14 @@ import tempfile
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from posts import conditional, feeds, thumbnails
 from posts.forms import PostForm
 from posts.models import Group, Post, Comment
 
@@ -14,7 +18,7 @@ User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_SYNC=True)
 class PostFormsTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -132,3 +136,122 @@ class PostFormsTests(TestCase):
             follow=True,
         )
         self.assertFalse(Comment.objects.filter(text="Test comment").exists())
+
+    def test_thumbnail_generated_on_upload(self):
+        """При загрузке картинки создаются миниатюра 960x339
+        и варианты для srcset, до их появления показывается
+        исходная картинка."""
+        small_gif = (
+            b"\x47\x49\x46\x38\x39\x61\x02\x00"
+            b"\x01\x00\x80\x00\x00\x00\x00\x00"
+            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+            b"\x0A\x00\x3B"
+        )
+        uploaded = SimpleUploadedFile(
+            name="thumb.gif", content=small_gif, content_type="image/gif"
+        )
+        self.authorized_user.post(
+            reverse("posts:post_edit", args=(self.post.pk,)),
+            data={"text": self.post.text, "image": uploaded},
+        )
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertTrue(post.thumbnail)
+        with Image.open(post.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (960, 339))
+        response = self.guest.get(
+            reverse("posts:post_detail", args=(post.pk,))
+        )
+        self.assertContains(response, post.thumbnail.url)
+        self.assertContains(response, "<picture>")
+        for width in (320, 640, 960):
+            with self.subTest(width=width):
+                self.assertIn(f"{width}w", post.image_srcset)
+        self.assertContains(response, post.image_srcset)
+        for source in post.image_sources:
+            self.assertContains(response, source["srcset"])
+        Post.objects.filter(pk=post.pk).update(thumbnail="")
+        response = self.guest.get(
+            reverse("posts:post_detail", args=(post.pk,))
+        )
+        self.assertContains(response, post.image.url)
+
+    def test_thumbnail_regeneration_replaces_files(self):
+        """Повторная генерация удаляет прежние варианты и сбрасывает
+        кеши страниц, как сохранение поста."""
+        small_gif = (
+            b"\x47\x49\x46\x38\x39\x61\x02\x00"
+            b"\x01\x00\x80\x00\x00\x00\x00\x00"
+            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+            b"\x0A\x00\x3B"
+        )
+        self.authorized_user.post(
+            reverse("posts:post_edit", args=(self.post.pk,)),
+            data={
+                "text": self.post.text,
+                "image": SimpleUploadedFile(
+                    name="again.gif",
+                    content=small_gif,
+                    content_type="image/gif",
+                ),
+            },
+        )
+        post = Post.objects.get(pk=self.post.pk)
+        previous = thumbnails.variant_names(post)
+        scopes = conditional.post_scopes_changed(post)
+        versions = conditional.versions(scopes)
+        generation = cache.get(feeds.GENERATION_KEY)
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        current = thumbnails.variant_names(post)
+        self.assertTrue(current)
+        self.assertFalse(previous & current)
+        for name in previous:
+            with self.subTest(name=name):
+                self.assertFalse(default_storage.exists(name))
+        for name in current:
+            with self.subTest(name=name):
+                self.assertTrue(default_storage.exists(name))
+        self.assertNotEqual(cache.get(feeds.GENERATION_KEY), generation)
+        for old, new in zip(versions, conditional.versions(scopes)):
+            self.assertLess(old, new)
+
+    def test_replaced_image_files_are_deleted(self):
+        """Замена картинки и удаление поста удаляют прежние файлы:
+        исходник и все его варианты."""
+        small_gif = (
+            b"\x47\x49\x46\x38\x39\x61\x02\x00"
+            b"\x01\x00\x80\x00\x00\x00\x00\x00"
+            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+            b"\x0A\x00\x3B"
+        )
+        post = Post.objects.create(text="С картинкой", author=self.user)
+        url = reverse("posts:post_edit", args=(post.pk,))
+        stored = []
+        for name in ("first.gif", "second.gif"):
+            self.authorized_user.post(
+                url,
+                data={
+                    "text": post.text,
+                    "image": SimpleUploadedFile(
+                        name=name, content=small_gif, content_type="image/gif"
+                    ),
+                },
+            )
+            post.refresh_from_db()
+            stored.append(thumbnails.stored_files(post))
+        previous, current = stored
+        self.assertTrue(previous)
+        self.assertFalse(previous & current)
+        for name in previous:
+            with self.subTest(name=name):
+                self.assertFalse(default_storage.exists(name))
+        post.delete()
+        for name in current:
+            with self.subTest(name=name):
+                self.assertFalse(default_storage.exists(name))
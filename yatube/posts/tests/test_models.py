@@ -1,9 +1,15 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
 from constants import SYMBOLS_LIMIT
 
-from ..models import Group, Post
+from ..models import AuthorStats, Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -29,3 +35,115 @@ class PostModelTest(TestCase):
         group_name = PostModelTest.group
         self.assertEqual(post_text.__str__(), post_text.text[:SYMBOLS_LIMIT])
         self.assertEqual(group_name.__str__(), "Тестовая группа")
+
+
+@override_settings(JOBS_SYNC=True)
+class PostIndexUsageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="auth")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test_slug",
+            description="Тестовое описание группы",
+        )
+        for i in range(25):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f"Пост {i}"
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f"Комментарий {i}"
+            )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def query_plans(self, url):
+        response = self.authorized_client.get(url)
+        data = {}
+        if "page_obj" in response.context:
+            data["cursor"] = response.context["page_obj"].paginator.next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url, data)
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                yield query["sql"], [row[-1] for row in cursor.fetchall()]
+
+    def test_views_queries_use_indexes(self):
+        """Запросы страниц читают индексы, без сортировки и полного скана."""
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_posts", args=(self.group.slug,)),
+            reverse("posts:profile", args=(self.author.username,)),
+            reverse("posts:post_detail", args=(self.post.pk,)),
+            reverse("posts:follow_index"),
+        )
+        for url in urls:
+            for sql, plan in self.query_plans(url):
+                with self.subTest(url=url, sql=sql):
+                    for step in plan:
+                        self.assertNotIn("TEMP B-TREE", step)
+                        self.assertFalse(
+                            step.startswith("SCAN") and "INDEX" not in step,
+                            step,
+                        )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="auth")
+        cls.reader = User.objects.create_user(username="reader")
+
+    def assertCounters(self, posts, followers):
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, posts)
+        self.assertEqual(stats.followers_count, followers)
+
+    def test_counters_follow_writes_and_deletes(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(author=self.author, text="Пост")
+        Post.objects.create(author=self.author, text="Ещё пост")
+        Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text="Текст")
+        self.assertCounters(posts=2, followers=1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Comment.objects.filter(post=post).delete()
+        Follow.objects.filter(author=self.author).delete()
+        post.delete()
+        self.assertCounters(posts=1, followers=0)
+        self.assertEqual(Post.objects.get().comments_count, 0)
+
+    def test_rebuild_counters_fixes_drift(self):
+        """Команда rebuild_counters пересчитывает разошедшиеся счётчики."""
+        post = Post.objects.create(author=self.author, text="Пост")
+        Comment.objects.create(post=post, author=self.reader, text="Текст")
+        AuthorStats.objects.update(posts_count=10, followers_count=3)
+        Post.objects.update(comments_count=0)
+        call_command("rebuild_counters", stdout=StringIO())
+        self.assertCounters(posts=1, followers=0)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_post_delete_does_not_touch_each_comment(self):
+        """Удаление поста не обновляет счётчик и страницы поста
+        за каждый каскадно удалённый комментарий."""
+        counts = []
+        for comments in (1, 5):
+            post = Post.objects.create(author=self.author, text="Пост")
+            Comment.objects.bulk_create(
+                Comment(post=post, author=self.reader, text="Текст")
+                for _ in range(comments)
+            )
+            with CaptureQueriesContext(connection) as queries:
+                post.delete()
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertCounters(posts=0, followers=0)
@@ -0,0 +1,292 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core.paginator import CursorPaginator
+from core.tests.query_budget import Budget, QueryBudgetMixin
+from posts import urls as posts_urls
+from posts.models import Comment, Follow, Group, Post
+from users import urls as users_urls
+
+User = get_user_model()
+
+# Для авторизованных два запроса уходят на сессию и пользователя,
+# для записи в тестах добавляются SAVEPOINT и RELEASE SAVEPOINT.
+# Группе, профилю и посту на холодном кеше нужен ещё запрос id
+# для условного GET (posts.conditional).
+BUDGETS = {
+    "posts:index": Budget(3),
+    "posts:search": Budget(2),
+    "posts:group_posts": Budget(3),
+    "posts:profile": Budget(3),
+    "posts:post_detail": Budget(3),
+    "posts:post_comments": Budget(1),
+    "posts:feed_cards": Budget(3),
+    "posts:fragments": Budget(3),
+    "posts:new_posts": Budget(4),
+    "posts:post_create": Budget(3),
+    "posts:post_edit": Budget(4),
+    "posts:add_comment": Budget(5),
+    "posts:follow_index": Budget(4),
+    "posts:profile_follow": Budget(10),
+    "posts:profile_unfollow": Budget(7),
+    "users:signup": Budget(0),
+    "users:logout": Budget(4),
+    "users:login": Budget(0),
+    "users:password_change": Budget(2),
+    "users:password_change_done": Budget(2),
+    "users:password_reset_form": Budget(0),
+    "users:passwoed_reset_done": Budget(0),
+    "users:password_reset_confirm": Budget(5),
+    "users:password_reset_complete": Budget(0),
+}
+
+
+@override_settings(JOBS_SYNC=True)
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Число запросов каждой страницы не растёт вместе с данными."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        cls.post = Post.objects.create(
+            text="Тестовый пост", author=cls.author, group=cls.group
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.grow()
+
+    @classmethod
+    def grow(cls):
+        """Добавляет порцию данных: посты, комментаторов, подписки."""
+        start = User.objects.filter(username__startswith="user").count()
+        for i in range(start, start + 15):
+            user = User.objects.create_user(username=f"user{i}")
+            Post.objects.create(
+                text=f"Тестовый пост {i}", author=cls.author, group=cls.group
+            )
+            Post.objects.create(text=f"Пост {i}", author=user)
+            Comment.objects.create(
+                post=cls.post, author=user, text=f"Комментарий {i}"
+            )
+            Follow.objects.create(user=cls.reader, author=user)
+
+    def client_for(self, user=None):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    def since(self):
+        """Курсор, с которого в голову ленты новые посты уже не влезают."""
+        oldest = Post.objects.order_by("pub_date", "id").first()
+        return CursorPaginator(Post.objects.none(), 1).encode_cursor(
+            oldest, 1
+        )
+
+    def route_requests(self):
+        """Запрос к каждому маршруту: (клиент, метод, URL, данные)."""
+        reader = self.client_for(self.reader)
+        author = self.client_for(self.author)
+        Follow.objects.filter(
+            user=self.author, author__username="user0"
+        ).delete()
+        Follow.objects.get_or_create(
+            user=self.author, author=User.objects.get(username="user1")
+        )
+        uid = urlsafe_base64_encode(force_bytes(self.reader.pk))
+        token = default_token_generator.make_token(self.reader)
+        post_id = {"post_id": self.post.pk}
+        return {
+            "posts:index": (
+                self.client_for(),
+                "get",
+                reverse("posts:index"),
+                None,
+            ),
+            "posts:search": (
+                self.client_for(),
+                "get",
+                reverse("posts:search"),
+                {"q": "тестовый"},
+            ),
+            "posts:group_posts": (
+                self.client_for(),
+                "get",
+                reverse("posts:group_posts", args=[self.group.slug]),
+                None,
+            ),
+            "posts:profile": (
+                self.client_for(),
+                "get",
+                reverse("posts:profile", args=[self.author.username]),
+                None,
+            ),
+            "posts:post_detail": (
+                self.client_for(),
+                "get",
+                reverse("posts:post_detail", kwargs=post_id),
+                None,
+            ),
+            "posts:post_comments": (
+                self.client_for(),
+                "get",
+                reverse("posts:post_comments", kwargs=post_id),
+                None,
+            ),
+            "posts:feed_cards": (
+                self.client_for(),
+                "get",
+                reverse("posts:feed_cards"),
+                {"feed": f"group:{self.group.slug}"},
+            ),
+            "posts:fragments": (
+                reader,
+                "get",
+                reverse("posts:fragments"),
+                {
+                    "names": [
+                        "user_menu",
+                        "switcher",
+                        "follow",
+                        "comment_form",
+                    ],
+                    "author": self.author.username,
+                    "post": self.post.pk,
+                },
+            ),
+            "posts:new_posts": (
+                reader,
+                "get",
+                reverse("posts:new_posts"),
+                {"feed": "follow", "since": self.since()},
+            ),
+            "posts:post_create": (
+                author,
+                "get",
+                reverse("posts:post_create"),
+                None,
+            ),
+            "posts:post_edit": (
+                author,
+                "get",
+                reverse("posts:post_edit", kwargs=post_id),
+                None,
+            ),
+            "posts:add_comment": (
+                reader,
+                "post",
+                reverse("posts:add_comment", kwargs=post_id),
+                {"text": "Новый комментарий"},
+            ),
+            "posts:follow_index": (
+                reader,
+                "get",
+                reverse("posts:follow_index"),
+                None,
+            ),
+            "posts:profile_follow": (
+                author,
+                "get",
+                reverse("posts:profile_follow", args=["user0"]),
+                None,
+            ),
+            "posts:profile_unfollow": (
+                author,
+                "get",
+                reverse("posts:profile_unfollow", args=["user1"]),
+                None,
+            ),
+            "users:signup": (
+                self.client_for(),
+                "get",
+                reverse("users:signup"),
+                None,
+            ),
+            "users:logout": (
+                self.client_for(self.reader),
+                "get",
+                reverse("users:logout"),
+                None,
+            ),
+            "users:login": (
+                self.client_for(),
+                "get",
+                reverse("users:login"),
+                None,
+            ),
+            "users:password_change": (
+                reader,
+                "get",
+                reverse("users:password_change"),
+                None,
+            ),
+            "users:password_change_done": (
+                reader,
+                "get",
+                reverse("users:password_change_done"),
+                None,
+            ),
+            "users:password_reset_form": (
+                self.client_for(),
+                "get",
+                reverse("users:password_reset_form"),
+                None,
+            ),
+            "users:passwoed_reset_done": (
+                self.client_for(),
+                "get",
+                reverse("users:passwoed_reset_done"),
+                None,
+            ),
+            "users:password_reset_confirm": (
+                self.client_for(),
+                "get",
+                reverse("users:password_reset_confirm", args=[uid, token]),
+                None,
+            ),
+            "users:password_reset_complete": (
+                self.client_for(),
+                "get",
+                reverse("users:password_reset_complete"),
+                None,
+            ),
+        }
+
+    def test_every_route_has_budget(self):
+        """Бюджет объявлен для каждого маршрута posts и users."""
+        routes = {
+            f"{module.app_name}:{pattern.name}"
+            for module in (posts_urls, users_urls)
+            for pattern in module.urlpatterns
+        }
+        self.assertEqual(routes, set(BUDGETS))
+        self.assertEqual(set(self.route_requests()), set(BUDGETS))
+
+    def test_routes_within_budget(self):
+        """Маршруты укладываются в бюджет, и число запросов
+        не меняется, когда постов, комментариев и подписок
+        становится больше."""
+        counts = {}
+        for name, args in self.route_requests().items():
+            with self.subTest(route=name):
+                recorder = self.assertWithinBudget(name, BUDGETS[name], *args)
+                counts[name] = len(recorder.queries)
+        self.grow()
+        self.grow()
+        for name, args in self.route_requests().items():
+            with self.subTest(route=name, grown=True):
+                recorder = self.assertWithinBudget(name, BUDGETS[name], *args)
+                self.assertEqual(
+                    len(recorder.queries),
+                    counts.get(name),
+                    f"{name}: число запросов растёт с объёмом данных\n"
+                    + recorder.report(),
+                )
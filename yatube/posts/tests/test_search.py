@@ -0,0 +1,159 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass"
+        )
+        cls.cat_post = Post.objects.create(
+            text="Кот спит. Кот ест. Кот гуляет сам по себе.",
+            author=cls.user,
+        )
+        cls.dog_post = Post.objects.create(
+            text="Собака и кот живут в одном доме", author=cls.user
+        )
+        cls.other_post = Post.objects.create(
+            text="Про погоду и дождь", author=cls.user
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query, **data):
+        response = self.client.get(
+            reverse("posts:search"), {"q": query, **data}
+        )
+        return list(response.context["page_obj"])
+
+    def test_search_ranks_matches(self):
+        """Поиск находит посты по словам без учёта регистра
+        и ставит более релевантные выше."""
+        self.assertEqual(self.search("КОТ"), [self.cat_post, self.dog_post])
+        self.assertEqual(self.search("соба"), [self.dog_post])
+        self.assertEqual(self.search("кот дождь"), [])
+        self.assertEqual(self.search(""), [])
+
+    def test_search_renders_cards(self):
+        """Результаты выводятся общими карточками, пустой поиск —
+        сообщением."""
+        url = reverse("posts:search")
+        response = self.client.get(url, {"q": "собака"})
+        self.assertContains(response, self.dog_post.text)
+        self.assertNotContains(response, "Ничего не найдено")
+        response = self.client.get(url, {"q": "жираф"})
+        self.assertContains(response, "Ничего не найдено")
+
+    def test_search_handles_fts_syntax(self):
+        """Служебные символы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(self.search('"кот" OR * NEAR('), [])
+        self.assertEqual(self.search('кот"'), [self.cat_post, self.dog_post])
+
+    def test_index_follows_edit_and_delete(self):
+        """Правка и удаление поста сразу отражаются в поиске."""
+        dog_post = Post.objects.get(pk=self.dog_post.pk)
+        dog_post.text = "Собака живёт одна"
+        dog_post.save()
+        self.assertEqual(self.search("кот"), [self.cat_post])
+        self.assertEqual(self.search("одна"), [dog_post])
+        Post.objects.get(pk=self.cat_post.pk).delete()
+        self.assertEqual(self.search("кот"), [])
+
+    def test_search_paginates(self):
+        """Результаты поиска разбиты на страницы."""
+        for i in range(12):
+            Post.objects.create(text=f"Дождь номер {i}", author=self.user)
+        self.assertEqual(len(self.search("дождь")), 10)
+        self.assertEqual(len(self.search("дождь", page=2)), 3)
+
+    def test_rebuild_restores_index(self):
+        """rebuild() заново наполняет индекс из таблицы постов."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.FTS_TABLE}")
+        self.assertEqual(self.search("кот"), [])
+        search.rebuild()
+        self.assertEqual(self.search("кот"), [self.cat_post, self.dog_post])
+
+    def test_fallback_without_index(self):
+        """На базе без полнотекстового индекса поиск идёт
+        по вхождению слов, новые посты первыми."""
+        with mock.patch.dict(search.BACKENDS, clear=True):
+            self.assertFalse(search.enabled())
+            self.assertEqual(self.search("дом"), [self.dog_post])
+            self.assertEqual(
+                self.search("и"),
+                [self.other_post, self.dog_post, self.cat_post],
+            )
+            self.assertEqual(self.search("кот дождь"), [])
+
+    def test_postgres_expression(self):
+        """Слова запроса становятся префиксами tsquery,
+        служебные символы отбрасываются."""
+        self.assertEqual(
+            search.PostgresSearch.expression("Кот & !соба:*"),
+            "кот:* & соба:*",
+        )
+        self.assertEqual(search.PostgresSearch.expression("'|"), "")
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке находит посты через полнотекстовый индекс."""
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("admin:posts_post_changelist"), {"q": "собака"}
+        )
+        self.assertEqual(
+            list(response.context["cl"].result_list), [self.dog_post]
+        )
+
+    def test_admin_search_is_complete(self):
+        """Админка находит все совпадения без предела результатов
+        и кеша поиска, порядок задаёт сама админка."""
+        self.client.force_login(self.user)
+        url = reverse("admin:posts_post_changelist")
+        with mock.patch.object(
+            search.FTS5Search, "search_ids", side_effect=AssertionError
+        ):
+            response = self.client.get(url, {"q": "кот"})
+            self.assertEqual(
+                list(response.context["cl"].result_list),
+                [self.dog_post, self.cat_post],
+            )
+            self.assertEqual(response.context["cl"].result_count, 2)
+            response = self.client.get(url, {"q": "кот", "o": "2"})
+            self.assertEqual(
+                list(response.context["cl"].result_list),
+                [self.cat_post, self.dog_post],
+            )
+            response = self.client.get(url, {"q": "!!"})
+            self.assertEqual(list(response.context["cl"].result_list), [])
+
+    def test_pages_share_ranking(self):
+        """Ранжирование выполняется один раз на запрос, страницы
+        берут id из кеша; новый пост сбрасывает кеш."""
+        for i in range(12):
+            Post.objects.create(text=f"Дождь номер {i}", author=self.user)
+        with mock.patch.object(
+            search.FTS5Search,
+            "search_ids",
+            autospec=True,
+            side_effect=search.FTS5Search.search_ids,
+        ) as ranked:
+            self.search("дождь")
+            self.search("Дождь", page=2)
+            self.assertEqual(ranked.call_count, 1)
+            Post.objects.create(text="Снова дождь", author=self.user)
+            self.assertEqual(len(self.search("дождь", page=2)), 4)
+            self.assertEqual(ranked.call_count, 2)
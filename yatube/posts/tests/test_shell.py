@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.db_router import PIN_COOKIE
+from core.shell import SIGNED_IN_COOKIE
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class SharedShellTest(TestCase):
+    """Публичные страницы общие для всех, персональное — фрагментами."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(
+            username="reader", password="password"
+        )
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        cls.post = Post.objects.create(
+            text="Тестовый пост", author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_pages_are_shared(self):
+        """Вошедший получает ту же оболочку, что и гость: публичный
+        Cache-Control, без Vary: Cookie, без cookie и без его имени."""
+        for url in (
+            reverse("posts:index"),
+            reverse("posts:search"),
+            reverse("posts:group_posts", args=[self.group.slug]),
+            reverse("posts:profile", args=[self.author.username]),
+            reverse("posts:post_detail", args=[self.post.pk]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("public", response["Cache-Control"])
+                self.assertIn("no-cache", response["Cache-Control"])
+                self.assertNotIn("max-age", response["Cache-Control"])
+                self.assertNotIn("Cookie", response.get("Vary", ""))
+                self.assertEqual(response.cookies, {})
+                self.assertNotContains(response, "reader")
+                self.assertNotContains(response, "csrfmiddlewaretoken")
+                self.assertContains(response, 'data-personal="user_menu"')
+
+    def test_pinned_pages_are_private(self):
+        """После записи (cookie PIN_COOKIE) оболочка не попадает
+        в общий кеш."""
+        self.client.cookies[PIN_COOKIE] = "1"
+        response = self.client.get(reverse("posts:index"))
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertNotIn("public", response["Cache-Control"])
+
+    def test_fragments_are_personal(self):
+        """Фрагменты отрисованы для вошедшего и не кешируются общими."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(
+            reverse("posts:fragments"),
+            {
+                "names": ["user_menu", "follow", "comment_form", "missing"],
+                "author": self.author.username,
+                "post": self.post.pk,
+            },
+        )
+        fragments = response.json()
+        self.assertEqual(
+            set(fragments), {"user_menu", "follow", "comment_form"}
+        )
+        self.assertIn("Пользователь: reader", fragments["user_menu"])
+        self.assertIn("csrfmiddlewaretoken", fragments["comment_form"])
+        self.assertIn(
+            reverse("posts:profile_unfollow", args=[self.author.username]),
+            fragments["follow"],
+        )
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("Cookie", response["Vary"])
+
+    def test_fragments_without_parameters_are_skipped(self):
+        """Фрагмент без нужного параметра не возвращается."""
+        response = self.client.get(
+            reverse("posts:fragments"), {"names": ["follow", "comment_form"]}
+        )
+        self.assertEqual(response.json(), {})
+
+    def test_signed_in_cookie_follows_session(self):
+        """Вход ставит cookie-признак для скрипта оболочки, выход снимает."""
+        client = Client()
+        response = client.post(
+            reverse("users:login"),
+            {"username": "reader", "password": "password"},
+        )
+        self.assertEqual(response.cookies[SIGNED_IN_COOKIE].value, "1")
+        response = client.get(reverse("users:logout"))
+        self.assertEqual(response.cookies[SIGNED_IN_COOKIE].value, "")
@@ -0,0 +1,183 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import jobs
+from core.models import Job
+from posts import timeline
+from posts.models import AuthorStats, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+@override_settings(JOBS_SYNC=True)
+class FollowTimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="follower")
+        cls.author = User.objects.create_user(username="author")
+        cls.old_post = Post.objects.create(
+            text="Старый пост", author=cls.author
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_timeline_backfill_fan_out_and_trim(self):
+        """Подписка заполняет ленту, новый пост раскладывается,
+        отписка очищает ленту."""
+        self.authorized_client.get(
+            reverse("posts:profile_follow", args=(self.author.username,))
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.user, post=self.old_post
+            ).exists()
+        )
+        new_post = Post.objects.create(text="Новый пост", author=self.author)
+        response = self.authorized_client.get(reverse("posts:follow_index"))
+        self.assertEqual(
+            list(response.context["page_obj"]), [new_post, self.old_post]
+        )
+        self.authorized_client.get(
+            reverse("posts:profile_unfollow", args=(self.author.username,))
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    @override_settings(JOBS_SYNC=False)
+    def test_timeline_jobs_are_queued(self):
+        """Без синхронного режима подписка и новый пост ставят задачи,
+        а ленту заполняет воркер."""
+        self.authorized_client.get(
+            reverse("posts:profile_follow", args=(self.author.username,))
+        )
+        new_post = Post.objects.create(text="Новый пост", author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            set(Job.objects.values_list("key", flat=True)),
+            {
+                f"backfill:{self.user.pk}:{self.author.pk}",
+                f"fan-out:{new_post.pk}",
+            },
+        )
+        jobs.Worker(concurrency=0).run(burst=True)
+        self.assertEqual(
+            set(
+                TimelineEntry.objects.filter(user=self.user).values_list(
+                    "post", flat=True
+                )
+            ),
+            {self.old_post.pk, new_post.pk},
+        )
+
+    @override_settings(JOBS_SYNC=False)
+    def test_pending_backfill_is_read_on_request(self):
+        """Пока backfill ждёт воркера, посты автора добавляются
+        в ленту при чтении."""
+        self.authorized_client.get(
+            reverse("posts:profile_follow", args=(self.author.username,))
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        response = self.authorized_client.get(reverse("posts:follow_index"))
+        self.assertEqual(list(response.context["page_obj"]), [self.old_post])
+
+    @override_settings(JOBS_SYNC=False)
+    def test_failed_backfill_is_not_pending(self):
+        """Проваленный после всех попыток backfill не держит ленту
+        на слиянии при чтении."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(timeline.pending_ids(self.user), [self.author.pk])
+        Job.objects.update(status=Job.FAILED)
+        self.assertEqual(timeline.pending_ids(self.user), [])
+
+    def test_backfill_copies_only_recent_posts(self):
+        """При подписке в ленту попадают только TIMELINE_BACKFILL
+        последних постов автора, новые — все."""
+        newer = [
+            Post.objects.create(text=f"Пост {i}", author=self.author)
+            for i in range(2)
+        ]
+        with mock.patch("posts.timeline.TIMELINE_BACKFILL", 2):
+            Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(text="Новый пост", author=self.author)
+        response = self.authorized_client.get(reverse("posts:follow_index"))
+        self.assertEqual(
+            list(response.context["page_obj"]),
+            [new_post, *reversed(newer)],
+        )
+
+    def test_celebrity_posts_are_read_on_request(self):
+        """Посты автора с большим числом подписчиков не раскладываются,
+        но попадают в ленту при чтении."""
+        Follow.objects.create(user=self.user, author=self.author)
+        with mock.patch("posts.timeline.TIMELINE_FANOUT_LIMIT", 0):
+            post = Post.objects.create(text="Пост звезды", author=self.author)
+            self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+            response = self.authorized_client.get(
+                reverse("posts:follow_index")
+            )
+        self.assertIn(post, response.context["page_obj"])
+        self.assertIn(self.old_post, response.context["page_obj"])
+
+    def test_drifted_counter_keeps_posts_in_feed(self):
+        """Раскладка и чтение ленты решают по одному счётчику:
+        если он разошёлся с подписками, пост всё равно в ленте."""
+        other = User.objects.create_user(username="other")
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        stats = AuthorStats.objects.filter(user=self.author)
+        with mock.patch("posts.timeline.TIMELINE_FANOUT_LIMIT", 1):
+            for followers_count, fanned_out in ((0, True), (5, False)):
+                with self.subTest(followers_count=followers_count):
+                    stats.update(followers_count=followers_count)
+                    post = Post.objects.create(
+                        text=f"Пост при счётчике {followers_count}",
+                        author=self.author,
+                    )
+                    self.assertEqual(
+                        TimelineEntry.objects.filter(post=post).exists(),
+                        fanned_out,
+                    )
+                    response = self.authorized_client.get(
+                        reverse("posts:follow_index")
+                    )
+                    self.assertIn(post, response.context["page_obj"])
+
+    def test_rebuild_skips_celebrities(self):
+        """Пересборка лент не раскладывает посты знаменитостей,
+        они по-прежнему видны в ленте."""
+        other = User.objects.create_user(username="other")
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        with mock.patch("posts.timeline.TIMELINE_FANOUT_LIMIT", 1):
+            timeline.rebuild()
+            self.assertFalse(
+                TimelineEntry.objects.filter(author=self.author).exists()
+            )
+            response = self.authorized_client.get(
+                reverse("posts:follow_index")
+            )
+        self.assertIn(self.old_post, response.context["page_obj"])
+
+    def test_posts_reach_timeline_below_fan_out_limit(self):
+        """Посты, опубликованные, пока у автора было больше
+        подписчиков, чем лимит, раскладываются, когда он опускается
+        до лимита, и лента их не теряет."""
+        other = User.objects.create_user(username="other")
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        with mock.patch("posts.timeline.TIMELINE_FANOUT_LIMIT", 1):
+            post = Post.objects.create(text="Пост звезды", author=self.author)
+            self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+            Follow.objects.filter(user=other).delete()
+            response = self.authorized_client.get(
+                reverse("posts:follow_index")
+            )
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.assertIn(post, response.context["page_obj"])
@@ -6,16 +6,19 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from posts.models import Comment, Follow, Group, Post
+from posts.tests.test_query_budgets import BUDGETS
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_SYNC=True)
 class PostsPagesTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -215,14 +218,14 @@ class PostsPagesTest(TestCase):
         )
 
     def test_post_index_cache(self):
-        """Проверка кеша."""
-        response_1 = self.authorized_client.get(reverse('posts:index'))
-        self.post.delete()
-        response_2 = self.authorized_client.get(reverse('posts:index'))
+        """Проверка кеша: удалённый пост сразу пропадает с главной."""
+        response_1 = self.authorized_client.get(reverse("posts:index"))
+        response_2 = self.authorized_client.get(reverse("posts:index"))
         self.assertEqual(response_1.content, response_2.content)
-        cache.clear()
-        response_3 = self.authorized_client.get(reverse('posts:index'))
+        self.post.delete()
+        response_3 = self.authorized_client.get(reverse("posts:index"))
         self.assertNotEqual(response_1.content, response_3.content)
+        self.assertNotIn(self.post, response_3.context["page_obj"])
 
     def test_authorized_user_follow(self):
         """Авторизованный пользователь может подписываться
@@ -291,7 +294,9 @@ class PostPaginationTest(TestCase):
 
     def test_index_second_page_contains_three_records(self):
         """Корректная паджинация на странице index."""
-        response = self.client.get(reverse("posts:index") + "?page=2")
+        response = self.client.get(reverse("posts:index"))
+        cursor = response.context["page_obj"].paginator.next_cursor
+        response = self.client.get(reverse("posts:index"), {"cursor": cursor})
         self.assertEqual(len(response.context["page_obj"]), 3)
 
     def test_group_list_first_page_contains_ten_records(self):
@@ -303,10 +308,9 @@ class PostPaginationTest(TestCase):
 
     def test_group_list_second_page_contains_three_records(self):
         """Корректная паджинация на странице group_list."""
-        response = self.client.get(
-            reverse("posts:group_posts", kwargs={"slug": self.group.slug})
-            + "?page=2"
-        )
+        url = reverse("posts:group_posts", kwargs={"slug": self.group.slug})
+        cursor = self.client.get(url).context["page_obj"].paginator.next_cursor
+        response = self.client.get(url, {"cursor": cursor})
         self.assertEqual(len(response.context["page_obj"]), 3)
 
     def test_profile_first_page_contains_ten_records(self):
@@ -318,8 +322,103 @@ class PostPaginationTest(TestCase):
 
     def test_profile_page_contains_three_records(self):
         """Корректная паджинация на странице profile."""
+        url = reverse("posts:profile", kwargs={"username": self.user.username})
+        cursor = self.client.get(url).context["page_obj"].paginator.next_cursor
+        response = self.client.get(url, {"cursor": cursor})
+        self.assertEqual(len(response.context["page_obj"]), 3)
+
+    def test_cursor_previous_page_returns_first_records(self):
+        """Курсор предыдущей страницы возвращает на первую страницу."""
+        url = reverse("posts:index")
+        first_page = self.client.get(url).context["page_obj"]
+        cursor = first_page.paginator.next_cursor
+        second_page = self.client.get(url, {"cursor": cursor}).context[
+            "page_obj"
+        ]
+        self.assertTrue(second_page.has_previous())
+        self.assertFalse(second_page.has_next())
+        cursor = second_page.paginator.previous_cursor
+        response = self.client.get(url, {"cursor": cursor})
+        self.assertEqual(list(response.context["page_obj"]), list(first_page))
+        self.assertEqual(response.context["page_obj"].number, 1)
+
+    def test_cursor_page_does_not_count_or_offset(self):
+        """Страница по курсору не выполняет COUNT(*) и OFFSET."""
+        url = reverse("posts:group_posts", kwargs={"slug": self.group.slug})
+        cursor = self.client.get(url).context["page_obj"].paginator.next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {"cursor": cursor})
+        for query in queries.captured_queries:
+            self.assertNotIn("COUNT(", query["sql"].upper())
+            self.assertNotIn("OFFSET", query["sql"].upper())
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Некорректный курсор открывает первую страницу."""
         response = self.client.get(
-            reverse("posts:profile", kwargs={"username": self.user.username})
-            + "?page=2"
+            reverse("posts:index"), {"cursor": "не-курсор"}
         )
-        self.assertEqual(len(response.context["page_obj"]), 3)
+        self.assertEqual(response.context["page_obj"].number, 1)
+        self.assertEqual(len(response.context["page_obj"]), 10)
+
+
+@override_settings(JOBS_SYNC=True)
+class FeedQueryCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="reader")
+        cls.authors = [
+            User.objects.create_user(
+                username=f"author_{i}", first_name="Имя", last_name=str(i)
+            )
+            for i in range(5)
+        ]
+        cls.groups = [
+            Group.objects.create(
+                title=f"Группа {i}",
+                slug=f"group_{i}",
+                description="Тестовое описание",
+            )
+            for i in range(5)
+        ]
+        for i in range(50):
+            Post.objects.create(
+                text=f"Тестовый пост {i}",
+                author=cls.authors[i % 5],
+                group=cls.groups[0] if i % 3 else cls.groups[i % 5],
+            )
+        for author in cls.authors:
+            Follow.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def assertFeedQueries(self, client, url, budget):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(len(response.context["page_obj"]), 10)
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            "\n".join(query["sql"] for query in queries.captured_queries),
+        )
+
+    def test_feed_pages_do_not_query_per_post(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        # Бюджеты те же, что в таблице test_query_budgets: там же
+        # расписано, на что уходит каждый запрос.
+        pages = {
+            "posts:index": (),
+            "posts:group_posts": (self.groups[0].slug,),
+            "posts:profile": (self.authors[0].username,),
+            "posts:follow_index": (),
+        }
+        for name, args in pages.items():
+            with self.subTest(page=name):
+                self.assertFeedQueries(
+                    self.authorized_client,
+                    reverse(name, args=args),
+                    BUDGETS[name].queries,
+                )
@@ -0,0 +1,141 @@
+import json
+import logging
+from io import BytesIO
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from core import jobs
+
+from . import cards, conditional, feeds
+from .models import Post
+
+THUMBNAIL_SIZE = (960, 339)
+WIDTHS = (320, 640, 960)
+# Формат, расширение и параметры кодирования: от самого компактного
+# к самому совместимому. JPEG нужен всегда как запасной вариант.
+FORMATS = (
+    ("AVIF", "avif", {"quality": 60, "speed": 6}),
+    ("WEBP", "webp", {"quality": 75, "method": 6}),
+    ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+)
+
+logger = logging.getLogger(__name__)
+
+
+def available_formats():
+    """Форматы из FORMATS, которые умеет сохранять установленный Pillow."""
+    Image.init()
+    return [entry for entry in FORMATS if entry[0] in Image.SAVE]
+
+
+def schedule(post):
+    """Ставит генерацию миниатюр в очередь фоновых задач.
+
+    Пока миниатюр нет, шаблоны показывают исходную картинку.
+    """
+    if not post.image:
+        return
+    jobs.enqueue(generate, post.pk, key=f"thumbnails:{post.pk}")
+
+
+def variant_names(post):
+    """Имена файлов миниатюры и вариантов поста в хранилище."""
+    names = {post.thumbnail.name} if post.thumbnail else set()
+    for by_width in json.loads(post.image_variants or "{}").values():
+        names.update(by_width.values())
+    return names
+
+
+def stored_files(post):
+    """Исходная картинка поста и все её варианты в хранилище."""
+    names = variant_names(post)
+    if post.image:
+        names.add(post.image.name)
+    return names
+
+
+def discard(names):
+    """Ставит удаление файлов в очередь: задача пишется в текущей
+    транзакции, и при откате файлы останутся."""
+    if names:
+        jobs.enqueue(delete_files, sorted(names))
+
+
+@jobs.task(priority=jobs.LOW)
+def delete_files(names):
+    """Удаляет файлы заменённой картинки или удалённого поста."""
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except SuspiciousFileOperation:
+            # Путь вне MEDIA_ROOT (записан в базу в обход форм):
+            # такой файл не наш.
+            logger.warning("Файл %s вне хранилища, не удалён", name)
+
+
+def render_variants(image):
+    """Кодирует картинку во всех ширинах WIDTHS и доступных форматах.
+
+    Возвращает {(формат, ширина): байты}.
+    """
+    image = image.convert("RGB")
+    width, height = THUMBNAIL_SIZE
+    variants = {}
+    for target in WIDTHS:
+        size = (target, round(target * height / width))
+        resized = ImageOps.fit(image, size, Image.LANCZOS)
+        for image_format, _, params in available_formats():
+            buffer = BytesIO()
+            resized.save(buffer, image_format, **params)
+            variants[image_format, target] = buffer.getvalue()
+    return variants
+
+
+@jobs.task()
+def generate(post_id):
+    """Создаёт варианты картинки поста и записывает их в пост.
+
+    Самый широкий JPEG сохраняется в Post.thumbnail, остальные
+    варианты — в Post.image_variants для srcset. Файлы прежних
+    вариантов удаляются. update() не шлёт post_save, поэтому кеши
+    сбрасываются здесь так же, как в posts.signals.post_saved.
+    """
+    post = (
+        Post.objects.filter(pk=post_id)
+        .only("image", "thumbnail", "image_variants", "author", "group")
+        .first()
+    )
+    if post is None or not post.image:
+        return
+    try:
+        with post.image.open("rb") as file, Image.open(file) as image:
+            rendered = render_variants(image)
+    except (OSError, ValueError):
+        logger.exception("Не удалось создать миниатюры поста %s", post_id)
+        return
+    extensions = {entry[0]: entry[1] for entry in FORMATS}
+    previous = variant_names(post)
+    names = {}
+    for (image_format, target), content in rendered.items():
+        names.setdefault(image_format, {})[target] = default_storage.save(
+            f"posts/thumbs/{post_id}_{target}.{extensions[image_format]}",
+            ContentFile(content),
+        )
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnail=names["JPEG"][THUMBNAIL_SIZE[0]],
+        image_variants=json.dumps(names),
+    )
+    saved = {name for by_width in names.values() for name in by_width.values()}
+    if updated:
+        cards.invalidate("post", post_id)
+        feeds.bump_generation()
+        conditional.touch(*conditional.post_scopes_changed(post))
+        stale = previous - saved
+    else:
+        # Картинку успели заменить: её миниатюры создаст своя задача.
+        stale = saved
+    for name in stale:
+        default_storage.delete(name)
@@ -0,0 +1,245 @@
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from constants import TIMELINE_BACKFILL, TIMELINE_FANOUT_LIMIT
+from core import jobs
+from core.models import Job
+from core.paginator import CursorPaginator
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+
+def celebrities():
+    """Авторы, чьи посты не раскладываются, а добавляются в ленты
+    при чтении.
+
+    Знаменитость определяет только счётчик AuthorStats.followers_count,
+    и при раскладке, и при чтении. Если он разошёлся с подписками,
+    пост всё равно попадёт в ленту одним из двух путей.
+    """
+    return AuthorStats.objects.filter(
+        followers_count__gt=TIMELINE_FANOUT_LIMIT
+    )
+
+
+def is_celebrity(author_id):
+    return celebrities().filter(user_id=author_id).exists()
+
+
+@jobs.task(priority=jobs.HIGH)
+def fan_out(post_id):
+    """Раскладывает новый пост в ленты подписчиков автора,
+    если автор не знаменитость (celebrities)."""
+    post = Post.objects.filter(pk=post_id).only("author", "pub_date").first()
+    if post is None or is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        "user_id", flat=True
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post=post,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in followers
+        ),
+        batch_size=TIMELINE_BACKFILL,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_key(user_id, author_id):
+    return f"backfill:{user_id}:{author_id}"
+
+
+@jobs.task(priority=jobs.HIGH)
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние посты автора.
+
+    Если пользователь успел отписаться, пока задача ждала в очереди,
+    подзапрос по подпискам не вернёт ни одного поста.
+    """
+    posts = Post.objects.filter(
+        author_id__in=Follow.objects.filter(
+            user_id=user_id, author_id=author_id
+        ).values("author_id")
+    ).values_list("id", "pub_date")[:TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def follower_left(author_id):
+    """Вызывается после отписки от автора.
+
+    Пока автор был знаменитостью, его посты не раскладывались,
+    а лента собирала их при чтении. Когда счётчик опускается
+    до лимита, лента снова читает только свои записи, поэтому
+    пропущенные посты раскладываются задачей catch_up.
+    """
+    if AuthorStats.objects.filter(
+        user_id=author_id, followers_count=TIMELINE_FANOUT_LIMIT
+    ).exists():
+        jobs.enqueue(catch_up, author_id, key=f"catch-up:{author_id}")
+
+
+@jobs.task(priority=jobs.HIGH)
+def catch_up(author_id):
+    """Раскладывает последние посты автора всем его подписчикам,
+    как backfill() для каждого. Если автор успел снова стать
+    знаменитостью, ничего не делает."""
+    if is_celebrity(author_id):
+        return
+    spread(
+        author_id,
+        Follow.objects.filter(author_id=author_id).values_list(
+            "user_id", flat=True
+        ),
+    )
+
+
+def spread(author_id, user_ids):
+    """Добавляет последние посты автора в ленты пользователей."""
+    posts = list(
+        Post.objects.filter(author_id=author_id).values_list("id", "pub_date")[
+            :TIMELINE_BACKFILL
+        ]
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for user_id in user_ids
+            for post_id, pub_date in posts
+        ),
+        batch_size=TIMELINE_BACKFILL,
+        ignore_conflicts=True,
+    )
+
+
+def trim(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild():
+    """Заново раскладывает ленты по всем подпискам, как backfill().
+    Посты знаменитостей пропускаются: они добавляются при чтении."""
+    follows = (
+        Follow.objects.exclude(author_id__in=celebrities().values("user_id"))
+        .order_by("author_id")
+        .values_list("author_id", "user_id")
+    )
+    with transaction.atomic():
+        TimelineEntry.objects.all().delete()
+        for author_id, pairs in groupby(follows.iterator(), lambda f: f[0]):
+            spread(author_id, [user_id for _, user_id in pairs])
+
+
+def celebrity_ids(user):
+    """Знаменитости из подписок пользователя."""
+    return list(
+        celebrities()
+        .filter(
+            user_id__in=Follow.objects.filter(user=user).values("author_id")
+        )
+        .values_list("user_id", flat=True)
+    )
+
+
+def pending_ids(user):
+    """Авторы, на которых пользователь подписан, но backfill ещё
+    не выполнен: их посты добавляются в ленту при чтении, как посты
+    знаменитостей, чтобы новый подписчик увидел их сразу."""
+    if settings.JOBS_SYNC:
+        return []
+    prefix = backfill_key(user.pk, "")
+    # Проваленная после всех попыток задача уже не выполнится:
+    # ради неё лента не должна навсегда остаться на медленном пути.
+    keys = Job.objects.filter(
+        task=backfill.job_name,
+        key__startswith=prefix,
+        status__in=(Job.QUEUED, Job.RUNNING),
+    ).values_list("key", flat=True)
+    author_ids = {int(key.rsplit(":", 1)[1]) for key in keys}
+    if not author_ids:
+        return []
+    return list(
+        Follow.objects.filter(user=user, author_id__in=author_ids).values_list(
+            "author_id", flat=True
+        )
+    )
+
+
+class TimelinePaginator(CursorPaginator):
+    """Курсорная пагинация по записям ленты, страница состоит из постов."""
+
+    def __init__(self, object_list, per_page):
+        super().__init__(object_list, per_page, ("-pub_date", "-post_id"))
+
+    def page(self, cursor=None):
+        page = super().page(cursor)
+        page.object_list = [entry.post for entry in page.object_list]
+        return page
+
+
+def follow_feed(user, per_page):
+    """Возвращает пагинатор ленты подписок пользователя.
+
+    В записях ленты есть все посты, вышедшие после подписки, и только
+    TIMELINE_BACKFILL последних постов автора на момент подписки
+    (backfill, rebuild): более старые посты в ленте подписок
+    не показываются, их видно в профиле автора.
+
+    Без подписок на «знаменитостей» и ждущих backfill лента читается
+    одним проходом по индексу записей ленты, иначе к ней добавляются
+    посты этих авторов при чтении.
+    """
+    merged = celebrity_ids(user) + pending_ids(user)
+    if not merged:
+        entries = (
+            TimelineEntry.objects.filter(user=user)
+            .select_related("post__author", "post__group")
+            .only(
+                "pub_date",
+                "post",
+                "post__text",
+                "post__pub_date",
+                "post__image",
+                "post__thumbnail",
+                "post__image_variants",
+                "post__comments_count",
+                "post__author",
+                "post__author__username",
+                "post__author__first_name",
+                "post__author__last_name",
+                "post__group",
+                "post__group__title",
+                "post__group__slug",
+            )
+        )
+        return TimelinePaginator(entries, per_page)
+    posts = Post.objects.for_feed().filter(
+        Q(id__in=TimelineEntry.objects.filter(user=user).values("post_id"))
+        | Q(author_id__in=merged)
+    )
+    return CursorPaginator(posts, per_page)
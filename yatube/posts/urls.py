@@ -6,9 +6,18 @@ app_name = "posts"
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("search/", views.search, name="search"),
     path("group/<slug:slug>/", views.group_posts, name="group_posts"),
     path("profile/<str:username>/", views.profile, name="profile"),
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments",
+    ),
+    path("cards/", views.feed_cards, name="feed_cards"),
+    path("fragments/", views.fragments, name="fragments"),
+    path("new/", views.new_posts, name="new_posts"),
     path("create/", views.post_create, name="post_create"),
     path("posts/<int:post_id>/edit/", views.post_edit, {}, name="post_edit"),
     path(
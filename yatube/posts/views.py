@@ -1,75 +1,254 @@
+import hashlib
+import json
+
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.cache import cache_control
 
-from constants import SHOW_TEN
+from constants import (
+    COMMENTS_PER_PAGE,
+    NEW_POSTS_RETRY,
+    SHOW_TEN,
+    SUBMIT_DEDUP_TIMEOUT,
+)
+from core.db_router import read_from_replica
+from core.paginator import CursorPaginator
+from core.ratelimit import ratelimit
+from core.shedding import low_priority
+from core.shell import shared_page
 
+from . import thumbnails, watermarks
+from .conditional import (
+    cached_id,
+    conditional_page,
+    group_scopes,
+    post_scopes,
+    profile_scopes,
+)
+from .counters import author_stats
+from .feeds import feed_page
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .fragments import render_fragments
+from .models import Comment, Follow, Group, Post, User
+from .search import search_ids
+from .timeline import follow_feed
 
 
-def page_num(request, obj):
-    paginator = Paginator(obj, SHOW_TEN)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+def page_num(request, obj, feed):
+    return feed_page(feed, obj, request.GET.get("cursor"))
 
 
-@cache_page(20 * 1)
+@read_from_replica
+@shared_page
 def index(request):
-    posts = Post.objects.all()
+    posts = Post.objects.for_feed()
     template = "posts/index.html"
-    page_obj = page_num(request, posts)
-    context = {"page_obj": page_obj}
+    page_obj = page_num(request, posts, "index")
+    context = {
+        "page_obj": page_obj,
+        "feed": "index",
+        "since": watermarks.since_cursor(page_obj),
+    }
     return render(request, template, context)
 
 
+@low_priority
+@shared_page
+def search(request):
+    query = request.GET.get("q", "").strip()
+    page_obj = Paginator(search_ids(query), SHOW_TEN).get_page(
+        request.GET.get("page")
+    )
+    posts = Post.objects.for_feed().in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[pk] for pk in page_obj.object_list if pk in posts
+    ]
+    context = {"query": query, "page_obj": page_obj}
+    return render(request, "posts/search.html", context)
+
+
+@read_from_replica
+@shared_page
+@conditional_page(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = page_num(request, posts)
+    posts = group.posts.for_feed()
+    page_obj = page_num(request, posts, f"group:{group.pk}")
     context = {
         "group": group,
         "page_obj": page_obj,
+        "feed": f"group:{group.slug}",
+        "since": watermarks.since_cursor(page_obj),
     }
     template = "posts/group_list.html"
     return render(request, template, context)
 
 
+@read_from_replica
+@shared_page
+@conditional_page(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    all_author_posts = author.posts.all()
-    posts_count = all_author_posts.count()
-    page_obj = page_num(request, all_author_posts)
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(user=request.user, author=author).exists()
+    author = get_object_or_404(
+        User.objects.select_related("stats"), username=username
     )
+    all_author_posts = author.posts.for_feed()
+    posts_count = author_stats(author).posts_count
+    page_obj = page_num(request, all_author_posts, f"profile:{author.pk}")
     context = {
         "author": author,
         "page_obj": page_obj,
         "posts_count": posts_count,
-        "following": following,
+        "feed": f"profile:{author.username}",
     }
     return render(request, "posts/profile.html", context)
 
 
+@read_from_replica
+@shared_page
+@conditional_page(post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_count = Post.objects.filter(author=post.author).all().count()
-    form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related("author__stats", "group"), pk=post_id
+    )
+    post_count = author_stats(post.author).posts_count
     context = {
         "post": post,
         "post_count": post_count,
-        "form": form,
-        "comments": comments,
+        "form": CommentForm(),
+        "comments": comments_page(post.pk, request.GET.get("comments")),
     }
     return render(request, "posts/post_detail.html", context)
 
 
+def comments_page(post_id, cursor):
+    """Страница комментариев поста по курсору (created, id)."""
+    comments = Comment.objects.filter(post_id=post_id).select_related("author")
+    paginator = CursorPaginator(
+        comments, COMMENTS_PER_PAGE, ordering=("created", "id")
+    )
+    return paginator.get_page(cursor)
+
+
+@low_priority
+def post_comments(request, post_id):
+    """Фрагмент со следующей порцией комментариев для «Показать ещё»."""
+    context = {
+        "post_id": post_id,
+        "comments": comments_page(post_id, request.GET.get("cursor")),
+    }
+    return render(request, "includes/comment_list.html", context)
+
+
+@low_priority
+@read_from_replica
+def feed_cards(request):
+    """Следующая порция карточек ленты для бесконечной прокрутки.
+
+    Отдаёт только карточки и ссылку на следующую порцию, без base.html.
+    feed — index, follow, group:<slug> или profile:<username>; кроме
+    ленты подписок фрагменты общие для всех и кешируются отдельно
+    от страницы.
+    """
+    feed = request.GET.get("feed", "index")
+    if feed == "follow":
+        return follow_cards(request)
+    return public_cards(request, feed)
+
+
+@shared_page
+def public_cards(request, feed):
+    kind, _, key = feed.partition(":")
+    if kind == "index" and not key:
+        posts, cache_feed = Post.objects.for_feed(), "index"
+    elif kind == "group":
+        group_id = cached_id(f"group:{key}", Group.objects.filter(slug=key))
+        if group_id is None:
+            raise Http404
+        posts = Post.objects.for_feed().filter(group_id=group_id)
+        cache_feed = f"group:{group_id}"
+    elif kind == "profile":
+        author_id = cached_id(f"user:{key}", User.objects.filter(username=key))
+        if author_id is None:
+            raise Http404
+        posts = Post.objects.for_feed().filter(author_id=author_id)
+        cache_feed = f"profile:{author_id}"
+    else:
+        raise Http404
+    context = {"page_obj": page_num(request, posts, cache_feed), "feed": feed}
+    return render(request, "includes/card_list.html", context)
+
+
 @login_required
+@cache_control(private=True)
+def follow_cards(request):
+    paginator = follow_feed(request.user, SHOW_TEN)
+    context = {
+        "page_obj": paginator.get_page(request.GET.get("cursor")),
+        "feed": "follow",
+    }
+    return render(request, "includes/card_list.html", context)
+
+
+@cache_control(private=True, max_age=0)
+def fragments(request):
+    """Персональные части страниц-оболочек (core.shell) в JSON.
+
+    names — имена фрагментов, остальные параметры нужны отдельным
+    фрагментам: author — кнопке подписки, post — форме комментария.
+    """
+    return JsonResponse(
+        render_fragments(request, request.GET.getlist("names"))
+    )
+
+
+@low_priority
+@cache_control(no_cache=True)
+def new_posts(request):
+    """Сколько постов появилось в ленте после курсора since.
+
+    feed — index, follow или group:<slug>. Ответ собирается из головы
+    ленты в кеше (posts.watermarks), без запроса постов. Клиенту
+    EventSource (Accept: text/event-stream) отдаётся одно событие
+    с полем retry, и соединение закрывается: браузер сам переподключится
+    через NEW_POSTS_RETRY секунд, а поток воркера не ждёт вместе
+    с тысячами открытых вкладок.
+    """
+    feed = request.GET.get("feed", "index")
+    try:
+        since = watermarks.decode_since(request.GET.get("since"))
+    except InvalidPage as error:
+        return JsonResponse({"errors": {"since": [str(error)]}}, status=400)
+    authors = None
+    if feed == "index":
+        head, posts = "index", Post.objects.all()
+    elif feed == "follow":
+        if not request.user.is_authenticated:
+            return JsonResponse({"errors": {"feed": [feed]}}, status=403)
+        head, posts = "index", Post.objects.all()
+        authors = watermarks.following_ids(request.user.pk)
+    elif feed.startswith("group:"):
+        slug = feed.partition(":")[2]
+        group_id = cached_id(f"group:{slug}", Group.objects.filter(slug=slug))
+        if group_id is None:
+            return JsonResponse({"errors": {"feed": [feed]}}, status=404)
+        head, posts = f"group:{group_id}", Post.objects.filter(group=group_id)
+    else:
+        return JsonResponse({"errors": {"feed": [feed]}}, status=400)
+    count, more = watermarks.new_posts(head, posts, since, authors)
+    data = json.dumps({"count": count, "more": more})
+    if "text/event-stream" in request.META.get("HTTP_ACCEPT", ""):
+        return HttpResponse(
+            f"retry: {NEW_POSTS_RETRY * 1000}\ndata: {data}\n\n",
+            content_type="text/event-stream",
+        )
+    return HttpResponse(data, content_type="application/json")
+
+
+@login_required
+@ratelimit("post_create")
 def post_create(request):
     if request.method == "POST":
         form = PostForm(request.POST or None, files=request.FILES or None)
@@ -77,6 +256,7 @@ def post_create(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            thumbnails.schedule(post)
             return redirect("posts:profile", post.author)
         return render(request, "posts/post_create.html", {"form": form})
     form = PostForm()
@@ -85,17 +265,24 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    if post.author != request.user:
+    post = get_object_or_404(Post.objects.select_related("group"), pk=post_id)
+    if post.author_id != request.user.id:
         return redirect("posts:post_detail", post_id=post.id)
-    post = Post.objects.get(id=post_id)
+    previous = thumbnails.stored_files(post)
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
         instance=post,
     )
     if request.POST and form.is_valid():
-        post = form.save()
+        post = form.save(commit=False)
+        if "image" in form.changed_data:
+            post.thumbnail = ""
+            post.image_variants = ""
+        post.save()
+        if "image" in form.changed_data:
+            thumbnails.discard(previous - thumbnails.stored_files(post))
+            thumbnails.schedule(post)
         return redirect("posts:post_detail", post.id)
     form = PostForm(instance=post)
     return render(
@@ -110,44 +297,86 @@ def post_edit(request, post_id):
 
 
 @login_required
+@ratelimit("add_comment")
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    """Добавляет комментарий.
+
+    Запрос из скрипта получает в ответ только HTML нового комментария
+    (или 204, если это повтор той же отправки), обычный — редирект
+    на страницу поста. Повтор распознаётся по idempotency_key формы.
+    """
+    post = get_object_or_404(
+        Post.objects.only("id", "author_id", "group_id"), pk=post_id
+    )
     form = CommentForm(request.POST or None)
-    if form.is_valid():
+    comment = None
+    if form.is_valid() and first_submit(request, "comment"):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
-    return redirect("posts:post_detail", post_id=post_id)
+    if not request.is_ajax():
+        return redirect("posts:post_detail", post_id=post_id)
+    if form.errors:
+        return JsonResponse({"errors": form.errors}, status=400)
+    if comment is None:
+        return HttpResponse(status=204)
+    return render(request, "includes/comment.html", {"comment": comment})
+
+
+def first_submit(request, action):
+    """False, если форма с этим idempotency_key уже была принята."""
+    key = request.POST.get("idempotency_key")
+    if not key:
+        return True
+    digest = hashlib.md5(key.encode()).hexdigest()
+    return cache.add(
+        f"submit:{action}:{request.user.pk}:{digest}",
+        True,
+        SUBMIT_DEDUP_TIMEOUT,
+    )
 
 
+@read_from_replica
 @login_required
 def follow_index(request):
-    follower = Follow.objects.filter(user=request.user).values_list(
-        "author_id", flat=True
-    )
-    post = Post.objects.filter(author_id__in=follower)
-    page_obj = page_num(request, post)
+    paginator = follow_feed(request.user, SHOW_TEN)
+    page_obj = paginator.get_page(request.GET.get("cursor"))
     context = {
-        "post": post,
         "page_obj": page_obj,
         "title": "Избранные посты",
+        "feed": "follow",
+        "since": watermarks.since_cursor(page_obj),
     }
     return render(request, "posts/follow.html", context)
 
 
 @login_required
+@ratelimit("profile_follow", methods=("GET", "POST"))
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    if request.user != author and not (
-        author.following.filter(user_id=request.user.id).exists()
-    ):
-        Follow.objects.create(user=request.user, author=author)
+    """Подписка; повторная ничего не меняет.
+
+    Запрос из скрипта получает 204 без перехода в ленту подписок.
+    """
+    author = get_object_or_404(User.objects.only("id"), username=username)
+    if request.user.pk != author.pk:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    if request.is_ajax():
+        return HttpResponse(status=204)
     return redirect("posts:follow_index")
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    """Отписка; повторная ничего не меняет, неизвестный автор — 404.
+
+    Автора ищем, только если удалять было нечего.
+    """
+    deleted, _ = Follow.objects.filter(
+        user=request.user, author__username=username
+    ).delete()
+    if not deleted and not User.objects.filter(username=username).exists():
+        raise Http404
+    if request.is_ajax():
+        return HttpResponse(status=204)
     return redirect("posts:follow_index")
@@ -0,0 +1,141 @@
+"""Счётчик новых постов в ленте без запросов к Post на каждый опрос.
+
+Для общей ленты и лент групп в кеше лежит «голова» — новейшие
+NEW_POSTS_HEAD_SIZE постов как (pub_date, id, author_id). Новый пост
+дописывается в уже закешированные головы, удаление и перенос поста
+в другую группу их сбрасывают. Голова живёт FEED_CACHE_TIMEOUT:
+запись, потерянная при одновременной публикации двух постов,
+восстановится при следующем чтении из базы.
+
+Лента подписок считается по голове общей ленты и списку авторов,
+на которых подписан пользователь. Если с курсора вышло больше
+постов, чем помещается в голову, считает база.
+"""
+
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from constants import FEED_CACHE_TIMEOUT, NEW_POSTS_HEAD_SIZE
+from core.paginator import CursorPaginator
+
+from .models import Follow, Post
+
+
+def head_key(feed):
+    return f"watermark:{feed}"
+
+
+def post_feeds(post, group_ids=()):
+    feeds = {"index"}
+    feeds.update(
+        f"group:{group_id}"
+        for group_id in (post.group_id, *group_ids)
+        if group_id
+    )
+    return feeds
+
+
+def head(feed, queryset):
+    """Новейшие посты ленты, из кеша или из базы."""
+    key = head_key(feed)
+    entries = cache.get(key)
+    if entries is None:
+        entries = list(
+            queryset.order_by("-pub_date", "-id").values_list(
+                "pub_date", "id", "author_id"
+            )[:NEW_POSTS_HEAD_SIZE]
+        )
+        cache.set(key, entries, FEED_CACHE_TIMEOUT)
+    return entries
+
+
+def push(post):
+    """Дописывает новый пост в закешированные головы его лент."""
+    entry = (post.pub_date, post.pk, post.author_id)
+    found = cache.get_many([head_key(feed) for feed in post_feeds(post)])
+    cache.set_many(
+        {
+            key: [entry, *entries][:NEW_POSTS_HEAD_SIZE]
+            for key, entries in found.items()
+        },
+        FEED_CACHE_TIMEOUT,
+    )
+
+
+def forget(feeds):
+    cache.delete_many([head_key(feed) for feed in feeds])
+
+
+def following_ids(user_id):
+    """id авторов, на которых подписан пользователь."""
+    key = f"following:{user_id}"
+    authors = cache.get(key)
+    if authors is None:
+        authors = set(
+            Follow.objects.filter(user_id=user_id).values_list(
+                "author_id", flat=True
+            )
+        )
+        cache.set(key, authors, None)
+    return authors
+
+
+def forget_following(user_id):
+    cache.delete(f"following:{user_id}")
+
+
+def cursor_paginator():
+    return CursorPaginator(Post.objects.none(), 1)
+
+
+def since_cursor(page):
+    """Курсор (pub_date, id) верхнего поста первой страницы ленты.
+
+    Для остальных страниц None: баннер новых постов нужен только
+    на первой. Пустая лента получает пустой курсор — «с начала».
+    """
+    if page.number != 1:
+        return None
+    if not page.object_list:
+        return ""
+    return cursor_paginator().encode_cursor(page.object_list[0], 1)
+
+
+def decode_since(cursor):
+    """(pub_date, id) из курсора since_cursor(); None для пустого."""
+    if not cursor:
+        return None
+    _, _, (pub_date, post_id) = cursor_paginator().decode_cursor(cursor)
+    try:
+        pub_date = parse_datetime(str(pub_date))
+    except ValueError:
+        pub_date = None
+    if pub_date is None or not isinstance(post_id, int):
+        raise InvalidPage("Некорректный курсор")
+    return pub_date, post_id
+
+
+def new_posts(feed, queryset, since, authors=None):
+    """Число постов ленты новее since и признак «их может быть больше».
+
+    authors ограничивает посты авторами (лента подписок).
+    """
+    entries = head(feed, queryset)
+    newer = [entry for entry in entries if since is None or entry[:2] > since]
+    covered = len(newer) < len(entries) or len(entries) < NEW_POSTS_HEAD_SIZE
+    if authors is not None:
+        newer = [entry for entry in newer if entry[2] in authors]
+    if covered:
+        return len(newer), False
+    if authors is None:
+        return len(newer), True
+    posts = queryset.filter(author_id__in=authors)
+    if since is not None:
+        pub_date, post_id = since
+        posts = posts.filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=post_id)
+        )
+    count = posts[:NEW_POSTS_HEAD_SIZE].count()
+    return count, count == NEW_POSTS_HEAD_SIZE
@@ -1,5 +1,9 @@
 from django.contrib.auth import get_user_model
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
+
+from core import jobs
+
+from .tasks import send_password_reset
 
 User = get_user_model()
 
@@ -8,3 +12,29 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ("first_name", "last_name", "username", "email")
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Письмо со ссылкой сброса пароля рендерит и отправляет фоновая
+    задача; в очередь уходит только id пользователя."""
+
+    def send_mail(
+        self,
+        subject_template_name,
+        email_template_name,
+        context,
+        from_email,
+        to_email,
+        html_email_template_name=None,
+    ):
+        jobs.enqueue(
+            send_password_reset,
+            context["user"].pk,
+            context["domain"],
+            context["site_name"],
+            context["protocol"] == "https",
+            from_email,
+            subject_template_name,
+            email_template_name,
+            html_email_template_name,
+        )
@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.forms import PasswordResetForm
+from django.contrib.auth.tokens import default_token_generator
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core import jobs
+
+User = get_user_model()
+
+
+@jobs.task(priority=jobs.HIGH)
+def send_password_reset(
+    user_id,
+    domain,
+    site_name,
+    use_https,
+    from_email,
+    subject_template_name,
+    email_template_name,
+    html_email_template_name=None,
+):
+    """Рендерит и отправляет письмо сброса пароля.
+
+    Токен создаётся здесь, а не в запросе: в аргументах задачи,
+    которые хранятся в базе и видны в админке, ссылки сброса нет.
+    """
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None or not user.has_usable_password():
+        return
+    email = getattr(user, User.get_email_field_name())
+    context = {
+        "email": email,
+        "domain": domain,
+        "site_name": site_name,
+        "uid": urlsafe_base64_encode(force_bytes(user.pk)),
+        "user": user,
+        "token": default_token_generator.make_token(user),
+        "protocol": "https" if use_https else "http",
+    }
+    PasswordResetForm().send_mail(
+        subject_template_name,
+        email_template_name,
+        context,
+        from_email,
+        email,
+        html_email_template_name=html_email_template_name,
+    )
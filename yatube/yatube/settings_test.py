@@ -0,0 +1,7 @@
+"""Настройки для тестов: pytest (pytest.ini и CI) и
+manage.py test --settings=yatube.settings_test."""
+
+from .settings import *  # noqa: F401,F403
+
+# Фоновые задачи выполняются сразу в запросе: тестам не нужен воркер.
+JOBS_SYNC = True